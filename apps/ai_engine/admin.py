@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SpendingInsight
+from .models import SpendingInsight, InsightJob, SpendingForecast
 
 
 @admin.register(SpendingInsight)
@@ -7,5 +7,21 @@ class SpendingInsightAdmin(admin.ModelAdmin):
     list_display = ['user', 'insight_type', 'severity', 'title', 'created_at', 'is_read']
     list_filter = ['insight_type', 'severity', 'is_read', 'created_at']
     search_fields = ['user__email', 'title', 'message']
-    readonly_fields = ['created_at']
+    readonly_fields = ['fingerprint', 'created_at', 'updated_at']
     date_hierarchy = 'created_at'
+
+
+@admin.register(InsightJob)
+class InsightJobAdmin(admin.ModelAdmin):
+    list_display = ['user', 'status', 'run_after', 'attempts', 'created_at', 'started_at']
+    list_filter = ['status']
+    search_fields = ['user__email', 'last_error']
+    readonly_fields = ['created_at', 'started_at']
+
+
+@admin.register(SpendingForecast)
+class SpendingForecastAdmin(admin.ModelAdmin):
+    list_display = ['user', 'category', 'method', 'fitted_through', 'is_stale', 'fitted_at']
+    list_filter = ['method', 'is_stale']
+    search_fields = ['user__email', 'category__name']
+    readonly_fields = ['fitted_at']
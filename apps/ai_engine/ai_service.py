@@ -7,44 +7,45 @@ from decimal import Decimal
 from typing import List, Dict, Optional
 
 import numpy as np
-import pandas as pd
+from django.conf import settings
 from django.db.models import Sum, Avg
 from django.utils import timezone
 
+from apps.analytics import rollups, spending_stats
+from apps.expenses import periods
 from apps.expenses.models import Expense, Category, CategoryBudget, MonthlyBudget
-from .models import SpendingInsight
+from . import engine, forecasting
+from .anomalies import without_flagged
+from .insights import replace_insights
+from .models import SpendingInsight, insight_fingerprint
+from .stages import StageRun
 
 logger = logging.getLogger(__name__)
 
 
+def forecast_months(now=None, months: int = 3) -> List[tuple]:
+    """The `months` closed months before `now` as (year, month) pairs, most recent first"""
+    return periods.closed_months(months, now or timezone.now())
+
+
+def moving_average_forecast(monthly_totals: List[float]) -> Decimal:
+    """Simple moving average of the given monthly totals"""
+    if not monthly_totals:
+        return Decimal('0.00')
+    forecast = sum(monthly_totals) / len(monthly_totals)
+    return Decimal(str(round(forecast, 2)))
+
+
 def forecast_next_month_spending(user) -> Decimal:
     """
-    Simple moving average forecast for next month's spending
-    Uses last 3 months of data
+    Forecast for next month's spending
+    Served from the user's persisted model (see forecasting.py), refit only
+    when a month has closed or past expenses changed since the last fit
     """
     try:
-        now = timezone.now()
-        
-        # Get last 3 months of spending
-        spending_by_month = []
-        for i in range(1, 4):  # Last 3 months
-            month_date = now - timedelta(days=30 * i)
-            month_total = Expense.objects.filter(
-                user=user,
-                is_deleted=False,
-                expense_date__year=month_date.year,
-                expense_date__month=month_date.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            spending_by_month.append(float(month_total))
-        
-        # Calculate moving average
-        if spending_by_month:
-            forecast = sum(spending_by_month) / len(spending_by_month)
-            logger.info(f"Forecast for user {user.email}: ₹{forecast:.2f}")
-            return Decimal(str(round(forecast, 2)))
-        
-        return Decimal('0.00')
+        forecast = forecasting.get_forecast(user)
+        logger.info(f"Forecast for user {user.email}: ₹{forecast:.2f}")
+        return forecast
         
     except Exception as e:
         logger.error(f"Forecast error for user {user.email}: {e}")
@@ -55,6 +56,9 @@ def detect_spending_anomalies(user, month: int = None, year: int = None) -> List
     """
     Detect unusual spending transactions using statistical methods
     Returns list of anomalous expenses
+
+    Each expense is checked against its own category's running statistics
+    (see analytics.spending_stats), a constant-time check per expense.
     """
     try:
         now = timezone.now()
@@ -65,31 +69,26 @@ def detect_spending_anomalies(user, month: int = None, year: int = None) -> List
         expenses = Expense.objects.filter(
             user=user,
             is_deleted=False,
-            expense_date__year=year,
-            expense_date__month=month
-        ).values('id', 'title', 'amount', 'category__name', 'expense_date')
+        ).filter(
+            periods.month(year, month).q()
+        ).values('id', 'title', 'amount', 'category_id', 'category__name', 'expense_date')
         
         if not expenses:
             return []
         
-        # Calculate statistics
-        amounts = [float(e['amount']) for e in expenses]
-        mean = np.mean(amounts)
-        std = np.std(amounts)
+        baselines = spending_stats.baselines_for_user(user)
         
-        # Flag transactions > 2 standard deviations from mean
         anomalies = []
-        threshold = mean + (2 * std)
-        
         for expense in expenses:
-            if float(expense['amount']) > threshold:
+            base = baselines.get(expense['category_id'])
+            if spending_stats.is_anomalous(base, float(expense['amount'])):
                 anomalies.append({
                     'expense_id': expense['id'],
                     'title': expense['title'],
                     'amount': expense['amount'],
                     'category': expense['category__name'],
                     'date': expense['expense_date'],
-                    'deviation': float(expense['amount']) - mean
+                    'deviation': float(expense['amount']) - base.mean
                 })
         
         logger.info(f"Found {len(anomalies)} anomalies for user {user.email}")
@@ -103,7 +102,8 @@ def detect_spending_anomalies(user, month: int = None, year: int = None) -> List
 def calculate_budget_risk_score(user, month: int = None, year: int = None) -> int:
     """
     Calculate risk score (0-100) of exceeding budget
-    Based on current spending pace and days remaining
+    Based on the month's daily spending so far (one range read of the daily
+    rollups) and the real number of days in the month
     """
     try:
         now = timezone.now()
@@ -120,39 +120,13 @@ def calculate_budget_risk_score(user, month: int = None, year: int = None) -> in
         if not budget:
             return 0
         
-        # Get current spending
-        current_spending = Expense.objects.filter(
-            user=user,
-            is_deleted=False,
-            expense_date__year=year,
-            expense_date__month=month
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # Calculate days elapsed and remaining
-        days_in_month = 30  # Simplified
-        current_day = now.day
-        days_elapsed = current_day
-        days_remaining = days_in_month - days_elapsed
-        
-        if days_elapsed == 0:
-            return 0
-        
-        # Calculate daily burn rate
-        daily_burn_rate = float(current_spending) / days_elapsed
-        
-        # Project end-of-month spending
-        projected_spending = float(current_spending) + (daily_burn_rate * days_remaining)
-        
-        # Calculate percentage of budget
-        percentage = (projected_spending / float(budget.amount)) * 100
-        
-        # Risk score: 0-49 = low, 50-79 = medium, 80-100 = high
-        if percentage <= 80:
-            risk_score = int(percentage * 0.5)  # Map to 0-40
-        elif percentage <= 100:
-            risk_score = int(40 + ((percentage - 80) * 2))  # Map to 40-80
-        else:
-            risk_score = min(100, int(80 + ((percentage - 100) * 0.5)))  # Map to 80-100
+        period = periods.month(year, month)
+        daily = np.array(
+            [float(point.total) for point in rollups.daily_series(user, period)], dtype=np.float64
+        )
+        risk_score = engine.budget_risk_score(
+            daily, float(budget.amount), period.days_elapsed(now.date())
+        )
         
         logger.info(f"Budget risk score for user {user.email}: {risk_score}")
         return risk_score
@@ -162,140 +136,297 @@ def calculate_budget_risk_score(user, month: int = None, year: int = None) -> in
         return 0
 
 
+def trend_months(now=None, months: int = 3) -> List[tuple]:
+    """(year, month) pairs a category trend compares, current month first"""
+    now = now or timezone.now()
+    return [(now.year, now.month)] + forecast_months(now, months - 1)
+
+
+def category_trend(monthly_totals: List[float]) -> Dict:
+    """
+    Trend direction and percentage change between the first (most recent)
+    and last (oldest) of the given monthly totals
+    """
+    return engine.category_trends(np.array([monthly_totals], dtype=np.float64))[0]
+
+
 def analyze_category_trends(user, category, months: int = 3) -> Dict:
     """
     Analyze spending trends for a specific category
     Returns trend direction and percentage change
     """
     try:
-        now = timezone.now()
-        monthly_totals = []
-        
-        for i in range(months):
-            month_date = now - timedelta(days=30 * i)
-            total = Expense.objects.filter(
-                user=user,
-                category=category,
-                is_deleted=False,
-                expense_date__year=month_date.year,
-                expense_date__month=month_date.month
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            monthly_totals.append(float(total))
-        
-        if len(monthly_totals) < 2:
-            return {'trend': 'stable', 'change': 0}
-        
-        # Simple trend: compare first and last month
-        recent = monthly_totals[0]
-        older = monthly_totals[-1]
-        
-        if older == 0:
-            return {'trend': 'new', 'change': 100}
-        
-        change_pct = ((recent - older) / older) * 100
-        
-        if change_pct > 10:
-            trend = 'increasing'
-        elif change_pct < -10:
-            trend = 'decreasing'
-        else:
-            trend = 'stable'
-        
-        return {
-            'trend': trend,
-            'change': round(change_pct, 1),
-            'recent_amount': recent,
-            'older_amount': older
-        }
+        month_keys = trend_months(months=months)
+        totals = rollups.monthly_totals(user, months=month_keys, category=category)
+        return category_trend([float(totals.get(m, 0)) for m in month_keys])
         
     except Exception as e:
         logger.error(f"Category trend analysis error: {e}")
         return {'trend': 'unknown', 'change': 0}
 
 
+def insight_months(now=None) -> List[tuple]:
+    """Every (year, month) the insight detectors look at"""
+    now = now or timezone.now()
+    return sorted(set(trend_months(now)) | set(forecast_months(now)))
+
+
 def generate_insights_for_user(user) -> List[SpendingInsight]:
     """
     Generate all AI insights for a user
     Called periodically (daily) or on-demand
+
+    All detectors run on one ExpenseFrame (see engine.py), so the query count
+    doesn't depend on the number of categories or expenses, and all insights
+    are written with a single upsert; insights of the regenerated periods that
+    weren't found again are deleted with it (see replace_insights).
+
+    Every stage is timed (with its query count) to the `performance` logger.
+    Past INSIGHT_DEADLINE_SECONDS the remaining detectors are skipped and the
+    insights found so far are written.
     """
-    insights = []
     now = timezone.now()
+    run = StageRun(f"insights user={user.pk}", deadline=settings.INSIGHT_DEADLINE_SECONDS)
     
     try:
-        # Clear old insights (keep last 30 days)
-        SpendingInsight.objects.filter(
-            user=user,
-            created_at__lt=now - timedelta(days=30)
-        ).delete()
-        
-        # 1. Next month forecast
-        forecast = forecast_next_month_spending(user)
-        if forecast > 0:
-            insight = SpendingInsight.objects.create(
-                user=user,
-                insight_type='forecast',
-                severity='info',
-                title=f'Next Month Forecast: ₹{forecast}',
-                message=f'Based on your last 3 months, you\'re likely to spend ₹{forecast} next month.',
-                predicted_amount=forecast,
-                applies_to_month=(now.month % 12) + 1,
-                applies_to_year=now.year if now.month < 12 else now.year + 1
-            )
-            insights.append(insight)
-        
-        # 2. Budget risk assessment
-        risk_score = calculate_budget_risk_score(user)
-        if risk_score > 50:
-            severity = 'danger' if risk_score > 80 else 'warning'
-            insight = SpendingInsight.objects.create(
-                user=user,
-                insight_type='risk',
-                severity=severity,
-                title=f'Budget Risk: {risk_score}% likelihood of overspending',
-                message=f'At your current pace, you have a {risk_score}% chance of exceeding your budget this month.',
-                risk_score=risk_score,
-                applies_to_month=now.month,
-                applies_to_year=now.year
-            )
-            insights.append(insight)
-        
-        # 3. Anomaly detection
-        anomalies = detect_spending_anomalies(user)
-        if anomalies:
-            for anomaly in anomalies[:3]:  # Top 3 anomalies
-                insight = SpendingInsight.objects.create(
-                    user=user,
-                    insight_type='anomaly',
-                    severity='warning',
-                    title=f'Unusual expense detected: ₹{anomaly["amount"]}',
-                    message=f'{anomaly["title"]} (₹{anomaly["amount"]}) is significantly higher than your average.',
-                    actual_amount=anomaly['amount'],
-                    applies_to_month=now.month,
-                    applies_to_year=now.year
-                )
-                insights.append(insight)
-        
-        # 4. Category trends
-        categories = Category.objects.filter(user=user)
-        for category in categories:
-            trend_data = analyze_category_trends(user, category)
-            if abs(trend_data['change']) > 20:  # Significant change
-                trend_emoji = '📈' if trend_data['trend'] == 'increasing' else '📉'
-                insight = SpendingInsight.objects.create(
-                    user=user,
-                    insight_type='trend',
-                    severity='info',
-                    title=f'{trend_emoji} {category.name} spending {trend_data["trend"]}',
-                    message=f'Your {category.name} spending has changed by {trend_data["change"]}% compared to 3 months ago.',
-                    applies_to_month=now.month,
-                    applies_to_year=now.year
-                )
-                insights.append(insight)
+        frame, budget_amount, baselines = run.call('load', load_insight_inputs, user, now, required=True)
+        forecast = run.call('forecast fit', forecasting.get_forecast, user, now)
+        specs = detect_insights(frame, budget_amount, now, baselines, forecast, run)
+        insights = run.call(
+            'write',
+            lambda: replace_insights(
+                insights_for_user(user, specs), {user.pk: regenerated_scopes(now, run.skipped)}
+            ),
+            required=True,
+        )
         
         logger.info(f"Generated {len(insights)} insights for user {user.email}")
         return insights
         
     except Exception as e:
         logger.error(f"Insight generation error: {e}", exc_info=True)
-        return insights
+        return []
+    
+    finally:
+        run.log()
+
+
+def load_insight_inputs(user, now: datetime) -> tuple:
+    """(expense frame, this month's budget amount, anomaly baselines) for one user"""
+    frame = engine.load_frame(user, months=insight_months(now))
+    budget_amount = (
+        MonthlyBudget.objects.filter(user=user, year=now.year, month=now.month)
+        .values_list('amount', flat=True)
+        .first()
+    )
+    return frame, budget_amount, spending_stats.baselines_for_user(user)
+
+
+def prune_insights(older_than: timedelta, chunk_size: int = 1000) -> int:
+    """
+    Delete insights not refreshed within `older_than`, `chunk_size` rows per
+    transaction so the table is never locked for long. Returns rows deleted.
+    """
+    cutoff = timezone.now() - older_than
+    expired = SpendingInsight.objects.filter(updated_at__lt=cutoff).order_by('updated_at')
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += SpendingInsight.objects.filter(id__in=ids).delete()[0]
+
+
+def build_insights(user, frame: engine.ExpenseFrame, budget_amount: Optional[Decimal],
+                   now: datetime, baselines: Optional[Dict] = None,
+                   forecast: Optional[Decimal] = None) -> List[SpendingInsight]:
+    """
+    Unsaved insights for a user from their expense frame, this month's budget,
+    per-category anomaly baselines and next month's persisted forecast
+    """
+    return insights_for_user(user, detect_insights(frame, budget_amount, now, baselines, forecast))
+
+
+def insights_for_user(user, specs: List[Dict]) -> List[SpendingInsight]:
+    """Unsaved insights from one user's detect_insights() output (two queries for anomalies)"""
+    anomaly_ids = [spec['expense_id'] for spec in specs if 'expense_id' in spec]
+    expenses = Expense.objects.in_bulk(anomaly_ids) if anomaly_ids else {}
+    return insights_from_specs(user.pk, specs, without_flagged(expenses))
+
+
+def insights_from_specs(user_id, specs: List[Dict], expenses: Dict) -> List[SpendingInsight]:
+    """
+    Unsaved SpendingInsight rows from detect_insights() output.
+    `expenses` maps expense id -> Expense for the anomalies; missing ones are
+    skipped (see without_flagged()).
+    """
+    insights = []
+    for spec in specs:
+        spec = dict(spec)
+        expense_id = spec.pop('expense_id', None)
+        if expense_id is not None:
+            expense = expenses.get(expense_id)
+            if expense is None:
+                continue
+            spec.update(
+                title=f'Unusual expense detected: ₹{expense.amount}',
+                message=f'{expense.title} (₹{expense.amount}) is significantly higher than your average.',
+                actual_amount=expense.amount,
+            )
+        insights.append(SpendingInsight(user_id=user_id, **spec))
+    return insights
+
+
+def _forecast_specs(frame, budget_amount, now, baselines, forecast) -> List[Dict]:
+    """Next month forecast"""
+    if forecast is None:
+        forecast = moving_average_forecast(
+            engine.monthly_totals(frame, forecast_months(now)).tolist()
+        )
+    if forecast <= 0:
+        return []
+    next_year, next_month = periods.add_months(now.year, now.month, 1)
+    return [dict(
+        insight_type='forecast',
+        severity='info',
+        title=f'Next Month Forecast: ₹{forecast}',
+        message=f'Based on your spending history, you\'re likely to spend ₹{forecast} next month.',
+        predicted_amount=forecast,
+        applies_to_month=next_month,
+        applies_to_year=next_year,
+        fingerprint=insight_fingerprint('forecast', next_year, next_month),
+    )]
+
+
+def _risk_specs(frame, budget_amount, now, baselines, forecast) -> List[Dict]:
+    """Budget risk assessment"""
+    if not budget_amount:
+        return []
+    month = periods.month(now.year, now.month)
+    risk_score = engine.budget_risk_score(
+        engine.daily_totals(frame, month), float(budget_amount), month.days_elapsed(now.date())
+    )
+    if risk_score <= 50:
+        return []
+    severity = 'danger' if risk_score > 80 else 'warning'
+    return [dict(
+        insight_type='risk',
+        severity=severity,
+        title=f'Budget Risk: {risk_score}% likelihood of overspending',
+        message=f'At your current pace, you have a {risk_score}% chance of exceeding your budget this month.',
+        risk_score=risk_score,
+        applies_to_month=now.month,
+        applies_to_year=now.year,
+        fingerprint=insight_fingerprint('risk', now.year, now.month),
+    )]
+
+
+def _anomaly_specs(frame, budget_amount, now, baselines, forecast) -> List[Dict]:
+    """Anomaly detection (top 3)"""
+    return [
+        dict(
+            insight_type='anomaly',
+            severity='warning',
+            expense_id=anomaly['expense_id'],
+            applies_to_month=now.month,
+            applies_to_year=now.year,
+            fingerprint=insight_fingerprint('anomaly', now.year, now.month, anomaly['expense_id']),
+        )
+        for anomaly in engine.month_anomalies(frame, now.year, now.month, baselines)[:3]
+    ]
+
+
+def _trend_specs(frame, budget_amount, now, baselines, forecast) -> List[Dict]:
+    """Category trends"""
+    specs = []
+    month_keys = trend_months(now)
+    trends = engine.category_trends(engine.category_month_matrix(frame, month_keys))
+    for category_id, name, trend_data in zip(frame.category_ids, frame.category_names, trends):
+        if abs(trend_data['change']) > 20:  # Significant change
+            trend_emoji = '📈' if trend_data['trend'] == 'increasing' else '📉'
+            specs.append(dict(
+                insight_type='trend',
+                severity='info',
+                title=f'{trend_emoji} {name} spending {trend_data["trend"]}',
+                message=f'Your {name} spending has changed by {trend_data["change"]}% compared to 3 months ago.',
+                applies_to_month=now.month,
+                applies_to_year=now.year,
+                fingerprint=insight_fingerprint('trend', now.year, now.month, category_id),
+            ))
+    return specs
+
+
+# Detector stages in the order they run (and are skipped once past the deadline)
+DETECTORS = (
+    ('forecast', _forecast_specs),
+    ('risk', _risk_specs),
+    ('anomalies', _anomaly_specs),
+    ('trends', _trend_specs),
+)
+
+
+# Insight type and month (relative to now) each detector regenerates
+DETECTOR_SCOPES = {
+    'forecast': ('forecast', 1),
+    'risk': ('risk', 0),
+    'anomalies': ('anomaly', 0),
+    'trends': ('trend', 0),
+}
+
+
+def regenerated_scopes(now: datetime, skipped=()) -> List[str]:
+    """
+    Fingerprint prefixes of the insights a run at `now` regenerates, for
+    replace_insights(). Detectors in `skipped` (past the deadline) found
+    nothing new, so their old insights are kept.
+    """
+    scopes = []
+    for name, _ in DETECTORS:
+        if name in skipped or name not in DETECTOR_SCOPES:
+            continue
+        insight_type, months_ahead = DETECTOR_SCOPES[name]
+        year, month = periods.add_months(now.year, now.month, months_ahead)
+        scopes.append(insight_fingerprint(insight_type, year, month))
+    return scopes
+
+
+def detect_insights(frame: engine.ExpenseFrame, budget_amount: Optional[Decimal],
+                    now: datetime, baselines: Optional[Dict] = None,
+                    forecast: Optional[Decimal] = None,
+                    run: Optional[StageRun] = None) -> List[Dict]:
+    """
+    SpendingInsight field values for one user's frame. Pure (no database access)
+    and picklable, so it can run in a process pool. Anomaly entries carry the
+    flagged `expense_id` instead of a title/message; see insights_from_specs().
+    `forecast` is next month's persisted forecast; without one, the moving
+    average of the frame's last 3 closed months is used.
+    Each detector runs as a stage of `run`, if given: timed, and skipped once
+    the run's deadline has passed.
+    """
+    specs = []
+    for name, detector in DETECTORS:
+        args = (frame, budget_amount, now, baselines, forecast)
+        found = run.call(name, detector, *args) if run is not None else detector(*args)
+        specs.extend(found or [])
+    return specs
+
+
+def detect_insights_batch(items: List[tuple], now: datetime) -> List[tuple]:
+    """
+    detect_insights() over [(user_id, frame, budget_amount, baselines, forecast)]
+    -> [(user_id, specs, scopes)], scopes as regenerated_scopes() for replace_insights().
+    specs is None for a user whose detection failed, so the batch carries on.
+    Each user gets INSIGHT_DEADLINE_SECONDS; slow users are logged to `performance`.
+    """
+    deadline = settings.INSIGHT_DEADLINE_SECONDS
+    results = []
+    for user_id, frame, budget_amount, baselines, forecast in items:
+        run = StageRun(f"insights batch user={user_id}", deadline=deadline)
+        try:
+            specs = detect_insights(frame, budget_amount, now, baselines, forecast, run)
+            results.append((user_id, specs, regenerated_scopes(now, run.skipped)))
+        except Exception as e:
+            logger.error(f"Insight detection error for user {user_id}: {e}", exc_info=True)
+            results.append((user_id, None, []))
+        run.log(level=logging.DEBUG)
+    return results
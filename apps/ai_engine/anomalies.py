@@ -0,0 +1,77 @@
+"""
+Real-time anomaly flagging - scores an expense as it is written
+
+The amount is compared with its category's precomputed baseline
+(analytics.spending_stats), one indexed lookup and no expense history,
+before the write updates that baseline. Anomalies are persisted as a
+SpendingInsight immediately instead of waiting for the next regeneration.
+Their fingerprints have a namespace of their own (see flagged_fingerprint()),
+so the regeneration neither overwrites their message nor prunes them; it
+skips the expenses already flagged here instead of adding a second insight.
+"""
+import logging
+import time
+from typing import Dict, Optional
+
+from apps.analytics import spending_stats
+from .insights import upsert_insights
+from .models import SpendingInsight, insight_fingerprint
+
+logger = logging.getLogger(__name__)
+perf_logger = logging.getLogger("performance")
+
+
+def score_expense(user_id, category_id, amount) -> Optional[spending_stats.Baseline]:
+    """The category baseline if `amount` is anomalous against it, else None"""
+    started = time.perf_counter()
+    base = spending_stats.category_baseline(user_id, category_id)
+    anomalous = spending_stats.is_anomalous(base, float(amount))
+    perf_logger.debug(
+        "anomaly score user=%s %.2fms anomalous=%s",
+        user_id, (time.perf_counter() - started) * 1000, anomalous,
+    )
+    return base if anomalous else None
+
+
+def flagged_fingerprint(expense) -> str:
+    """Fingerprint of the real-time anomaly insight for `expense`"""
+    period = expense.expense_date
+    return insight_fingerprint('flagged-anomaly', period.year, period.month, expense.id)
+
+
+def without_flagged(expenses: Dict) -> Dict:
+    """`expenses` (id -> Expense) minus those already flagged by record_anomaly(), one query"""
+    if not expenses:
+        return expenses
+    flagged = set(
+        SpendingInsight.objects.filter(
+            user_id__in={expense.user_id for expense in expenses.values()},
+            fingerprint__in=[flagged_fingerprint(expense) for expense in expenses.values()],
+        ).values_list('user_id', 'fingerprint')
+    )
+    return {
+        expense_id: expense for expense_id, expense in expenses.items()
+        if (expense.user_id, flagged_fingerprint(expense)) not in flagged
+    }
+
+
+def record_anomaly(expense, base: spending_stats.Baseline) -> SpendingInsight:
+    """Persist an anomaly insight for an expense flagged by score_expense()"""
+    period = expense.expense_date
+    insight = SpendingInsight(
+        user_id=expense.user_id,
+        insight_type='anomaly',
+        severity='warning',
+        title=f'Unusual expense detected: ₹{expense.amount}',
+        message=(
+            f'{expense.title} (₹{expense.amount}) is significantly higher than your usual '
+            f'{expense.category.name} spending (average ₹{base.mean:.2f}).'
+        ),
+        actual_amount=expense.amount,
+        applies_to_month=period.month,
+        applies_to_year=period.year,
+        fingerprint=flagged_fingerprint(expense),
+    )
+    upsert_insights([insight])
+    logger.info(f"Flagged anomalous expense {expense.id} for user {expense.user_id}")
+    return insight
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AiEngineConfig(AppConfig):
     name = 'apps.ai_engine'
+
+    def ready(self):
+        # Queue insight regeneration whenever an expense changes
+        from . import signals  # noqa: F401
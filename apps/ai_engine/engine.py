@@ -0,0 +1,276 @@
+"""
+Insight Engine - every detector computed from one per-user expense frame
+
+load_frame() reads a user's trailing months of (date, category, amount) once,
+into numpy arrays (load_frames() does the same for a batch of users). The detectors below are pure functions over that frame (no
+database access), so they're cheap to unit-test and share a single query:
+
+    frame = load_frame(user, months=forecast_months())
+    forecast = forecast_from_frame(frame, forecast_months())
+    matrix = category_month_matrix(frame, trend_months())
+
+ai_service.generate_insights_for_user() is built on top of this module.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from apps.analytics.spending_stats import ANOMALY_Z_SCORE, MIN_SAMPLES
+from apps.expenses import periods
+from apps.expenses.models import Category, Expense
+
+# Trailing days whose burn rate is blended into month-end projections
+BURN_RATE_RECENT_DAYS = 7
+
+
+class ExpenseFrame(NamedTuple):
+    """Columnar view of a user's expenses, newest first"""
+    ids: np.ndarray           # object: expense UUIDs
+    dates: np.ndarray         # datetime64[D]
+    category_codes: np.ndarray  # int64: index into `category_ids`
+    amounts: np.ndarray       # float64
+    category_ids: List        # Category UUIDs, ordered by name
+    category_names: List[str]
+
+
+def month_code(year: int, month: int) -> int:
+    """Months since 1970-01, matching datetime64[M] integer values"""
+    return (year - 1970) * 12 + (month - 1)
+
+
+def _build_frame(rows: List[Tuple], categories: List[Tuple], wanted: set) -> ExpenseFrame:
+    """ExpenseFrame from (id, date, category_id, amount) rows and (id, name) categories"""
+    category_index = {category_id: i for i, (category_id, _) in enumerate(categories)}
+
+    ids = np.empty(len(rows), dtype=object)
+    ids[:] = [row[0] for row in rows]
+    dates = np.array([row[1] for row in rows], dtype="datetime64[D]")
+    category_codes = np.array([category_index[row[2]] for row in rows], dtype=np.int64)
+    amounts = np.array([float(row[3]) for row in rows], dtype=np.float64)
+
+    keep = np.isin(dates.astype("datetime64[M]").astype(np.int64), list(wanted))
+    return ExpenseFrame(
+        ids=ids[keep],
+        dates=dates[keep],
+        category_codes=category_codes[keep],
+        amounts=amounts[keep],
+        category_ids=[category_id for category_id, _ in categories],
+        category_names=[name for _, name in categories],
+    )
+
+
+def load_frames(user_ids: Iterable, months: Iterable[Tuple[int, int]]) -> Dict:
+    """
+    {user_id: ExpenseFrame} for the given (year, month) pairs, for any number
+    of users in two queries (categories, then expenses).
+    """
+    user_ids = list(user_ids)
+    months = list(months)
+    first, last = min(months), max(months)
+    window = periods.months(*first, periods.month_index(*last) - periods.month_index(*first) + 1)
+    wanted = {month_code(year, month) for year, month in months}
+
+    categories = defaultdict(list)
+    for user_id, category_id, name in (
+        Category.objects.filter(user_id__in=user_ids)
+        .order_by("user_id", "name", "id")
+        .values_list("user_id", "id", "name")
+    ):
+        categories[user_id].append((category_id, name))
+
+    rows = defaultdict(list)
+    for user_id, *row in (
+        Expense.objects.filter(window.q(), user_id__in=user_ids, is_deleted=False)
+        .order_by("user_id", "-expense_date", "-created_at")
+        .values_list("user_id", "id", "expense_date", "category_id", "amount")
+    ):
+        rows[user_id].append(row)
+
+    return {
+        user_id: _build_frame(rows[user_id], categories[user_id], wanted)
+        for user_id in user_ids
+    }
+
+
+def load_frame(user, months: Iterable[Tuple[int, int]]) -> ExpenseFrame:
+    """Load one user's expenses for the given (year, month) pairs and all of their categories"""
+    return load_frames([user.pk], months)[user.pk]
+
+
+# ======================================
+# DETECTORS (pure functions)
+# ======================================
+def _month_codes(frame: ExpenseFrame) -> np.ndarray:
+    return frame.dates.astype("datetime64[M]").astype(np.int64)
+
+
+def monthly_totals(frame: ExpenseFrame, months: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """Total spending for each of `months`, in the given order"""
+    codes = _month_codes(frame)
+    return np.array(
+        [frame.amounts[codes == month_code(*key)].sum() for key in months],
+        dtype=np.float64,
+    )
+
+
+def category_month_matrix(frame: ExpenseFrame, months: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """(categories x months) spending matrix; rows follow frame.category_ids"""
+    codes = _month_codes(frame)
+    columns = [
+        np.bincount(
+            frame.category_codes[codes == month_code(*key)],
+            weights=frame.amounts[codes == month_code(*key)],
+            minlength=len(frame.category_ids),
+        )
+        for key in months
+    ]
+    if not columns:
+        return np.zeros((len(frame.category_ids), 0), dtype=np.float64)
+    return np.column_stack(columns)
+
+
+def forecast_from_frame(frame: ExpenseFrame, months: Sequence[Tuple[int, int]]) -> float:
+    """Moving average of the monthly totals for `months`"""
+    if not len(months):
+        return 0.0
+    return float(monthly_totals(frame, months).mean())
+
+
+def anomaly_mask(amounts: np.ndarray, sigmas: float = 2.0) -> np.ndarray:
+    """Amounts more than `sigmas` (population) standard deviations above the mean"""
+    if not len(amounts):
+        return np.zeros(0, dtype=bool)
+    return amounts > amounts.mean() + sigmas * amounts.std()
+
+
+def baseline_arrays(frame: ExpenseFrame, baselines: Dict) -> Tuple[np.ndarray, ...]:
+    """
+    (count, mean, std, recent_p95) arrays aligned with frame.category_ids, from
+    {category_id: spending_stats.Baseline}. Missing categories get count 0,
+    a missing p95 is NaN.
+    """
+    rows = [baselines.get(category_id) for category_id in frame.category_ids]
+    count = np.array([b.count if b else 0 for b in rows], dtype=np.int64)
+    mean = np.array([b.mean if b else 0.0 for b in rows], dtype=np.float64)
+    std = np.array([b.std if b else 0.0 for b in rows], dtype=np.float64)
+    p95 = np.array(
+        [b.recent_p95 if b and b.recent_p95 is not None else np.nan for b in rows],
+        dtype=np.float64,
+    )
+    return count, mean, std, p95
+
+
+def category_anomaly_mask(amounts: np.ndarray, count: np.ndarray, mean: np.ndarray,
+                          std: np.ndarray, p95: np.ndarray) -> np.ndarray:
+    """
+    Vectorized spending_stats.is_anomalous(): each amount against its own
+    category's baseline (arrays aligned element-wise with `amounts`)
+    """
+    return (
+        (count >= MIN_SAMPLES)
+        & (amounts > mean + ANOMALY_Z_SCORE * std)
+        & (np.isnan(p95) | (amounts > p95))
+    )
+
+
+def month_anomalies(frame: ExpenseFrame, year: int, month: int,
+                    baselines: Optional[Dict] = None) -> List[Dict]:
+    """
+    Anomalous expenses of one month, newest first: expense_id, amount, deviation.
+    With `baselines` ({category_id: Baseline}) each expense is judged against its
+    own category; without, against the month's pooled amounts.
+    """
+    in_month = _month_codes(frame) == month_code(year, month)
+    amounts = frame.amounts[in_month]
+
+    if baselines is None:
+        mask = anomaly_mask(amounts)
+        mean = np.full(len(amounts), amounts.mean() if len(amounts) else 0.0)
+    else:
+        codes = frame.category_codes[in_month]
+        count, means, std, p95 = baseline_arrays(frame, baselines)
+        mean = means[codes]
+        mask = category_anomaly_mask(amounts, count[codes], mean, std[codes], p95[codes])
+
+    return [
+        {'expense_id': expense_id, 'amount': amount, 'deviation': amount - expected}
+        for expense_id, amount, expected in zip(
+            frame.ids[in_month][mask], amounts[mask].tolist(), mean[mask].tolist()
+        )
+    ]
+
+
+def daily_totals(frame: ExpenseFrame, period: periods.Period) -> np.ndarray:
+    """Dense spending per day of `period` (index 0 = period.start), zero-filled"""
+    offsets = (frame.dates - np.datetime64(period.start, "D")).astype(np.int64)
+    inside = (offsets >= 0) & (offsets < period.days)
+    return np.bincount(offsets[inside], weights=frame.amounts[inside], minlength=period.days)
+
+
+def projected_month_spend(daily: np.ndarray, day: int) -> float:
+    """
+    Month-end spending projected from a month's dense daily totals (one entry
+    per calendar day) as of `day`. The remaining days are projected at the mean
+    of the month-to-date and the last BURN_RATE_RECENT_DAYS daily rates, so a
+    recent speed-up or slowdown shows before it dominates the monthly average.
+    """
+    day = min(day, len(daily))
+    spent = float(daily[:day].sum())
+    if day == 0:
+        return spent
+    recent = daily[max(0, day - BURN_RATE_RECENT_DAYS):day]
+    rate = (spent / day + float(recent.mean())) / 2
+    return spent + rate * (len(daily) - day)
+
+
+def budget_risk_score(daily: np.ndarray, budget_amount: float, day: int) -> int:
+    """
+    Risk score (0-100) of exceeding the budget, from the month's dense daily
+    totals (len(daily) = days in the month) as of `day`
+    """
+    if day == 0 or budget_amount <= 0:
+        return 0
+
+    projected_spending = projected_month_spend(daily, day)
+    percentage = (projected_spending / budget_amount) * 100
+
+    # Risk score: 0-49 = low, 50-79 = medium, 80-100 = high
+    if percentage <= 80:
+        return int(percentage * 0.5)  # Map to 0-40
+    if percentage <= 100:
+        return int(40 + ((percentage - 80) * 2))  # Map to 40-80
+    return min(100, int(80 + ((percentage - 100) * 0.5)))  # Map to 80-100
+
+
+def category_trends(matrix: np.ndarray) -> List[Dict]:
+    """
+    Trend per matrix row, comparing the first (most recent) month column with
+    the last (oldest) one: trend direction and percentage change.
+    """
+    if matrix.shape[1] < 2:
+        return [{'trend': 'stable', 'change': 0} for _ in range(matrix.shape[0])]
+
+    recent = matrix[:, 0]
+    older = matrix[:, -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(older > 0, (recent - older) / older * 100, 100.0)
+
+    trends = []
+    for recent_amount, older_amount, change_pct in zip(recent.tolist(), older.tolist(), change.tolist()):
+        if older_amount == 0:
+            trends.append({'trend': 'new', 'change': 100})
+            continue
+        if change_pct > 10:
+            trend = 'increasing'
+        elif change_pct < -10:
+            trend = 'decreasing'
+        else:
+            trend = 'stable'
+        trends.append({
+            'trend': trend,
+            'change': round(change_pct, 1),
+            'recent_amount': recent_amount,
+            'older_amount': older_amount,
+        })
+    return trends
@@ -0,0 +1,119 @@
+"""
+Forecast models - pure functions over a dense monthly spending series
+
+Imported lazily by forecasting.refit(): this is the only forecasting code that
+needs numpy (and scikit-learn, for the seasonal model).
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .forecasting import FORECAST_HORIZON
+from .models import SpendingForecast
+
+MIN_SMOOTHING_MONTHS = 3
+MIN_SEASONAL_MONTHS = 24
+SEASONAL_HOLDOUT_MONTHS = 6
+
+HOLT_ALPHAS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+HOLT_BETAS = (0.05, 0.1, 0.2, 0.3)
+HOLT_DAMPING = 0.9
+
+
+def dense_series(points: Dict[int, float], through_index: int) -> Tuple[np.ndarray, int]:
+    """Zero-filled series from the first month with data through `through_index`"""
+    if not points:
+        return np.zeros(0), through_index + 1
+    start = min(points)
+    return np.array([points.get(i, 0.0) for i in range(start, through_index + 1)]), start
+
+
+def _holt_run(series: np.ndarray, alpha: float, beta: float, phi: float) -> Tuple[float, float, float]:
+    """(level, trend, one-step-ahead SSE) after running over the series"""
+    level = series[0]
+    trend = series[1] - series[0]
+    sse = 0.0
+    for value in series[1:]:
+        predicted = level + phi * trend
+        sse += (value - predicted) ** 2
+        new_level = alpha * value + (1 - alpha) * predicted
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+    return level, trend, sse
+
+
+def fit_holt(series: np.ndarray) -> Dict:
+    """Damped Holt parameters minimising one-step-ahead squared error"""
+    best = None
+    for alpha in HOLT_ALPHAS:
+        for beta in HOLT_BETAS:
+            level, trend, sse = _holt_run(series, alpha, beta, HOLT_DAMPING)
+            if best is None or sse < best[0]:
+                best = (sse, alpha, beta, level, trend)
+    _, alpha, beta, level, trend = best
+    return {'alpha': alpha, 'beta': beta, 'phi': HOLT_DAMPING, 'level': level, 'trend': trend}
+
+
+def predict_holt(params: Dict, horizon: int) -> List[float]:
+    predictions = []
+    damped = 0.0
+    for h in range(1, horizon + 1):
+        damped += params['phi'] ** h
+        predictions.append(params['level'] + damped * params['trend'])
+    return predictions
+
+
+def _seasonal_features(indexes: np.ndarray) -> np.ndarray:
+    """Linear trend plus month-of-year indicators"""
+    months = indexes % 12
+    return np.column_stack([indexes - indexes[0], np.eye(12)[months]])
+
+
+def fit_seasonal(series: np.ndarray, start_index: int) -> Dict:
+    """Ridge regression on trend + month of year"""
+    from sklearn.linear_model import Ridge
+
+    indexes = np.arange(start_index, start_index + len(series))
+    model = Ridge(alpha=1.0).fit(_seasonal_features(indexes), series)
+    return {
+        'start_index': start_index,
+        'intercept': float(model.intercept_),
+        'coef': [float(c) for c in model.coef_],
+    }
+
+
+def predict_seasonal(params: Dict, first_index: int, horizon: int) -> List[float]:
+    indexes = np.arange(first_index, first_index + horizon)
+    features = np.column_stack([indexes - params['start_index'], np.eye(12)[indexes % 12]])
+    return (features @ np.array(params['coef']) + params['intercept']).tolist()
+
+
+def fit_series(series: np.ndarray, start_index: int, horizon: int = FORECAST_HORIZON) -> Tuple[str, Dict, List[float]]:
+    """
+    Choose and fit a model for a dense monthly series starting at `start_index`.
+    Returns (method, params, predictions for the `horizon` following months).
+    """
+    if len(series) < MIN_SMOOTHING_MONTHS:
+        mean = float(series.mean()) if len(series) else 0.0
+        return SpendingForecast.METHOD_MEAN, {'mean': mean}, [mean] * horizon
+
+    next_index = start_index + len(series)
+    method = SpendingForecast.METHOD_HOLT
+    params = fit_holt(series)
+
+    if len(series) >= MIN_SEASONAL_MONTHS:
+        train, test = series[:-SEASONAL_HOLDOUT_MONTHS], series[-SEASONAL_HOLDOUT_MONTHS:]
+        test_start = next_index - SEASONAL_HOLDOUT_MONTHS
+        holt_error = np.abs(predict_holt(fit_holt(train), len(test)) - test).mean()
+        seasonal_error = np.abs(
+            predict_seasonal(fit_seasonal(train, start_index), test_start, len(test)) - test
+        ).mean()
+        if seasonal_error < holt_error:
+            method = SpendingForecast.METHOD_SEASONAL
+            params = fit_seasonal(series, start_index)
+
+    if method == SpendingForecast.METHOD_SEASONAL:
+        predictions = predict_seasonal(params, next_index, horizon)
+    else:
+        predictions = predict_holt(params, horizon)
+    return method, params, [max(0.0, p) for p in predictions]
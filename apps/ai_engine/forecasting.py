@@ -0,0 +1,221 @@
+"""
+Forecasting - persisted per-user (and optionally per-category) spending models
+
+Monthly totals come from the spending rollups, up to the last closed month.
+Each series is fitted once and stored in SpendingForecast together with its
+predictions for the next FORECAST_HORIZON months:
+
+- fewer than MIN_SMOOTHING_MONTHS months: mean of the closed months
+- otherwise: damped Holt exponential smoothing, alpha/beta by grid search
+- at least MIN_SEASONAL_MONTHS months: also a seasonal regression
+  (trend + month of year); whichever has the lower holdout error is kept
+
+A fit is reused until a new month closes or an expense in a closed month is
+written (expense_changed marks it stale), so serving a forecast is a lookup.
+Requests serve the stored fit even when it is out of date
+(refit_outdated=False); the insight worker and `manage.py refit_forecasts`
+refit out-of-date users (see outdated_users). The models themselves live in
+forecast_models.py, imported only when a refit runs, so web workers never
+load numpy.
+"""
+import datetime
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q, QuerySet, Sum
+from django.utils import timezone
+
+from apps.analytics.models import MonthlySpendingRollup
+from apps.expenses import user_cache
+from apps.expenses.periods import add_months, from_month_index, month_index
+from .models import SpendingForecast
+
+logger = logging.getLogger(__name__)
+
+FORECAST_HORIZON = 3
+MAX_HISTORY_MONTHS = 60
+
+
+def last_closed_month(now=None) -> Tuple[int, int]:
+    """(year, month) of the month before the current one"""
+    now = now or timezone.now()
+    return add_months(now.year, now.month, -1)
+
+
+def _key(year: int, month: int) -> str:
+    return f"{year:04d}-{month:02d}"
+
+
+# ======================================
+# PERSISTENCE AND SERVING
+# ======================================
+def _per_category() -> bool:
+    return getattr(settings, 'FORECAST_PER_CATEGORY', False)
+
+
+def _monthly_series(user_ids: List, through: Tuple[int, int], per_category: bool) -> Dict:
+    """
+    {(user_id, category_id or None): {month_index: total}} up to `through`,
+    in one grouped query (two with per-category series)
+    """
+    through_index = month_index(*through)
+    first_year, _ = from_month_index(through_index - MAX_HISTORY_MONTHS + 1)
+    rollups = MonthlySpendingRollup.objects.filter(
+        Q(year__lt=through[0]) | Q(year=through[0], month__lte=through[1]),
+        user_id__in=user_ids,
+        year__gte=first_year,
+    )
+
+    groupings = [('user_id', None)]
+    if per_category:
+        groupings.append(('user_id', 'category_id'))
+
+    series = defaultdict(dict)
+    for fields in groupings:
+        columns = [f for f in fields if f]
+        for row in rollups.values(*columns, 'year', 'month').annotate(amount=Sum('total')).order_by():
+            index = month_index(row['year'], row['month'])
+            if index > through_index - MAX_HISTORY_MONTHS:
+                series[(row['user_id'], row.get('category_id'))][index] = float(row['amount'])
+    return series
+
+
+def refit(user_ids: Iterable, now=None) -> int:
+    """Refit and store every forecast of the given users. Returns forecasts written."""
+    user_ids = list(user_ids)
+    through = last_closed_month(now)
+    through_index = month_index(*through)
+    per_category = _per_category()
+    series = _monthly_series(user_ids, through, per_category)
+
+    subjects = {(user_id, None) for user_id in user_ids} | set(series)
+    existing = {
+        (f.user_id, f.category_id): f
+        for f in SpendingForecast.objects.filter(user_id__in=user_ids)
+    }
+
+    # numpy (and scikit-learn for seasonal fits) load here, not when serving stored fits
+    from .forecast_models import dense_series, fit_series
+
+    to_create, to_update = [], []
+    for subject in subjects:
+        values, start = dense_series(series.get(subject, {}), through_index)
+        method, params, predictions = fit_series(values, start)
+        forecast = existing.get(subject) or SpendingForecast(user_id=subject[0], category_id=subject[1])
+        forecast.method = method
+        forecast.params = params
+        forecast.fitted_through = datetime.date(through[0], through[1], 1)
+        forecast.predictions = {
+            _key(*from_month_index(through_index + h)): round(value, 2)
+            for h, value in enumerate(predictions, start=1)
+        }
+        forecast.is_stale = False
+        forecast.fitted_at = timezone.now()
+        (to_update if subject in existing else to_create).append(forecast)
+
+    fields = ['method', 'params', 'fitted_through', 'predictions', 'is_stale', 'fitted_at']
+    try:
+        with transaction.atomic():
+            SpendingForecast.objects.bulk_create(to_create, batch_size=500)
+            SpendingForecast.objects.bulk_update(to_update, fields, batch_size=500)
+    except IntegrityError:
+        # A concurrent refit created some of the same rows: upsert one by one
+        with transaction.atomic():
+            for forecast in to_create + to_update:
+                SpendingForecast.objects.update_or_create(
+                    user_id=forecast.user_id,
+                    category_id=forecast.category_id,
+                    defaults={field: getattr(forecast, field) for field in fields},
+                )
+
+    # Cached dashboards embed the forecast
+    for user_id in user_ids:
+        user_cache.invalidate_user(user_id)
+
+    logger.info(f"Refit {len(subjects)} forecasts for {len(user_ids)} users")
+    return len(subjects)
+
+
+def outdated_users(users: QuerySet, now=None) -> QuerySet:
+    """Users in `users` without a total forecast fitted through the last closed month"""
+    year, month = last_closed_month(now)
+    fresh = Q(
+        forecasts__category__isnull=True,
+        forecasts__is_stale=False,
+        forecasts__fitted_through=datetime.date(year, month, 1),
+    )
+    return users.exclude(id__in=users.model.objects.filter(fresh).values('id'))
+
+
+def _needs_refit(forecast: Optional[SpendingForecast], through: Tuple[int, int]) -> bool:
+    return (
+        forecast is None
+        or forecast.is_stale
+        or (forecast.fitted_through.year, forecast.fitted_through.month) != through
+    )
+
+
+def get_forecasts(user_ids: Iterable, now=None, months_ahead: int = 1,
+                  refit_outdated: bool = True) -> Dict:
+    """
+    {user_id: Decimal} total spending forecast for the month `months_ahead`
+    after the current one, refitting only the users whose fit is out of date.
+    With refit_outdated=False, out-of-date fits are served as stored and users
+    without a fit get 0.
+    """
+    now = now or timezone.now()
+    user_ids = list(user_ids)
+    through = last_closed_month(now)
+
+    forecasts = {
+        f.user_id: f
+        for f in SpendingForecast.objects.filter(user_id__in=user_ids, category__isnull=True)
+    }
+    outdated = [user_id for user_id in user_ids if _needs_refit(forecasts.get(user_id), through)]
+    if outdated and refit_outdated:
+        refit(outdated, now)
+        forecasts.update(
+            (f.user_id, f)
+            for f in SpendingForecast.objects.filter(user_id__in=outdated, category__isnull=True)
+        )
+
+    key = _key(*add_months(now.year, now.month, months_ahead))
+    return {
+        user_id: Decimal(str(
+            forecasts[user_id].predictions.get(key, 0) if user_id in forecasts else 0
+        )).quantize(Decimal('0.01'))
+        for user_id in user_ids
+    }
+
+
+def get_forecast(user, now=None, months_ahead: int = 1, refit_outdated: bool = True) -> Decimal:
+    """Next month's spending forecast for one user (a row lookup unless a refit is due)"""
+    return get_forecasts([user.pk], now, months_ahead, refit_outdated)[user.pk]
+
+
+def get_category_forecasts(user, now=None, months_ahead: int = 1) -> Dict:
+    """{category_id: Decimal} forecasts; empty unless FORECAST_PER_CATEGORY is on"""
+    if not _per_category():
+        return {}
+    now = now or timezone.now()
+    get_forecasts([user.pk], now)  # Refits every series of the user if due
+    key = _key(*add_months(now.year, now.month, months_ahead))
+    return {
+        f.category_id: Decimal(str(f.predictions.get(key, 0))).quantize(Decimal('0.01'))
+        for f in SpendingForecast.objects.filter(user=user, category__isnull=False)
+    }
+
+
+def mark_stale_for_change(user_id, before, after, now=None) -> None:
+    """Flag a user's forecasts for refit if an expense write touched a closed month"""
+    if before == after:
+        return
+    now = now or timezone.now()
+    current = month_index(now.year, now.month)
+    touched = [s.expense_date for s in (before, after) if s is not None]
+    if any(month_index(d.year, d.month) < current for d in touched):
+        SpendingForecast.objects.filter(user_id=user_id, is_stale=False).update(is_stale=True)
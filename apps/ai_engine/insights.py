@@ -0,0 +1,56 @@
+"""
+Insight Storage - writing SpendingInsight rows
+
+Kept apart from ai_service (which loads numpy through the engine) so the
+request path, e.g. real-time anomaly flagging in anomalies.py, can write
+insights without importing the numeric libraries.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+from typing import Dict, List
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SpendingInsight
+
+
+def upsert_insights(insights: List[SpendingInsight], batch_size: int = 1000) -> List[SpendingInsight]:
+    """
+    Write insights, refreshing any existing row with the same (user, fingerprint)
+    instead of adding a duplicate. Old rows are removed by prune_insights(), not here.
+    """
+    return SpendingInsight.objects.bulk_create(
+        insights,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'fingerprint'],
+        update_fields=SpendingInsight.UPSERT_FIELDS,
+    )
+
+
+def replace_insights(insights: List[SpendingInsight], scopes: Dict[int, List[str]]) -> List[SpendingInsight]:
+    """
+    Upsert a regeneration's insights and, in the same transaction, delete the
+    rows it no longer produces. `scopes` maps each regenerated user to the
+    fingerprint prefixes (type and period) the run covered; rows under those
+    prefixes that this upsert didn't refresh are stale, e.g. a budget risk
+    whose budget has since been raised.
+    """
+    users_by_scope = defaultdict(list)
+    for user_id, prefixes in scopes.items():
+        if prefixes:
+            users_by_scope[tuple(sorted(prefixes))].append(user_id)
+
+    with transaction.atomic():
+        written_at = timezone.now()
+        written = upsert_insights(insights)
+        for prefixes, user_ids in users_by_scope.items():
+            SpendingInsight.objects.filter(
+                reduce(or_, (Q(fingerprint__startswith=prefix) for prefix in prefixes)),
+                user_id__in=user_ids,
+                updated_at__lt=written_at,
+            ).delete()
+    return written
@@ -0,0 +1,173 @@
+"""
+Insight Job Queue - DB-backed, debounced insight regeneration
+
+Writes that change a user's spending enqueue a job; `manage.py run_insight_worker`
+claims due jobs and regenerates that user's SpendingInsight rows off the request path.
+A failed regeneration is retried with exponential backoff up to
+INSIGHT_JOB_MAX_ATTEMPTS runs, then kept as `failed` until the user's next
+write enqueues a fresh job, which replaces it.
+"""
+import logging
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.expenses import user_cache
+from . import limits
+from .models import InsightJob
+
+logger = logging.getLogger(__name__)
+
+
+def _debounce() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'INSIGHT_JOB_DEBOUNCE_SECONDS', 30))
+
+
+def _max_delay() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'INSIGHT_JOB_MAX_DELAY_SECONDS', 300))
+
+
+def _stale_after() -> timedelta:
+    return timedelta(seconds=getattr(settings, 'INSIGHT_JOB_STALE_SECONDS', 600))
+
+
+def _max_attempts() -> int:
+    return getattr(settings, 'INSIGHT_JOB_MAX_ATTEMPTS', 3)
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next run of a job that failed `attempts` times"""
+    base = getattr(settings, 'INSIGHT_JOB_RETRY_SECONDS', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def enqueue_insight_refresh(user_id) -> None:
+    """
+    Schedule an insight regeneration for a user.
+
+    Repeated calls while a job is pending push its deadline forward by the
+    debounce interval, but never beyond INSIGHT_JOB_MAX_DELAY_SECONDS after the
+    job was first enqueued, so a steady stream of writes can't starve it.
+    """
+    now = timezone.now()
+    run_after = now + _debounce()
+
+    pending = InsightJob.objects.filter(user_id=user_id, status=InsightJob.STATUS_PENDING)
+    if pending.filter(created_at__gte=now - _max_delay() + _debounce()).update(run_after=run_after):
+        return
+    if pending.exists():
+        # Old pending job is due soon and will see this write too
+        return
+
+    try:
+        with transaction.atomic():
+            InsightJob.objects.create(user_id=user_id, run_after=run_after)
+    except IntegrityError:
+        # Another request enqueued the job concurrently
+        return
+    # The new job supersedes one that gave up
+    InsightJob.objects.filter(user_id=user_id, status=InsightJob.STATUS_FAILED).delete()
+
+
+def enqueue_insight_refresh_on_commit(user_id) -> None:
+    """Enqueue once the current transaction commits, so the worker sees the write"""
+    transaction.on_commit(lambda: enqueue_insight_refresh(user_id))
+
+
+def claim_due_jobs(limit: int = 10) -> List[InsightJob]:
+    """
+    Atomically claim up to `limit` due jobs for this worker.
+    Jobs left running by a crashed worker are reclaimed after INSIGHT_JOB_STALE_SECONDS.
+    """
+    now = timezone.now()
+    due = (
+        Q(status=InsightJob.STATUS_PENDING, run_after__lte=now)
+        | Q(status=InsightJob.STATUS_RUNNING, started_at__lt=now - _stale_after())
+    )
+
+    with transaction.atomic():
+        jobs = list(
+            InsightJob.objects.select_for_update(skip_locked=True)
+            .filter(due)
+            .select_related('user')
+            .order_by('run_after')[:limit]
+        )
+        if jobs:
+            InsightJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=InsightJob.STATUS_RUNNING,
+                started_at=now,
+                attempts=F('attempts') + 1,
+            )
+            for job in jobs:
+                job.status, job.started_at, job.attempts = InsightJob.STATUS_RUNNING, now, job.attempts + 1
+    return jobs
+
+
+def _requeue(job: InsightJob, run_after, **fields) -> None:
+    """
+    Put a claimed job back to pending at `run_after`. A write during the run may
+    already have enqueued a pending job for the user (only one may exist); then
+    that job takes over, no earlier than `run_after`, and this one is dropped.
+    """
+    try:
+        with transaction.atomic():
+            InsightJob.objects.filter(id=job.id).update(
+                status=InsightJob.STATUS_PENDING, run_after=run_after, **fields
+            )
+    except IntegrityError:
+        InsightJob.objects.filter(
+            user_id=job.user_id, status=InsightJob.STATUS_PENDING, run_after__lt=run_after
+        ).update(run_after=run_after)
+        InsightJob.objects.filter(id=job.id).delete()
+
+
+def run_insight_job(job: InsightJob) -> int:
+    """
+    Regenerate insights for the job's user (upserted over the previous set).
+    Returns the number of insights generated; the job row is removed on success.
+
+    Each run takes a token from the user's plan-sized rate limit and spends one
+    AI credit (see limits.py). Rate-limited jobs go back to pending until a
+    token is due; without credits the job is dropped and the previous insights
+    stay in place. Failed runs are retried with backoff, then marked failed.
+    """
+    from .ai_service import generate_insights_for_user
+
+    user = job.user
+    wait = limits.take_token(user)
+    if wait:
+        # Waiting for a token is not a failed attempt
+        _requeue(job, timezone.now() + timedelta(seconds=wait), attempts=F('attempts') - 1)
+        logger.info(f"Insight job for user {user.email} rate limited, retrying in {wait:.0f}s")
+        return 0
+
+    if not limits.spend_credit(user.id):
+        job.delete()
+        logger.info(f"Insight job for user {user.email} dropped: no AI credits left")
+        return 0
+
+    try:
+        insights = generate_insights_for_user(user)
+    except Exception as e:
+        limits.refund_credit(user.id)
+        logger.error(f"Insight job failed for user {user.email} (attempt {job.attempts}): {e}", exc_info=True)
+        if job.attempts < _max_attempts():
+            _requeue(job, timezone.now() + _retry_delay(job.attempts), last_error=str(e))
+        else:
+            InsightJob.objects.filter(id=job.id).update(
+                status=InsightJob.STATUS_FAILED,
+                last_error=str(e),
+            )
+        return 0
+
+    job.delete()
+
+    # Dashboard entries embed the insight list
+    user_cache.invalidate_user(user.id)
+
+    logger.info(f"Insight job done for user {user.email}: {len(insights)} insights")
+    return len(insights)
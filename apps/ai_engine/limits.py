@@ -0,0 +1,77 @@
+"""
+Per-user limits on insight regeneration
+
+Two checks run before the worker regenerates a user's insights:
+
+- a token bucket in the shared cache, sized by `subscription_plan`
+  (INSIGHT_REFRESH_LIMITS), which smooths bursts: a job that finds the bucket
+  empty is pushed back until the next token is due rather than dropped;
+- `ai_credits`, decremented with an F() expression guarded by `ai_credits > 0`,
+  so concurrent workers can never spend below zero. With no credits left the
+  job is dropped and the last persisted insights keep being served.
+
+The bucket is a read-modify-write on the cache, not an atomic operation. Two
+workers can run jobs for the same user at once (one pending job per user is
+enforced, but a write during a run enqueues another), so a concurrent take may
+be lost and a burst can exceed the bucket by a token. Credits, which cost
+money, are spent atomically.
+"""
+import time
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+
+DEFAULT_PLAN = "free"
+
+
+def _bucket_key(user_id) -> str:
+    return f"insight_bucket:{user_id}"
+
+
+def plan_limits(plan: str) -> Tuple[int, float]:
+    """(burst capacity, tokens refilled per hour) for a plan; unknown plans get the free tier"""
+    limits = settings.INSIGHT_REFRESH_LIMITS
+    capacity, per_hour = limits.get(plan) or limits[DEFAULT_PLAN]
+    return capacity, per_hour
+
+
+def take_token(user, now: Optional[float] = None) -> float:
+    """
+    Take one regeneration token from the user's bucket.
+    Returns 0 on success, otherwise the seconds until a token is available.
+    """
+    capacity, per_hour = plan_limits(user.subscription_plan)
+    rate = per_hour / 3600
+    now = time.time() if now is None else now
+    key = _bucket_key(user.id)
+
+    # A missing key is a full bucket: entries expire once they would have refilled
+    tokens, updated = cache.get(key) or (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+
+    if tokens < 1:
+        wait = (1 - tokens) / rate
+    else:
+        tokens -= 1
+        wait = 0.0
+    cache.set(key, (tokens, now), int((capacity - tokens) / rate) + 1)
+    return wait
+
+
+def reset_bucket(user_id) -> None:
+    cache.delete(_bucket_key(user_id))
+
+
+def spend_credit(user_id) -> bool:
+    """Atomically take one AI credit; False when the user has none left"""
+    User = get_user_model()
+    return User.objects.filter(pk=user_id, ai_credits__gt=0).update(ai_credits=F('ai_credits') - 1) == 1
+
+
+def refund_credit(user_id) -> None:
+    """Give back a credit spent on a regeneration that failed"""
+    User = get_user_model()
+    User.objects.filter(pk=user_id).update(ai_credits=F('ai_credits') + 1)
@@ -0,0 +1,92 @@
+"""
+Management command to benchmark insight detectors for one user
+Usage: python manage.py bench_insight_engine --user=email@example.com [--iterations=20]
+
+Compares the query-per-detector functions in ai_service (forecast, risk,
+anomalies, one trend query per category) with the engine, which loads one
+expense frame and runs every detector on it. Nothing is written.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.ai_engine import ai_service, engine, forecasting
+from apps.analytics import spending_stats
+from apps.expenses.models import Category, MonthlyBudget
+
+User = get_user_model()
+
+
+def _legacy(user):
+    ai_service.forecast_next_month_spending(user)
+    ai_service.calculate_budget_risk_score(user)
+    ai_service.detect_spending_anomalies(user)
+    for category in Category.objects.filter(user=user):
+        ai_service.analyze_category_trends(user, category)
+
+
+def _load(user, now):
+    frame = engine.load_frame(user, months=ai_service.insight_months(now))
+    budget_amount = (
+        MonthlyBudget.objects.filter(user=user, year=now.year, month=now.month)
+        .values_list('amount', flat=True)
+        .first()
+    )
+    baselines = spending_stats.baselines_for_user(user)
+    return frame, budget_amount, baselines, forecasting.get_forecast(user, now)
+
+
+def _engine(user, now):
+    frame, budget_amount, baselines, forecast = _load(user, now)
+    return ai_service.build_insights(user, frame, budget_amount, now, baselines, forecast)
+
+
+def _measure(func, iterations: int):
+    """(mean milliseconds, queries) per call"""
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1000, len(queries)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark query-per-detector insights against the expense-frame engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, required=True, help='Email of the user to benchmark')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options['user']).first()
+        if user is None:
+            self.stdout.write(self.style.ERROR(f"User {options['user']} not found"))
+            return
+
+        iterations = options['iterations']
+        now = timezone.now()
+        frame, budget_amount, baselines, forecast = _load(user, now)
+
+        results = [
+            ('query per detector', *_measure(lambda: _legacy(user), iterations)),
+            ('engine (load + detect)', *_measure(
+                lambda: _engine(user, now), iterations
+            )),
+            ('engine detectors only', *_measure(
+                lambda: ai_service.build_insights(user, frame, budget_amount, now, baselines, forecast),
+                iterations,
+            )),
+        ]
+
+        self.stdout.write(
+            f'{user.email}: {len(frame.amounts)} expenses, {len(frame.category_ids)} categories, '
+            f'{iterations} iterations\n'
+        )
+        self.stdout.write(f"{'approach':<26}{'ms/run':>10}{'queries':>10}")
+        for name, ms, queries in results:
+            self.stdout.write(f'{name:<26}{ms:>10.2f}{queries:>10}')
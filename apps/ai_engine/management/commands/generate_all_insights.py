@@ -0,0 +1,151 @@
+"""
+Management command to regenerate AI insights for all active users
+Usage: python manage.py generate_all_insights [--workers=4] [--chunk-size=500]
+
+Users are walked in chunks of --chunk-size. Each chunk costs a fixed number of
+queries whatever its size (users, categories, expenses, budgets, anomaly
+baselines, details and real-time flags, forecasts, upsert); detection runs in a pool of --workers
+processes.
+Each user's detection is bounded by INSIGHT_DEADLINE_SECONDS (see stages.py).
+Insights are upserted by fingerprint, as run_insight_worker does, so running
+the command again refreshes rows instead of adding them, and the rows of the
+regenerated periods it no longer finds are deleted.
+Forecasts come from the persisted models; out-of-date ones are refit for the
+whole chunk at once.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from apps.ai_engine import engine, forecasting
+from apps.ai_engine.ai_service import (
+    detect_insights_batch,
+    insight_months,
+    insights_from_specs,
+)
+from apps.ai_engine.anomalies import without_flagged
+from apps.ai_engine.insights import replace_insights
+from apps.analytics import spending_stats
+from apps.expenses import user_cache
+from apps.expenses.models import Expense, MonthlyBudget
+
+User = get_user_model()
+
+# Batches handed to each worker process per chunk (smooths out uneven users)
+BATCHES_PER_WORKER = 4
+
+
+class Command(BaseCommand):
+    help = 'Regenerate AI insights for all active users in chunks, using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes for detection (1 = run in this process)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Users loaded and written per chunk',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        chunk_size = max(1, options['chunk_size'])
+        now = timezone.now()
+        months = insight_months(now)
+
+        users = User.objects.filter(is_active=True).order_by('id')
+        total = users.count()
+        self.stdout.write(f'Generating insights for {total} users ({workers} workers, chunks of {chunk_size})')
+
+        pool = None
+        if workers > 1:
+            # Don't share open database connections with forked workers
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+
+        started = time.monotonic()
+        processed = created = failed = 0
+        last_id = None
+
+        try:
+            while True:
+                chunk = users if last_id is None else users.filter(id__gt=last_id)
+                user_ids = list(chunk.values_list('id', flat=True)[:chunk_size])
+                if not user_ids:
+                    break
+                last_id = user_ids[-1]
+
+                chunk_created, chunk_failed = self._process_chunk(user_ids, months, now, pool, workers)
+                processed += len(user_ids)
+                created += chunk_created
+                failed += chunk_failed
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'  {processed}/{total} users, {created} insights, '
+                    f'{processed / elapsed:.0f} users/s'
+                )
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Generated {created} insights for {processed - failed} users in {elapsed:.1f}s'
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'  {failed} users failed and kept their previous insights'))
+
+    def _process_chunk(self, user_ids, months, now, pool, workers):
+        """Returns (insights created, users failed)"""
+        frames = engine.load_frames(user_ids, months)
+        budgets = dict(
+            MonthlyBudget.objects.filter(user_id__in=user_ids, year=now.year, month=now.month)
+            .values_list('user_id', 'amount')
+        )
+        baselines = spending_stats.baselines_for_users(user_ids)
+        forecasts = forecasting.get_forecasts(user_ids, now)
+        items = [
+            (user_id, frames[user_id], budgets.get(user_id), baselines.get(user_id, {}), forecasts[user_id])
+            for user_id in user_ids
+        ]
+
+        if pool is None:
+            results = detect_insights_batch(items, now)
+        else:
+            batch_count = workers * BATCHES_PER_WORKER
+            batches = [items[i::batch_count] for i in range(batch_count) if items[i::batch_count]]
+            results = list(chain.from_iterable(pool.map(detect_insights_batch, batches, repeat(now))))
+
+        succeeded = [result for result in results if result[1] is not None]
+        anomaly_ids = [
+            spec['expense_id'] for _, specs, _ in succeeded for spec in specs if 'expense_id' in spec
+        ]
+        expenses = without_flagged(
+            Expense.objects.only('id', 'user_id', 'title', 'amount', 'expense_date').in_bulk(anomaly_ids)
+            if anomaly_ids else {}
+        )
+        insights = list(chain.from_iterable(
+            insights_from_specs(user_id, specs, expenses) for user_id, specs, _ in succeeded
+        ))
+
+        succeeded_ids = [user_id for user_id, _, _ in succeeded]
+        replace_insights(insights, {user_id: scopes for user_id, _, scopes in succeeded})
+
+        # Dashboard entries embed the insight list
+        for user_id in succeeded_ids:
+            user_cache.invalidate_user(user_id)
+
+        return len(insights), len(results) - len(succeeded)
@@ -0,0 +1,41 @@
+"""
+Management command to delete AI insights that are no longer regenerated
+Usage: python manage.py prune_insights [--days=30] [--chunk-size=1000]
+
+Insight generation only upserts; this is the one place old rows are removed.
+Run it daily (e.g. from cron). Rows are deleted in chunks of --chunk-size so
+no single transaction holds locks on a large part of the table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.ai_engine.ai_service import prune_insights
+
+
+class Command(BaseCommand):
+    help = 'Delete AI insights that have not been refreshed within the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.INSIGHT_RETENTION_DAYS,
+            help='Keep insights refreshed within this many days',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_insights(
+            timedelta(days=options['days']),
+            chunk_size=max(1, options['chunk_size']),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Deleted {deleted} insights older than {options["days"]} days'
+        ))
@@ -0,0 +1,65 @@
+"""
+Management command to refit persisted spending forecasts
+Usage: python manage.py refit_forecasts [--user=email@example.com] [--all] [--chunk-size=500]
+
+Dashboards serve stored forecasts even when a month has closed or past
+expenses changed since the fit; the insight worker refits those in the
+background. Run this shortly after the month turns over to refit everyone at
+once. By default only out-of-date forecasts are refit; --all refits every user.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.ai_engine import forecasting
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Refit out-of-date spending forecasts (after a month closes or history is edited)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Email of a single user to refit (default: all active users)',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refit every forecast, not only out-of-date ones',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Users refit per batch',
+        )
+
+    def handle(self, *args, **options):
+        user_email = options.get('user')
+        chunk_size = max(1, options['chunk_size'])
+        now = timezone.now()
+
+        if user_email:
+            users = User.objects.filter(email=user_email)
+            if not users.exists():
+                self.stdout.write(self.style.ERROR(f'User {user_email} not found'))
+                return
+        else:
+            users = User.objects.filter(is_active=True)
+
+        if not options['all']:
+            users = forecasting.outdated_users(users, now)
+
+        user_ids = list(users.order_by('id').values_list('id', flat=True))
+        written = 0
+        for start in range(0, len(user_ids), chunk_size):
+            chunk = user_ids[start:start + chunk_size]
+            written += forecasting.refit(chunk, now)
+            self.stdout.write(f'  {start + len(chunk)}/{len(user_ids)} users')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Refit {written} forecasts for {len(user_ids)} users'
+        ))
@@ -0,0 +1,110 @@
+"""
+Management command to process queued AI insight regenerations
+Usage: python manage.py run_insight_worker [--once] [--batch-size=10] [--poll-interval=5]
+                                           [--refit-interval=60] [--refit-batch-size=500]
+
+When no jobs are due, the worker also refits out-of-date spending forecasts
+(a month closed, or past expenses changed), which dashboards serve as stored.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.ai_engine import forecasting
+from apps.ai_engine.jobs import claim_due_jobs, run_insight_job
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Run the worker that regenerates AI insights for users whose data changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process currently due jobs and exit',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Maximum jobs claimed per poll',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when no jobs are due',
+        )
+        parser.add_argument(
+            '--refit-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between sweeps for out-of-date forecasts (0 disables)',
+        )
+        parser.add_argument(
+            '--refit-batch-size',
+            type=int,
+            default=500,
+            help='Maximum users refit per sweep',
+        )
+
+    def handle(self, *args, **options):
+        once = options['once']
+        batch_size = options['batch_size']
+        poll_interval = options['poll_interval']
+        refit_interval = options['refit_interval']
+        refit_batch_size = max(1, options['refit_batch_size'])
+        next_refit = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS('Insight worker started'))
+        processed = 0
+
+        try:
+            while True:
+                close_old_connections()
+                jobs = claim_due_jobs(limit=batch_size)
+
+                for job in jobs:
+                    try:
+                        count = run_insight_job(job)
+                    except Exception as e:
+                        # Leave the job to the stale-running reclaim; keep serving the batch
+                        self.stderr.write(self.style.ERROR(f'  {job.user.email}: {e}'))
+                        continue
+                    processed += 1
+                    self.stdout.write(f'  {job.user.email}: {count} insights')
+
+                refit = 0
+                if not jobs and refit_interval and time.monotonic() >= next_refit:
+                    refit = self._refit_forecasts(refit_batch_size)
+                    # A full batch means more are waiting: sweep again right away
+                    next_refit = time.monotonic() + (0 if refit == refit_batch_size else refit_interval)
+
+                if once and not jobs:
+                    break
+                if not jobs and not refit:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Processed {processed} insight jobs'))
+
+    def _refit_forecasts(self, limit: int) -> int:
+        """Refit up to `limit` users with out-of-date forecasts; returns users refit"""
+        now = timezone.now()
+        users = forecasting.outdated_users(User.objects.filter(is_active=True), now)
+        user_ids = list(users.order_by('id').values_list('id', flat=True)[:limit])
+        if not user_ids:
+            return 0
+        try:
+            written = forecasting.refit(user_ids, now)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'  Forecast refit failed: {e}'))
+            return 0
+        self.stdout.write(f'  Refit {written} forecasts for {len(user_ids)} users')
+        return len(user_ids)
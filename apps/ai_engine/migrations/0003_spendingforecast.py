@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0002_insightjob'),
+        ('expenses', '0004_categorybudget_expenses_ca_user_id_0141d5_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendingForecast',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('method', models.CharField(choices=[('mean', 'Mean of closed months'), ('holt', 'Damped Holt exponential smoothing'), ('seasonal', 'Seasonal regression')], max_length=20)),
+                ('params', models.JSONField(default=dict)),
+                ('fitted_through', models.DateField()),
+                ('predictions', models.JSONField(default=dict)),
+                ('is_stale', models.BooleanField(default=False)),
+                ('fitted_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'category'), name='unique_category_forecast'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user',), name='unique_total_forecast')],
+            },
+        ),
+    ]
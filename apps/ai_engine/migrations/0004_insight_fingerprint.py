@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing insights count as last refreshed when they were created"""
+    SpendingInsight = apps.get_model('ai_engine', 'SpendingInsight')
+    SpendingInsight.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0003_spendingforecast'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='spendinginsight',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=120, null=True),
+        ),
+        migrations.AddField(
+            model_name='spendinginsight',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='spendinginsight',
+            index=models.Index(fields=['updated_at'], name='ai_engine_s_updated_96a145_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='spendinginsight',
+            constraint=models.UniqueConstraint(fields=('user', 'fingerprint'), name='unique_insight_fingerprint'),
+        ),
+    ]
@@ -2,8 +2,20 @@ from django.db import models
 from django.conf import settings
 import uuid
 
+
+def insight_fingerprint(insight_type: str, year: int, month: int, subject='') -> str:
+    """Identity of an insight: what it is about (type, period, subject), not its wording"""
+    return f"{insight_type}:{year:04d}-{month:02d}:{subject}"
+
+
 class SpendingInsight(models.Model):
-    """AI-generated insights about user spending patterns"""
+    """
+    AI-generated insights about user spending patterns
+
+    Regenerated insights are upserted on (user, fingerprint), so detecting the
+    same thing again refreshes the existing row instead of adding one. Rows not
+    refreshed within INSIGHT_RETENTION_DAYS are removed by prune_insights.
+    """
     
     INSIGHT_TYPES = [
         ('forecast', 'Spending Forecast'),
@@ -41,15 +53,144 @@ class SpendingInsight(models.Model):
     actual_amount = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     risk_score = models.IntegerField(null=True, blank=True)  # 0-100
     
+    # See insight_fingerprint(); None for one-off insights that are never regenerated
+    fingerprint = models.CharField(max_length=120, null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_read = models.BooleanField(default=False)
     
+    # Refreshed by an upsert; created_at and is_read are kept
+    UPSERT_FIELDS = [
+        'severity', 'title', 'message', 'applies_to_month', 'applies_to_year',
+        'predicted_amount', 'actual_amount', 'risk_score', 'updated_at',
+    ]
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', '-created_at']),
             models.Index(fields=['user', 'insight_type']),
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'fingerprint'],
+                name='unique_insight_fingerprint',
+            ),
         ]
     
     def __str__(self):
         return f"{self.user.email} - {self.get_insight_type_display()}: {self.title}"
+
+
+class InsightJob(models.Model):
+    """
+    Pending/running insight regeneration for a user.
+    Enqueued when a user's data changes, processed by `manage.py run_insight_worker`.
+    At most one pending job exists per user, so bursts of writes collapse into one run.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_FAILED = 'failed'
+
+    STATUSES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='insight_jobs'
+    )
+
+    status = models.CharField(max_length=10, choices=STATUSES, default=STATUS_PENDING)
+
+    # Debounce deadline - pushed forward by further writes while pending
+    run_after = models.DateTimeField()
+
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_insight_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.status} (run after {self.run_after})"
+
+
+class SpendingForecast(models.Model):
+    """
+    Fitted monthly spending forecast for a user (category=None) or one of their
+    categories. Refit only when a new month closes or past data is edited
+    (is_stale), so serving a forecast is a row lookup. See forecasting.py.
+    """
+
+    METHOD_MEAN = 'mean'
+    METHOD_HOLT = 'holt'
+    METHOD_SEASONAL = 'seasonal'
+
+    METHODS = [
+        (METHOD_MEAN, 'Mean of closed months'),
+        (METHOD_HOLT, 'Damped Holt exponential smoothing'),
+        (METHOD_SEASONAL, 'Seasonal regression'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='forecasts'
+    )
+    category = models.ForeignKey(
+        'expenses.Category',
+        on_delete=models.CASCADE,
+        related_name='forecasts',
+        null=True,
+        blank=True
+    )
+
+    method = models.CharField(max_length=20, choices=METHODS)
+    params = models.JSONField(default=dict)
+
+    # First day of the last closed month included in the fit
+    fitted_through = models.DateField()
+    # {"YYYY-MM": amount} for the months following fitted_through
+    predictions = models.JSONField(default=dict)
+
+    is_stale = models.BooleanField(default=False)
+    fitted_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category'],
+                name='unique_category_forecast',
+            ),
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(category__isnull=True),
+                name='unique_total_forecast',
+            ),
+        ]
+
+    def __str__(self):
+        subject = self.category.name if self.category_id else 'total'
+        return f"{self.user.email} - {subject} ({self.method} through {self.fitted_through:%Y-%m})"
@@ -0,0 +1,17 @@
+from django.dispatch import receiver
+
+from apps.expenses.signals import expense_changed
+from .forecasting import mark_stale_for_change
+from .jobs import enqueue_insight_refresh_on_commit
+
+
+@receiver(expense_changed)
+def schedule_insight_refresh(sender, user_id, **kwargs):
+    """Regenerate the user's insights (debounced) once the write commits"""
+    enqueue_insight_refresh_on_commit(user_id)
+
+
+@receiver(expense_changed)
+def mark_forecasts_stale(sender, user_id, before, after, **kwargs):
+    """Edits to closed months invalidate the fitted forecasts"""
+    mark_stale_for_change(user_id, before, after)
@@ -0,0 +1,70 @@
+"""
+Stage timing and deadlines for insight generation
+
+A StageRun times each named stage of one user's insight generation, counts
+the SQL queries it issues (via connection.execute_wrapper, so it works with
+DEBUG off) and writes one summary line to the `performance` logger:
+
+    insights user=... 412.3ms 9q | load 3.1ms 3q, forecast 1.2ms 1q, risk 0.4ms 0q, ...
+
+Once the run's deadline has passed, optional stages are skipped (their result
+is None) and the caller returns what it has: one pathological user can't hold
+a worker for long. Required stages (loading inputs, writing results) always run.
+"""
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from django.db import connection
+
+perf_logger = logging.getLogger("performance")
+
+
+class StageRun:
+
+    def __init__(self, label: str, deadline: Optional[float] = None):
+        """`deadline`: seconds from now after which optional stages are skipped"""
+        self.label = label
+        self.started = time.perf_counter()
+        self.deadline = None if deadline is None else self.started + deadline
+        self.stages: List[Tuple[str, float, int]] = []  # (name, milliseconds, queries)
+        self.skipped: List[str] = []
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() >= self.deadline
+
+    def call(self, name: str, func: Callable, *args, required: bool = False, **kwargs):
+        """Run one stage and record its cost; None if skipped for the deadline"""
+        if not required and self.expired():
+            self.skipped.append(name)
+            return None
+
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count):
+                return func(*args, **kwargs)
+        finally:
+            self.stages.append((name, (time.perf_counter() - started) * 1000, queries))
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def log(self, level: int = logging.INFO) -> None:
+        """One summary line; a warning when stages were skipped"""
+        stages = ", ".join(f"{name} {ms:.1f}ms {queries}q" for name, ms, queries in self.stages)
+        total_queries = sum(queries for _, _, queries in self.stages)
+        if self.skipped:
+            perf_logger.warning(
+                "%s %.1fms %dq | %s | deadline exceeded, skipped: %s",
+                self.label, self.elapsed_ms, total_queries, stages, ", ".join(self.skipped),
+            )
+        else:
+            perf_logger.log(level, "%s %.1fms %dq | %s", self.label, self.elapsed_ms, total_queries, stages)
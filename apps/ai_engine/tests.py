@@ -1,3 +1,635 @@
-from django.test import TestCase
+import datetime
+import threading
+import time
+import uuid
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.analytics.spending_stats import Baseline
+from apps.expenses import periods
+from apps.expenses.dashboard import get_dashboard_data
+from apps.expenses.models import Category, Expense, MonthlyBudget
+from . import ai_service, engine, forecast_models, forecasting, jobs, limits
+from .ai_service import forecast_months, generate_insights_for_user
+from .anomalies import flagged_fingerprint, record_anomaly
+from .forecasting import get_forecast
+from .jobs import run_insight_job
+from .models import InsightJob, SpendingForecast, SpendingInsight, insight_fingerprint
+from .stages import StageRun
+
+User = get_user_model()
+
+
+class GenerateInsightsTests(TestCase):
+    """generate_insights_for_user() must cost the same number of queries for any user"""
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        now = timezone.now()
+        MonthlyBudget.objects.create(
+            user=self.user, year=now.year, month=now.month, amount=Decimal("100.00")
+        )
+
+    def add_categories(self, count):
+        start = Category.objects.filter(user=self.user).count()
+        today = timezone.now().date()
+        oldest_year, oldest_month = forecast_months(months=2)[-1]
+        for i in range(start, start + count):
+            category = Category.objects.create(user=self.user, name=f"Category {i:02d}")
+            # Spending doubled since two months ago -> one trend insight per category
+            Expense.objects.create(
+                user=self.user, category=category, title="Old", amount=Decimal("10.00"),
+                expense_date=today.replace(year=oldest_year, month=oldest_month, day=1),
+            )
+            Expense.objects.create(
+                user=self.user, category=category, title="New", amount=Decimal("20.00"),
+                expense_date=today,
+            )
+
+    def generate(self):
+        SpendingInsight.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            insights = generate_insights_for_user(self.user)
+        return insights, len(queries)
+
+    def test_query_count_is_constant(self):
+        self.add_categories(1)
+        insights, baseline = self.generate()
+        self.assertEqual(sum(i.insight_type == "trend" for i in insights), 1)
+
+        self.add_categories(30)
+        insights, queries = self.generate()
+        self.assertEqual(queries, baseline)
+        self.assertEqual(sum(i.insight_type == "trend" for i in insights), 31)
+        self.assertEqual(SpendingInsight.objects.filter(user=self.user).count(), len(insights))
+
+
+class InsightStageTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        category = Category.objects.create(user=self.user, name="Food")
+        year, month = forecast_months(months=1)[0]
+        Expense.objects.create(
+            user=self.user, category=category, title="Lunch", amount=Decimal("10.00"),
+            expense_date=datetime.date(year, month, 1),
+        )
+
+    def test_stages_are_timed_with_query_counts(self):
+        with self.assertLogs("performance", "INFO") as logs:
+            generate_insights_for_user(self.user)
+
+        line = logs.output[-1]
+        for stage in ("load", "forecast fit", "forecast", "risk", "anomalies", "trends", "write"):
+            self.assertIn(f"{stage} ", line)
+        self.assertIn("anomalies 0.", line)
+        self.assertRegex(line, r"load [\d.]+ms [1-9]\d*q")
+
+    @override_settings(INSIGHT_DEADLINE_SECONDS=0.05)
+    def test_deadline_skips_remaining_stages(self):
+        def slow(*args):
+            time.sleep(0.1)
+            return []
+
+        detectors = (
+            ("forecast", ai_service._forecast_specs),
+            ("slow", slow),
+            ("trends", ai_service._trend_specs),
+        )
+        with mock.patch.object(ai_service, "DETECTORS", detectors), \
+                self.assertLogs("performance", "WARNING") as logs:
+            insights = generate_insights_for_user(self.user)
+
+        self.assertIn("skipped: trends", logs.output[-1])
+        # Partial results are still written
+        self.assertEqual([i.insight_type for i in insights], ["forecast"])
+        self.assertEqual(SpendingInsight.objects.filter(user=self.user).count(), 1)
+
+    def test_required_stages_ignore_deadline(self):
+        run = StageRun("test", deadline=0)
+        self.assertIsNone(run.call("optional", lambda: 1))
+        self.assertEqual(run.call("required", lambda: 2, required=True), 2)
+        self.assertEqual(run.skipped, ["optional"])
+
+
+class GenerateAllInsightsTests(TestCase):
+
+    def test_matches_per_user_generation(self):
+        today = timezone.now().date()
+        users = []
+        for n in range(3):
+            user = User.objects.create(username=f"user{n}", email=f"user{n}@example.com")
+            category = Category.objects.create(user=user, name="Food")
+            for day in range(1, 11):
+                Expense.objects.create(
+                    user=user, category=category, title=f"Lunch {day}",
+                    amount=Decimal("10.00") if day < 10 else Decimal("500.00"),
+                    expense_date=today.replace(day=day) if today.day >= day else today,
+                )
+            users.append(user)
+        call_command("generate_all_insights", workers=1, chunk_size=2, stdout=StringIO())
+        generated = SpendingInsight.objects.count()
+        call_command("generate_all_insights", workers=1, chunk_size=2, stdout=StringIO())
+        self.assertEqual(SpendingInsight.objects.count(), generated)
+
+        for user in users:
+            batch = sorted(SpendingInsight.objects.filter(user=user).values_list("title", flat=True))
+            SpendingInsight.objects.filter(user=user).delete()
+            single = sorted(insight.title for insight in generate_insights_for_user(user))
+            self.assertTrue(batch)
+            self.assertEqual(batch, single)
+
+
+class InsightUpsertTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        category = Category.objects.create(user=self.user, name="Food")
+        today = timezone.now().date()
+        year, month = forecast_months(months=1)[0]
+        for day in range(1, 4):
+            Expense.objects.create(
+                user=self.user, category=category, title="Lunch", amount=Decimal("10.00"),
+                expense_date=datetime.date(year, month, day),
+            )
+        Expense.objects.create(
+            user=self.user, category=category, title="Lunch", amount=Decimal("90.00"),
+            expense_date=today,
+        )
+
+    def test_regeneration_refreshes_existing_rows(self):
+        first = generate_insights_for_user(self.user)
+        self.assertTrue(first)
+        SpendingInsight.objects.filter(user=self.user).update(is_read=True)
+
+        second = generate_insights_for_user(self.user)
+        self.assertEqual(len(second), len(first))
+        rows = SpendingInsight.objects.filter(user=self.user)
+        self.assertEqual(rows.count(), len(first))
+        self.assertTrue(all(row.is_read for row in rows))
+        self.assertEqual(
+            len({row.fingerprint for row in rows}), rows.count()
+        )
+
+    def test_regeneration_deletes_insights_no_longer_found(self):
+        now = timezone.now()
+        budget = MonthlyBudget.objects.create(
+            user=self.user, year=now.year, month=now.month, amount=Decimal("100.00")
+        )
+        this_month = insight_fingerprint("risk", now.year, now.month)
+        last_month = insight_fingerprint("risk", *forecast_months(months=1)[0])
+        SpendingInsight.objects.create(
+            user=self.user, insight_type="risk", title="Old risk", message="Old", fingerprint=last_month
+        )
+        for regenerate in (
+            lambda: generate_insights_for_user(self.user),
+            lambda: call_command("generate_all_insights", workers=1, stdout=StringIO()),
+        ):
+            budget.amount = Decimal("100.00")
+            budget.save()
+            Expense.objects.filter(user=self.user).update(is_deleted=False)
+            regenerate()
+            self.assertTrue(SpendingInsight.objects.filter(fingerprint=this_month).exists())
+
+            budget.amount = Decimal("10000.00")
+            budget.save()
+            Expense.objects.filter(user=self.user, expense_date=now.date()).update(is_deleted=True)
+            regenerate()
+            self.assertFalse(SpendingInsight.objects.filter(fingerprint=this_month).exists())
+            # Insights of periods the run didn't regenerate are left to prune_insights()
+            self.assertTrue(SpendingInsight.objects.filter(fingerprint=last_month).exists())
+
+    def test_regeneration_keeps_realtime_anomaly(self):
+        expense = Expense.objects.get(user=self.user, amount=Decimal("90.00"))
+        year, month = forecast_months(months=1)[0]
+        for day in range(4, 10):
+            Expense.objects.create(
+                user=self.user, category=expense.category, title="Lunch", amount=Decimal("10.00"),
+                expense_date=datetime.date(year, month, day),
+            )
+        generate_insights_for_user(self.user)
+        self.assertTrue(SpendingInsight.objects.filter(user=self.user, insight_type="anomaly").exists())
+        SpendingInsight.objects.filter(user=self.user, insight_type="anomaly").delete()
+
+        flagged = record_anomaly(expense, Baseline(count=3, mean=10.0, std=0.0, recent_p95=None))
+        generate_insights_for_user(self.user)
+        call_command("generate_all_insights", workers=1, stdout=StringIO())
+
+        anomaly = SpendingInsight.objects.get(user=self.user, insight_type="anomaly")
+        self.assertEqual(anomaly.fingerprint, flagged_fingerprint(expense))
+        self.assertEqual(anomaly.message, flagged.message)
+        self.assertEqual(anomaly.actual_amount, Decimal("90.00"))
+
+    def test_prune_removes_only_expired_rows(self):
+        generate_insights_for_user(self.user)
+        kept = SpendingInsight.objects.filter(user=self.user).count()
+        for n in range(5):
+            SpendingInsight.objects.create(
+                user=self.user, insight_type="suggestion", title=f"Old {n}", message="Old"
+            )
+        SpendingInsight.objects.filter(title__startswith="Old").update(
+            updated_at=timezone.now() - datetime.timedelta(days=40)
+        )
+
+        out = StringIO()
+        call_command("prune_insights", days=30, chunk_size=2, stdout=out)
+
+        self.assertIn("Deleted 5 insights", out.getvalue())
+        self.assertEqual(SpendingInsight.objects.filter(user=self.user).count(), kept)
+
+
+@override_settings(INSIGHT_JOB_DEBOUNCE_SECONDS=30, INSIGHT_JOB_MAX_DELAY_SECONDS=300,
+                   INSIGHT_JOB_STALE_SECONDS=600, INSIGHT_JOB_MAX_ATTEMPTS=3, INSIGHT_JOB_RETRY_SECONDS=60)
+class InsightJobQueueTests(TestCase):
+    """Debounced enqueueing, claiming, stale reclaim and retries of insight jobs"""
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com", ai_credits=10)
+        self.now = timezone.now()
+        limits.reset_bucket(self.user.id)
+        self.addCleanup(limits.reset_bucket, self.user.id)
+
+    def at(self, seconds):
+        return mock.patch.object(jobs.timezone, "now", return_value=self.now + datetime.timedelta(seconds=seconds))
+
+    def test_writes_are_debounced_into_one_job(self):
+        with self.at(0):
+            jobs.enqueue_insight_refresh(self.user.id)
+        with self.at(20):
+            jobs.enqueue_insight_refresh(self.user.id)
+        job = InsightJob.objects.get(user=self.user)
+        self.assertEqual(job.run_after, self.now + datetime.timedelta(seconds=50))
+
+    def test_max_delay_caps_debounce(self):
+        with self.at(0):
+            jobs.enqueue_insight_refresh(self.user.id)
+        for seconds in range(20, 400, 20):
+            with self.at(seconds):
+                jobs.enqueue_insight_refresh(self.user.id)
+        job = InsightJob.objects.get(user=self.user)
+        self.assertLessEqual(job.run_after, self.now + datetime.timedelta(seconds=300))
+
+    def test_claims_due_jobs_once(self):
+        other = User.objects.create(username="other", email="other@example.com")
+        due = InsightJob.objects.create(user=self.user, run_after=self.now - datetime.timedelta(seconds=1))
+        InsightJob.objects.create(user=other, run_after=self.now + datetime.timedelta(seconds=60))
+
+        with self.at(0):
+            claimed = jobs.claim_due_jobs()
+            self.assertEqual(jobs.claim_due_jobs(), [])
+        self.assertEqual([job.id for job in claimed], [due.id])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), (InsightJob.STATUS_RUNNING, 1))
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), (InsightJob.STATUS_RUNNING, 1))
+
+    def test_stale_running_job_is_reclaimed(self):
+        job = InsightJob.objects.create(user=self.user, run_after=self.now)
+        with self.at(0):
+            jobs.claim_due_jobs()
+        with self.at(599):
+            self.assertEqual(jobs.claim_due_jobs(), [])
+        with self.at(601):
+            self.assertEqual([j.attempts for j in jobs.claim_due_jobs()], [2])
+
+    def test_failed_job_is_retried_with_backoff_then_kept_failed(self):
+        InsightJob.objects.create(user=self.user, run_after=self.now)
+        failing = mock.patch.object(ai_service, "generate_insights_for_user", side_effect=RuntimeError("boom"))
+        elapsed = 0
+        with failing, self.assertLogs(jobs.logger, "ERROR"):
+            for retry_delay in (60, 120):
+                with self.at(elapsed):
+                    [job] = jobs.claim_due_jobs()
+                    run_insight_job(job)
+                job.refresh_from_db()
+                self.assertEqual((job.status, job.last_error), (InsightJob.STATUS_PENDING, "boom"))
+                self.assertEqual(job.run_after, self.now + datetime.timedelta(seconds=elapsed + retry_delay))
+                elapsed += retry_delay
+
+            with self.at(elapsed):
+                [job] = jobs.claim_due_jobs()
+                run_insight_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (InsightJob.STATUS_FAILED, 3))
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ai_credits, 10)
+
+        # The next write starts over with a fresh job
+        jobs.enqueue_insight_refresh(self.user.id)
+        self.assertEqual(
+            list(InsightJob.objects.filter(user=self.user).values_list("status", "attempts")),
+            [(InsightJob.STATUS_PENDING, 0)],
+        )
+
+
+@skipUnlessDBFeature("has_select_for_update_skip_locked")
+class InsightJobClaimLockTests(TransactionTestCase):
+    """A job locked by one worker's claim is skipped, not waited on, by another"""
+
+    def test_locked_jobs_are_skipped(self):
+        user = User.objects.create(username="user", email="user@example.com")
+        first = InsightJob.objects.create(user=user, run_after=timezone.now())
+        other = User.objects.create(username="other", email="other@example.com")
+        second = InsightJob.objects.create(user=other, run_after=timezone.now())
+
+        claimed = []
+
+        def claim_in_other_connection():
+            try:
+                claimed.extend(jobs.claim_due_jobs())
+            finally:
+                connections.close_all()
+
+        with transaction.atomic():
+            list(InsightJob.objects.select_for_update().filter(id=first.id))
+            worker = threading.Thread(target=claim_in_other_connection)
+            worker.start()
+            worker.join(timeout=10)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([job.id for job in claimed], [second.id])
+
+
+class InsightLimitTests(TestCase):
+    """Insight jobs are rate limited by plan and metered by ai_credits"""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username="user", email="user@example.com", subscription_plan="free", ai_credits=2
+        )
+        category = Category.objects.create(user=self.user, name="Food")
+        Expense.objects.create(
+            user=self.user, category=category, title="Lunch", amount=Decimal("90.00"),
+            expense_date=timezone.now().date(),
+        )
+        limits.reset_bucket(self.user.id)
+        self.addCleanup(limits.reset_bucket, self.user.id)
+
+    def run_job(self):
+        job = InsightJob.objects.create(user=self.user, run_after=timezone.now())
+        return job, run_insight_job(job)
+
+    def test_bucket_refills_at_plan_rate(self):
+        capacity, per_hour = limits.plan_limits("free")
+        now = time.time()
+        for _ in range(capacity):
+            self.assertEqual(limits.take_token(self.user, now), 0)
+        wait = limits.take_token(self.user, now)
+        self.assertAlmostEqual(wait, 3600 / per_hour)
+        self.assertEqual(limits.take_token(self.user, now + wait), 0)
+
+    def test_unknown_plan_gets_free_limits(self):
+        self.assertEqual(limits.plan_limits("enterprise"), limits.plan_limits("free"))
+
+    def test_regeneration_spends_credit(self):
+        job, count = self.run_job()
+        self.assertGreater(count, 0)
+        self.assertFalse(InsightJob.objects.filter(id=job.id).exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ai_credits, 1)
+
+    def test_rate_limited_job_is_deferred(self):
+        capacity, _ = limits.plan_limits("free")
+        for _ in range(capacity):
+            limits.take_token(self.user)
+
+        job, count = self.run_job()
+        self.assertEqual(count, 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, InsightJob.STATUS_PENDING)
+        self.assertGreater(job.run_after, timezone.now())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ai_credits, 2)
+
+    def test_rate_limited_job_merges_into_job_enqueued_during_run(self):
+        capacity, _ = limits.plan_limits("free")
+        for _ in range(capacity):
+            limits.take_token(self.user)
+        running = InsightJob.objects.create(
+            user=self.user, status=InsightJob.STATUS_RUNNING, run_after=timezone.now()
+        )
+        enqueued = InsightJob.objects.create(user=self.user, run_after=timezone.now())
+
+        self.assertEqual(run_insight_job(running), 0)
+        self.assertFalse(InsightJob.objects.filter(id=running.id).exists())
+        enqueued.refresh_from_db()
+        self.assertEqual(enqueued.status, InsightJob.STATUS_PENDING)
+        self.assertGreater(enqueued.run_after, timezone.now())
+
+    def test_no_credits_keeps_last_insights(self):
+        self.run_job()
+        kept = set(SpendingInsight.objects.filter(user=self.user).values_list("id", "updated_at"))
+        User.objects.filter(pk=self.user.pk).update(ai_credits=0)
+
+        job, count = self.run_job()
+        self.assertEqual(count, 0)
+        self.assertFalse(InsightJob.objects.filter(id=job.id).exists())
+        self.assertEqual(
+            set(SpendingInsight.objects.filter(user=self.user).values_list("id", "updated_at")), kept
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.ai_credits, 0)
+
+
+def make_frame(rows, categories=("Food", "Rent")):
+    """ExpenseFrame from (date, category index, amount) tuples"""
+    return engine.ExpenseFrame(
+        ids=np.array([uuid.uuid4() for _ in rows], dtype=object),
+        dates=np.array([row[0] for row in rows], dtype="datetime64[D]"),
+        category_codes=np.array([row[1] for row in rows], dtype=np.int64),
+        amounts=np.array([row[2] for row in rows], dtype=np.float64),
+        category_ids=[uuid.uuid4() for _ in categories],
+        category_names=list(categories),
+    )
+
+
+class EngineDetectorTests(SimpleTestCase):
+
+    def setUp(self):
+        d = datetime.date
+        self.frame = make_frame([
+            (d(2026, 3, 10), 0, 30.0),
+            (d(2026, 3, 5), 1, 500.0),
+            (d(2026, 2, 20), 0, 20.0),
+            (d(2026, 1, 3), 0, 10.0),
+            (d(2026, 1, 2), 1, 400.0),
+        ])
+
+    def test_monthly_totals_and_forecast(self):
+        months = [(2026, 3), (2026, 2), (2026, 1), (2025, 12)]
+        self.assertEqual(engine.monthly_totals(self.frame, months).tolist(), [530.0, 20.0, 410.0, 0.0])
+        self.assertAlmostEqual(engine.forecast_from_frame(self.frame, months[1:]), 430.0 / 3)
+
+    def test_category_trends(self):
+        matrix = engine.category_month_matrix(self.frame, [(2026, 3), (2026, 2), (2026, 1)])
+        self.assertEqual(matrix.tolist(), [[30.0, 20.0, 10.0], [500.0, 0.0, 400.0]])
+
+        food, rent = engine.category_trends(matrix)
+        self.assertEqual((food["trend"], food["change"]), ("increasing", 200.0))
+        self.assertEqual((rent["trend"], rent["change"]), ("increasing", 25.0))
+        self.assertEqual(engine.category_trends(np.zeros((1, 3)))[0], {"trend": "new", "change": 100})
+
+    def test_anomalies(self):
+        amounts = np.array([10.0] * 9 + [100.0])
+        self.assertEqual(engine.anomaly_mask(amounts).tolist(), [False] * 9 + [True])
+        self.assertEqual(engine.anomaly_mask(np.zeros(0)).tolist(), [])
+
+    def test_budget_risk_score(self):
+        steady = np.full(30, 30.0)
+        self.assertEqual(engine.budget_risk_score(np.zeros(30), 1000.0, day=10), 0)
+        self.assertEqual(engine.budget_risk_score(steady, 1000.0, day=10), 60)  # 90% projected
+        self.assertEqual(engine.budget_risk_score(steady, 0.0, day=10), 0)
+
+    def test_projection_uses_real_month_length_and_recent_burn(self):
+        february = np.zeros(28)
+        february[:14] = 10.0
+        self.assertEqual(engine.projected_month_spend(february, day=14), 280.0)
+
+        accelerating = np.zeros(30)
+        accelerating[:10] = 10.0
+        accelerating[10:15] = 40.0
+        # 300 spent in 15 days: month rate 20/day, last 7 days 31.43/day
+        self.assertGreater(engine.projected_month_spend(accelerating, day=15), 600.0)
+
+    def test_daily_totals(self):
+        daily = engine.daily_totals(self.frame, periods.month(2026, 3))
+        self.assertEqual(len(daily), 31)
+        self.assertEqual((daily[4], daily[9], daily.sum()), (500.0, 30.0, 530.0))
+
+
+class ForecastModelTests(SimpleTestCase):
+
+    def test_short_history_uses_mean(self):
+        method, params, predictions = forecast_models.fit_series(np.array([100.0, 200.0]), start_index=0)
+        self.assertEqual(method, SpendingForecast.METHOD_MEAN)
+        self.assertEqual(predictions, [150.0] * forecasting.FORECAST_HORIZON)
+
+    def test_trend_uses_damped_holt(self):
+        series = np.array([100.0, 110.0, 120.0, 130.0, 140.0, 150.0])
+        method, params, predictions = forecast_models.fit_series(series, start_index=0)
+        self.assertEqual(method, SpendingForecast.METHOD_HOLT)
+        self.assertGreater(predictions[0], 150.0)
+        # Damped: each further month adds less than the last
+        self.assertLess(predictions[2] - predictions[1], predictions[1] - predictions[0])
+
+    def test_seasonal_history_uses_seasonal_model(self):
+        start = periods.month_index(2023, 1)
+        december = np.arange(36) % 12 == 11
+        series = np.where(december, 1000.0, 200.0)
+        method, params, predictions = forecast_models.fit_series(series, start_index=start)
+        self.assertEqual(method, SpendingForecast.METHOD_SEASONAL)
+        # Predictions for Jan-Mar 2026: back to the ordinary level
+        self.assertTrue(all(abs(p - 200.0) < 50 for p in predictions))
+
+    def test_forecast_months_crosses_month_boundaries(self):
+        now = datetime.datetime(2026, 3, 31, 12, 0)
+        self.assertEqual(forecast_months(now), [(2026, 2), (2026, 1), (2025, 12)])
+
+
+class PersistedForecastTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        self.category = Category.objects.create(user=self.user, name="Food")
+        self.now = timezone.now()
+        for year, month in forecast_months(self.now, months=4):
+            self.add_expense(datetime.date(year, month, 1), "100.00")
+
+    def add_expense(self, date, amount):
+        return Expense.objects.create(
+            user=self.user, category=self.category, title="Lunch",
+            amount=Decimal(amount), expense_date=date,
+        )
+
+    def test_served_from_stored_fit(self):
+        self.assertEqual(get_forecast(self.user), Decimal("100.00"))
+        forecast = SpendingForecast.objects.get(user=self.user)
+        self.assertEqual(forecast.method, SpendingForecast.METHOD_HOLT)
+        self.assertFalse(forecast.is_stale)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_forecast(self.user), Decimal("100.00"))
+
+    def test_current_month_expense_keeps_fit(self):
+        get_forecast(self.user)
+        self.add_expense(self.now.date(), "900.00")
+        self.assertFalse(SpendingForecast.objects.get(user=self.user).is_stale)
+
+    def test_edit_to_closed_month_triggers_refit(self):
+        get_forecast(self.user)
+        year, month = forecast_months(self.now, months=1)[0]
+        expense = self.add_expense(datetime.date(year, month, 2), "300.00")
+        self.assertTrue(SpendingForecast.objects.get(user=self.user).is_stale)
+
+        self.assertGreater(get_forecast(self.user), Decimal("100.00"))
+        self.assertFalse(SpendingForecast.objects.get(user=self.user).is_stale)
+
+        expense.delete()
+        self.assertTrue(SpendingForecast.objects.get(user=self.user).is_stale)
+        self.assertEqual(get_forecast(self.user), Decimal("100.00"))
+
+    def test_new_month_triggers_refit(self):
+        get_forecast(self.user)
+        forecast = SpendingForecast.objects.get(user=self.user)
+        year, month = forecasting.last_closed_month(self.now)
+        SpendingForecast.objects.filter(pk=forecast.pk).update(
+            fitted_through=datetime.date(year - 1, month, 1)
+        )
+
+        call_command("refit_forecasts", stdout=StringIO())
+        forecast.refresh_from_db()
+        self.assertEqual(forecast.fitted_through, datetime.date(year, month, 1))
+
+    def test_dashboard_serves_outdated_fit_and_worker_refits(self):
+        get_forecast(self.user)
+        year, month = forecast_months(self.now, months=1)[0]
+        self.add_expense(datetime.date(year, month, 2), "300.00")
+
+        with mock.patch.object(forecasting, "refit") as refit:
+            data = get_dashboard_data(self.user, self.now.year, self.now.month)
+        refit.assert_not_called()
+        self.assertEqual(data["predicted_next_month"], Decimal("100.00"))
+
+        call_command("run_insight_worker", "--once", stdout=StringIO())
+        self.assertFalse(SpendingForecast.objects.get(user=self.user).is_stale)
+        self.assertGreater(get_forecast(self.user, refit_outdated=False), Decimal("100.00"))
+
+    def test_concurrent_refit_upserts(self):
+        fit_series = forecast_models.fit_series
+
+        def fit_after_concurrent_refit(*args):
+            # Another request stores the same fit between our read and our write
+            if not SpendingForecast.objects.filter(user=self.user).exists():
+                SpendingForecast.objects.create(
+                    user=self.user, method=SpendingForecast.METHOD_MEAN,
+                    fitted_through=datetime.date(2000, 1, 1),
+                )
+            return fit_series(*args)
+
+        with mock.patch.object(forecast_models, "fit_series", fit_after_concurrent_refit):
+            self.assertEqual(get_forecast(self.user), Decimal("100.00"))
+        forecast = SpendingForecast.objects.get(user=self.user)
+        self.assertEqual(forecast.method, SpendingForecast.METHOD_HOLT)
+
+    @override_settings(FORECAST_PER_CATEGORY=True)
+    def test_per_category_forecasts(self):
+        rent = Category.objects.create(user=self.user, name="Rent")
+        for year, month in forecast_months(self.now, months=4):
+            Expense.objects.create(
+                user=self.user, category=rent, title="Rent",
+                amount=Decimal("500.00"), expense_date=datetime.date(year, month, 1),
+            )
+
+        self.assertEqual(get_forecast(self.user), Decimal("600.00"))
+        self.assertEqual(
+            forecasting.get_category_forecasts(self.user),
+            {self.category.id: Decimal("100.00"), rent.id: Decimal("500.00")},
+        )
@@ -1,3 +1,25 @@
 from django.contrib import admin
+from .models import CategorySpendingStats, DailySpendingRollup, MonthlySpendingRollup
 
-# Register your models here.
+
+@admin.register(MonthlySpendingRollup)
+class MonthlySpendingRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "category", "month", "year", "total", "count", "updated_at")
+    list_filter = ("year", "month")
+    search_fields = ("user__email", "category__name")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(DailySpendingRollup)
+class DailySpendingRollupAdmin(admin.ModelAdmin):
+    list_display = ("user", "date", "total", "count", "updated_at")
+    date_hierarchy = "date"
+    search_fields = ("user__email",)
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(CategorySpendingStats)
+class CategorySpendingStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "category", "count", "mean", "recent_p95", "updated_at")
+    search_fields = ("user__email", "category__name")
+    readonly_fields = ("updated_at",)
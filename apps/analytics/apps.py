@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AnalyticsConfig(AppConfig):
     name = 'apps.analytics'
+
+    def ready(self):
+        # Connect expense_changed receivers that maintain the rollup tables
+        from . import signals  # noqa: F401
@@ -0,0 +1,48 @@
+"""
+Management command to rebuild monthly and daily spending rollups from raw expenses
+Usage: python manage.py rebuild_rollups [--user=email@example.com]
+
+Use it to backfill rollups after deploying the analytics app, or to repair
+drift caused by writes that bypass Expense.save() (bulk updates, raw SQL).
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.analytics.rollups import rebuild_rollups_for_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly and daily spending rollups from raw expense data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Email of a single user to rebuild (default: all users)',
+        )
+
+    def handle(self, *args, **options):
+        user_email = options.get('user')
+
+        if user_email:
+            users = User.objects.filter(email=user_email)
+            if not users.exists():
+                self.stdout.write(self.style.ERROR(f'User {user_email} not found'))
+                return
+        else:
+            users = User.objects.all()
+
+        users_rebuilt = 0
+        rows_written = 0
+
+        for user in users.iterator():
+            rows = rebuild_rollups_for_user(user)
+            rows_written += rows
+            users_rebuilt += 1
+            self.stdout.write(f'  {user.email}: {rows} rollup rows')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Rebuilt {rows_written} rollup rows for {users_rebuilt} users'
+        ))
@@ -0,0 +1,48 @@
+"""
+Management command to rebuild per-category spending statistics from raw expenses
+Usage: python manage.py rebuild_spending_stats [--user=email@example.com]
+
+The stats are updated incrementally with floating point arithmetic; rebuild
+them to clear accumulated drift, or after writes that bypass Expense.save().
+"""
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.analytics.spending_stats import rebuild_stats_for_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-category spending statistics from raw expense data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Email of a single user to rebuild (default: all users)',
+        )
+
+    def handle(self, *args, **options):
+        user_email = options.get('user')
+
+        if user_email:
+            users = User.objects.filter(email=user_email)
+            if not users.exists():
+                self.stdout.write(self.style.ERROR(f'User {user_email} not found'))
+                return
+        else:
+            users = User.objects.all()
+
+        users_rebuilt = 0
+        rows_written = 0
+
+        for user in users.iterator():
+            rows = rebuild_stats_for_user(user)
+            rows_written += rows
+            users_rebuilt += 1
+            self.stdout.write(f'  {user.email}: {rows} categories')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Rebuilt spending stats for {rows_written} categories of {users_rebuilt} users'
+        ))
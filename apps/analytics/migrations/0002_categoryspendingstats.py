@@ -0,0 +1,76 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:05
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+RECENT_WINDOW = 50
+
+
+def _p95(values):
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * 0.95
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def backfill_stats(apps, schema_editor):
+    """Populate stats from existing expenses (same logic as rebuild_spending_stats)"""
+    Expense = apps.get_model('expenses', 'Expense')
+    CategorySpendingStats = apps.get_model('analytics', 'CategorySpendingStats')
+
+    rows = {}
+    amounts = (
+        Expense.objects.filter(is_deleted=False)
+        .order_by('user_id', 'category_id', 'expense_date', 'created_at')
+        .values_list('user_id', 'category_id', 'amount')
+    )
+    for user_id, category_id, amount in amounts.iterator(chunk_size=2000):
+        amount = float(amount)
+        stats = rows.get((user_id, category_id))
+        if stats is None:
+            stats = rows[(user_id, category_id)] = CategorySpendingStats(
+                user_id=user_id, category_id=category_id, count=0, mean=0.0, m2=0.0, recent=[]
+            )
+        stats.count += 1
+        delta = amount - stats.mean
+        stats.mean += delta / stats.count
+        stats.m2 += delta * (amount - stats.mean)
+        stats.recent = (stats.recent + [amount])[-RECENT_WINDOW:]
+
+    for stats in rows.values():
+        stats.recent_p95 = _p95(stats.recent)
+    CategorySpendingStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('expenses', '0004_categorybudget_expenses_ca_user_id_0141d5_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySpendingStats',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('count', models.IntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('recent', models.JSONField(default=list)),
+                ('recent_p95', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spending_stats', to='expenses.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'category spending stats',
+                'unique_together': {('user', 'category')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
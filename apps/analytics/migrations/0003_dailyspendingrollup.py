@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_daily_rollups(apps, schema_editor):
+    """Populate daily rollups from existing expenses (same logic as rebuild_rollups)"""
+    Expense = apps.get_model('expenses', 'Expense')
+    DailySpendingRollup = apps.get_model('analytics', 'DailySpendingRollup')
+
+    days = (
+        Expense.objects.filter(is_deleted=False)
+        .values('user_id', 'expense_date')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    DailySpendingRollup.objects.bulk_create(
+        (
+            DailySpendingRollup(
+                user_id=row['user_id'], date=row['expense_date'], total=row['total'], count=row['count']
+            )
+            for row in days.iterator(chunk_size=2000)
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_categoryspendingstats'),
+        ('expenses', '0004_categorybudget_expenses_ca_user_id_0141d5_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySpendingRollup',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_rollups, migrations.RunPython.noop),
+    ]
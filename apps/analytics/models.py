@@ -1,3 +1,112 @@
 from django.db import models
+from django.conf import settings
+import uuid
 
-# Create your models here.
+from apps.expenses.models import Category
+
+
+class MonthlySpendingRollup(models.Model):
+    """
+    Per-user, per-category monthly spending totals.
+    Maintained incrementally on every expense write (see rollups.py),
+    rebuilt from raw expenses with `manage.py rebuild_rollups`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="monthly_rollups"
+    )
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="monthly_rollups"
+    )
+
+    year = models.IntegerField()
+    month = models.IntegerField()  # 1-12
+
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Unique index doubles as the (user, year, month) lookup index
+        unique_together = ("user", "year", "month", "category")
+        ordering = ["-year", "-month"]
+
+    def __str__(self):
+        return f"{self.category.name}: {self.total} ({self.month}/{self.year})"
+
+
+class DailySpendingRollup(models.Model):
+    """
+    Per-user daily spending totals, across categories.
+    Maintained incrementally on every expense write (see rollups.py) and
+    rebuilt with `manage.py rebuild_rollups`; read as dense series through
+    rollups.daily_series().
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="daily_rollups"
+    )
+
+    date = models.DateField()
+
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Unique index doubles as the (user, date range) lookup index
+        unique_together = ("user", "date")
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.user.email}: {self.total} ({self.date})"
+
+
+class CategorySpendingStats(models.Model):
+    """
+    Running statistics of expense amounts per user and category, for
+    constant-time anomaly checks (see spending_stats.py).
+    count/mean/m2 follow Welford's algorithm over all expenses; `recent` holds
+    the latest amounts written, for a quantile that tracks recent behaviour.
+    Rebuilt from raw expenses with `manage.py rebuild_spending_stats`.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="category_stats"
+    )
+
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        related_name="spending_stats"
+    )
+
+    count = models.IntegerField(default=0)
+    mean = models.FloatField(default=0)
+    m2 = models.FloatField(default=0)  # Sum of squared deviations from the mean
+
+    recent = models.JSONField(default=list)  # Latest amounts, oldest first
+    recent_p95 = models.FloatField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("user", "category")
+        verbose_name_plural = "category spending stats"
+
+    def __str__(self):
+        return f"{self.category.name}: n={self.count} mean={self.mean:.2f}"
@@ -0,0 +1,250 @@
+"""
+Spending Rollups - incremental maintenance and aggregate reads
+
+All monthly spending aggregates (dashboard totals, budget history, AI forecasts)
+read from MonthlySpendingRollup instead of summing raw Expense rows, so their
+cost no longer grows with a user's expense history. Daily series (burn rate,
+budget risk, the cumulative spend chart) read from DailySpendingRollup.
+"""
+import datetime
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, FilteredRelation, Q, Sum, Count
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from apps.expenses.models import Category, Expense, ExpenseSnapshot
+from apps.expenses.periods import Period
+from .models import DailySpendingRollup, MonthlySpendingRollup
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================
+# INCREMENTAL MAINTENANCE
+# ======================================
+def _bucket(snapshot: ExpenseSnapshot) -> Tuple:
+    return (
+        snapshot.user_id,
+        snapshot.category_id,
+        snapshot.expense_date.year,
+        snapshot.expense_date.month,
+    )
+
+
+def _apply_delta(model, lookup: Dict, amount: Decimal, count: int):
+    """Add amount/count to one rollup row, creating it if it doesn't exist yet"""
+    updated = model.objects.filter(**lookup).update(
+        total=F("total") + amount,
+        count=F("count") + count,
+    )
+    if updated:
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(total=amount, count=count, **lookup)
+    except IntegrityError:
+        # A concurrent write created the row first
+        model.objects.filter(**lookup).update(
+            total=F("total") + amount,
+            count=F("count") + count,
+        )
+
+
+def record_expense_change(before: Optional[ExpenseSnapshot], after: Optional[ExpenseSnapshot]):
+    """
+    Apply one expense write to the monthly and daily rollups.
+    Must run inside the transaction that wrote the expense.
+    """
+    monthly = defaultdict(lambda: [Decimal("0"), 0])
+    daily = defaultdict(lambda: [Decimal("0"), 0])
+
+    for snapshot, sign in ((before, -1), (after, 1)):
+        if snapshot is None:
+            continue
+        for deltas, key in (
+            (monthly, _bucket(snapshot)),
+            (daily, (snapshot.user_id, snapshot.expense_date)),
+        ):
+            deltas[key][0] += sign * snapshot.amount
+            deltas[key][1] += sign
+
+    for (user_id, category_id, year, month), (amount, count) in monthly.items():
+        if amount or count:
+            lookup = dict(user_id=user_id, category_id=category_id, year=year, month=month)
+            _apply_delta(MonthlySpendingRollup, lookup, amount, count)
+
+    for (user_id, date), (amount, count) in daily.items():
+        if amount or count:
+            _apply_delta(DailySpendingRollup, dict(user_id=user_id, date=date), amount, count)
+
+
+def lock_for_rebuild(user) -> None:
+    """
+    Hold off the user's expense writes until the current transaction ends, so a
+    rebuild reads and swaps its rows without a write committing in between.
+    New expenses wait on the user row (their foreign key check takes a share
+    lock on it), edits, deletes and restores on their own expense row.
+    No-op on databases without row locks (SQLite serializes writers anyway).
+    """
+    list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list("pk"))
+    list(Expense.objects.select_for_update().filter(user=user).values_list("pk"))
+
+
+def rebuild_rollups_for_user(user) -> int:
+    """
+    Recompute every monthly and daily rollup row for a user from raw expenses.
+    Returns the number of rollup rows written.
+    """
+    with transaction.atomic():
+        lock_for_rebuild(user)
+
+        expenses = Expense.objects.filter(user=user, is_deleted=False)
+        aggregates = (
+            expenses
+            .annotate(year=ExtractYear("expense_date"), month=ExtractMonth("expense_date"))
+            .values("category_id", "year", "month")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+
+        rows = [
+            MonthlySpendingRollup(
+                user=user,
+                category_id=row["category_id"],
+                year=row["year"],
+                month=row["month"],
+                total=row["total"],
+                count=row["count"],
+            )
+            for row in aggregates
+        ]
+        days = [
+            DailySpendingRollup(user=user, date=row["expense_date"], total=row["total"], count=row["count"])
+            for row in (
+                expenses.values("expense_date")
+                .annotate(total=Sum("amount"), count=Count("id"))
+                .order_by()
+            )
+        ]
+
+        MonthlySpendingRollup.objects.filter(user=user).delete()
+        MonthlySpendingRollup.objects.bulk_create(rows, batch_size=500)
+        DailySpendingRollup.objects.filter(user=user).delete()
+        DailySpendingRollup.objects.bulk_create(days, batch_size=500)
+
+    return len(rows) + len(days)
+
+
+# ======================================
+# AGGREGATE READS
+# ======================================
+def _months_q(months: Iterable[Tuple[int, int]], prefix: str = "") -> Q:
+    q = Q(**{f"{prefix}pk__in": []})
+    for year, month in months:
+        q |= Q(**{f"{prefix}year": year, f"{prefix}month": month})
+    return q
+
+
+def total_spent(user) -> Decimal:
+    """All-time spending for a user"""
+    return (
+        MonthlySpendingRollup.objects.filter(user=user)
+        .aggregate(total=Sum("total"))["total"]
+        or Decimal("0")
+    )
+
+
+def month_spent(user, year: int, month: int, category=None) -> Decimal:
+    """Spending for one month, optionally restricted to a category"""
+    rollups = MonthlySpendingRollup.objects.filter(user=user, year=year, month=month)
+    if category is not None:
+        rollups = rollups.filter(category=category)
+    return rollups.aggregate(total=Sum("total"))["total"] or Decimal("0")
+
+
+def monthly_totals(user, months: Optional[Iterable[Tuple[int, int]]] = None,
+                   category=None) -> Dict[Tuple[int, int], Decimal]:
+    """
+    Spending per (year, month) in a single query.
+    Restricted to `months` when given; months without spending are omitted.
+    """
+    rollups = MonthlySpendingRollup.objects.filter(user=user)
+    if months is not None:
+        rollups = rollups.filter(_months_q(months))
+    if category is not None:
+        rollups = rollups.filter(category=category)
+
+    return {
+        (row["year"], row["month"]): row["total"]
+        for row in rollups.values("year", "month").annotate(total=Sum("total")).order_by()
+    }
+
+
+def category_totals(user, year: int, month: int) -> List[Dict]:
+    """Per-category spending for one month (categories with spending only)"""
+    return list(
+        MonthlySpendingRollup.objects.filter(user=user, year=year, month=month, count__gt=0)
+        .values("category_id", "category__name")
+        .annotate(total=Sum("total"))
+        .order_by("category__name")
+    )
+
+
+def category_monthly_totals(user, months: Iterable[Tuple[int, int]]) -> List[Dict]:
+    """
+    Spending per (category, year, month) for the given months, in one grouped query.
+    Every category of the user is included, ordered by name:
+    [{"category_id", "name", "totals": {(year, month): Decimal}}]
+    """
+    months = list(months)
+    rows = (
+        Category.objects.filter(user=user)
+        .annotate(
+            window=FilteredRelation(
+                "monthly_rollups",
+                condition=_months_q(months, prefix="monthly_rollups__"),
+            )
+        )
+        .values("id", "name", "window__year", "window__month")
+        .annotate(total=Sum("window__total"))
+        .order_by("name", "id")
+    )
+
+    categories = {}
+    for row in rows:
+        entry = categories.setdefault(
+            row["id"], {"category_id": row["id"], "name": row["name"], "totals": {}}
+        )
+        if row["window__year"] is not None:
+            entry["totals"][(row["window__year"], row["window__month"])] = row["total"]
+    return list(categories.values())
+
+
+class DailyPoint(NamedTuple):
+    date: datetime.date
+    total: Decimal
+    count: int
+
+
+def daily_series(user, period: Period) -> List[DailyPoint]:
+    """
+    One point per day of `period`, oldest first, zero-filled for days without
+    spending. A single range read on the (user, date) unique index.
+    """
+    stored = {
+        date: (total, count)
+        for date, total, count in DailySpendingRollup.objects.filter(period.q("date"), user=user)
+        .values_list("date", "total", "count")
+    }
+    series = []
+    for offset in range(period.days):
+        date = period.start + datetime.timedelta(days=offset)
+        total, count = stored.get(date, (Decimal("0"), 0))
+        series.append(DailyPoint(date, total, count))
+    return series
@@ -0,0 +1,17 @@
+from django.dispatch import receiver
+
+from apps.expenses.signals import expense_changed
+from . import spending_stats
+from .rollups import record_expense_change
+
+
+@receiver(expense_changed)
+def update_spending_rollups(sender, before, after, **kwargs):
+    """Keep monthly rollups in step with the expense write (same transaction)"""
+    record_expense_change(before, after)
+
+
+@receiver(expense_changed)
+def update_category_stats(sender, before, after, **kwargs):
+    """Keep per-category amount statistics in step with the expense write (same transaction)"""
+    spending_stats.record_expense_change(before, after)
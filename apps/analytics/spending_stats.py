@@ -0,0 +1,185 @@
+"""
+Per-category spending statistics - incremental maintenance and anomaly checks
+
+Each (user, category) keeps a running count, mean and M2 (Welford) over all of
+its expense amounts, plus a window of the most recent amounts and their 95th
+percentile. An amount is anomalous when it is more than ANOMALY_Z_SCORE
+standard deviations above its own category's mean *and* above the recent p95,
+so a normal rent payment is never compared against coffee.
+
+Checking an amount needs only the category's stats row: constant time,
+independent of the user's expense history.
+"""
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from django.db import IntegrityError, transaction
+
+from apps.expenses.models import Expense, ExpenseSnapshot
+from .models import CategorySpendingStats
+from .rollups import lock_for_rebuild
+
+# Amounts kept for the recent-window quantile
+RECENT_WINDOW = 50
+RECENT_QUANTILE = 0.95
+
+# Don't judge categories with fewer expenses than this
+MIN_SAMPLES = 5
+ANOMALY_Z_SCORE = 2.0
+
+
+class Baseline(NamedTuple):
+    """What an anomaly check needs from a CategorySpendingStats row"""
+    count: int
+    mean: float
+    std: float
+    recent_p95: Optional[float]
+
+
+# ======================================
+# RUNNING STATISTICS
+# ======================================
+def quantile(values: Iterable[float], q: float) -> Optional[float]:
+    """Linear-interpolated quantile, None for no values"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def add_amount(stats: CategorySpendingStats, amount: float) -> None:
+    """Welford update for one new amount (in memory)"""
+    stats.count += 1
+    delta = amount - stats.mean
+    stats.mean += delta / stats.count
+    stats.m2 += delta * (amount - stats.mean)
+
+    stats.recent = (list(stats.recent) + [amount])[-RECENT_WINDOW:]
+    stats.recent_p95 = quantile(stats.recent, RECENT_QUANTILE)
+
+
+def remove_amount(stats: CategorySpendingStats, amount: float) -> None:
+    """Inverse Welford update for an amount that no longer counts (in memory)"""
+    if stats.count <= 1:
+        stats.count, stats.mean, stats.m2 = 0, 0.0, 0.0
+    else:
+        old_mean = stats.mean
+        stats.count -= 1
+        stats.mean = (old_mean * (stats.count + 1) - amount) / stats.count
+        stats.m2 = max(0.0, stats.m2 - (amount - old_mean) * (amount - stats.mean))
+
+    recent = list(stats.recent)
+    if amount in recent:
+        recent.reverse()
+        recent.remove(amount)  # Most recent occurrence
+        recent.reverse()
+    stats.recent = recent
+    stats.recent_p95 = quantile(recent, RECENT_QUANTILE)
+
+
+def baseline(stats: CategorySpendingStats) -> Baseline:
+    std = math.sqrt(stats.m2 / stats.count) if stats.count else 0.0
+    return Baseline(stats.count, stats.mean, std, stats.recent_p95)
+
+
+def is_anomalous(base: Optional[Baseline], amount: float) -> bool:
+    """Whether `amount` is unusually high for the category described by `base`"""
+    if base is None or base.count < MIN_SAMPLES:
+        return False
+    if amount <= base.mean + ANOMALY_Z_SCORE * base.std:
+        return False
+    return base.recent_p95 is None or amount > base.recent_p95
+
+
+# ======================================
+# INCREMENTAL MAINTENANCE
+# ======================================
+def _locked_stats(user_id, category_id) -> CategorySpendingStats:
+    """The stats row for (user, category), locked for update, created if missing"""
+    lookup = dict(user_id=user_id, category_id=category_id)
+    stats = CategorySpendingStats.objects.select_for_update().filter(**lookup).first()
+    if stats is not None:
+        return stats
+
+    try:
+        with transaction.atomic():
+            return CategorySpendingStats.objects.create(**lookup)
+    except IntegrityError:
+        # A concurrent write created the row first
+        return CategorySpendingStats.objects.select_for_update().get(**lookup)
+
+
+def record_expense_change(before: Optional[ExpenseSnapshot], after: Optional[ExpenseSnapshot]):
+    """
+    Apply one expense write to the category stats.
+    Must run inside the transaction that wrote the expense.
+    """
+    if before == after:
+        return
+
+    changes = defaultdict(lambda: ([], []))  # (user_id, category_id) -> (removed, added)
+    if before is not None:
+        changes[(before.user_id, before.category_id)][0].append(float(before.amount))
+    if after is not None:
+        changes[(after.user_id, after.category_id)][1].append(float(after.amount))
+
+    for (user_id, category_id), (removed, added) in changes.items():
+        stats = _locked_stats(user_id, category_id)
+        for amount in removed:
+            remove_amount(stats, amount)
+        for amount in added:
+            add_amount(stats, amount)
+        stats.save()
+
+
+def rebuild_stats_for_user(user) -> int:
+    """
+    Recompute every stats row for a user from raw expenses, oldest first.
+    Returns the number of stats rows written.
+    """
+    with transaction.atomic():
+        # Writes committing between the read and the swap would be lost
+        lock_for_rebuild(user)
+
+        rows = {}
+        amounts = (
+            Expense.objects.filter(user=user, is_deleted=False)
+            .order_by("category_id", "expense_date", "created_at")
+            .values_list("category_id", "amount")
+        )
+        for category_id, amount in amounts.iterator(chunk_size=2000):
+            stats = rows.get(category_id)
+            if stats is None:
+                stats = rows[category_id] = CategorySpendingStats(user=user, category_id=category_id)
+            add_amount(stats, float(amount))
+
+        CategorySpendingStats.objects.filter(user=user).delete()
+        CategorySpendingStats.objects.bulk_create(rows.values(), batch_size=500)
+
+    return len(rows)
+
+
+# ======================================
+# READS
+# ======================================
+def baselines_for_users(user_ids: Iterable) -> Dict:
+    """{user_id: {category_id: Baseline}} in one query"""
+    result = defaultdict(dict)
+    for stats in CategorySpendingStats.objects.filter(user_id__in=list(user_ids)):
+        result[stats.user_id][stats.category_id] = baseline(stats)
+    return result
+
+
+def baselines_for_user(user) -> Dict:
+    """{category_id: Baseline} for one user"""
+    return baselines_for_users([user.pk]).get(user.pk, {})
+
+
+def category_baseline(user_id, category_id) -> Optional[Baseline]:
+    """Baseline for one category (single indexed lookup), None if it has no stats yet"""
+    stats = CategorySpendingStats.objects.filter(user_id=user_id, category_id=category_id).first()
+    return baseline(stats) if stats is not None else None
@@ -1,3 +1,207 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from apps.expenses import periods
+from apps.expenses.models import Category, Expense
+from . import rollups, spending_stats
+from .models import CategorySpendingStats, DailySpendingRollup, MonthlySpendingRollup
+
+User = get_user_model()
+
+
+class CategorySpendingStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        self.coffee = Category.objects.create(user=self.user, name="Coffee")
+        self.rent = Category.objects.create(user=self.user, name="Rent")
+
+    def add(self, category, amount, day=1):
+        return Expense.objects.create(
+            user=self.user, category=category, title=category.name,
+            amount=Decimal(amount), expense_date=datetime.date(2026, 3, day),
+        )
+
+    def stats(self):
+        return {
+            row.category_id: (row.count, round(row.mean, 6), round(row.m2, 6), sorted(row.recent))
+            for row in CategorySpendingStats.objects.filter(user=self.user, count__gt=0)
+        }
+
+    def test_incremental_updates_match_rebuild(self):
+        for day, amount in enumerate(["4.50", "5.00", "3.75", "6.20", "4.10"], start=1):
+            self.add(self.coffee, amount, day)
+        rent = self.add(self.rent, "1500.00")
+
+        moved = self.add(self.coffee, "7.00", day=9)
+        moved.category = self.rent
+        moved.amount = Decimal("1450.00")
+        moved.save()
+
+        removed = self.add(self.coffee, "8.00", day=10)
+        removed.delete()
+
+        rent.is_deleted = True
+        rent.save()
+
+        incremental = self.stats()
+        spending_stats.rebuild_stats_for_user(self.user)
+        self.assertEqual(incremental, self.stats())
+        self.assertEqual(incremental[self.coffee.id][0], 5)
+        self.assertEqual(incremental[self.rent.id][0], 1)
+
+    def test_restore_and_date_move_match_rebuild(self):
+        for day, amount in enumerate(["4.50", "5.00", "3.75"], start=1):
+            self.add(self.coffee, amount, day)
+        restored = self.add(self.coffee, "6.00", day=4)
+        restored.is_deleted = True
+        restored.save()
+        restored.is_deleted = False
+        restored.save()
+
+        moved = self.add(self.rent, "1500.00", day=5)
+        moved.expense_date = datetime.date(2026, 4, 1)
+        moved.amount = Decimal("1550.00")
+        moved.save()
+
+        incremental = self.stats()
+        spending_stats.rebuild_stats_for_user(self.user)
+        self.assertEqual(incremental, self.stats())
+        self.assertEqual(incremental[self.coffee.id][0], 4)
+        self.assertEqual(incremental[self.rent.id][3], [1550.0])
+
+    def test_anomalies_are_judged_per_category(self):
+        for day in range(1, 11):
+            self.add(self.coffee, "5.00", day)
+            self.add(self.rent, "1500.00", day)
+
+        baselines = spending_stats.baselines_for_user(self.user)
+        coffee, rent = baselines[self.coffee.id], baselines[self.rent.id]
+
+        self.assertFalse(spending_stats.is_anomalous(rent, 1500.0))
+        self.assertTrue(spending_stats.is_anomalous(coffee, 60.0))
+        self.assertFalse(spending_stats.is_anomalous(coffee, 5.0))
+        self.assertFalse(spending_stats.is_anomalous(None, 1_000_000.0))
+
+
+class MonthlySpendingRollupTests(TestCase):
+    """Every kind of expense write keeps the rollups equal to a rebuild from raw expenses"""
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        self.food = Category.objects.create(user=self.user, name="Food")
+        self.rent = Category.objects.create(user=self.user, name="Rent")
+
+    def add(self, category, amount, date):
+        return Expense.objects.create(
+            user=self.user, category=category, title=category.name,
+            amount=Decimal(amount), expense_date=date,
+        )
+
+    def stored(self):
+        monthly = sorted(
+            MonthlySpendingRollup.objects.filter(user=self.user, count__gt=0)
+            .values_list("category__name", "year", "month", "total", "count")
+        )
+        daily = sorted(
+            DailySpendingRollup.objects.filter(user=self.user, count__gt=0)
+            .values_list("date", "total", "count")
+        )
+        return monthly, daily
+
+    def assertMatchesRebuild(self, expected_monthly):
+        incremental = self.stored()
+        self.assertEqual(incremental[0], expected_monthly)
+        rollups.rebuild_rollups_for_user(self.user)
+        self.assertEqual(self.stored(), incremental)
+
+    def test_create_and_edit(self):
+        expense = self.add(self.food, "10.00", datetime.date(2026, 1, 5))
+        self.add(self.food, "5.00", datetime.date(2026, 1, 9))
+        expense.amount = Decimal("12.50")
+        expense.save()
+        self.assertMatchesRebuild([("Food", 2026, 1, Decimal("17.50"), 2)])
+
+    def test_soft_delete_and_restore(self):
+        expense = self.add(self.food, "10.00", datetime.date(2026, 1, 5))
+        self.add(self.food, "5.00", datetime.date(2026, 1, 9))
+        expense.is_deleted = True
+        expense.save()
+        self.assertMatchesRebuild([("Food", 2026, 1, Decimal("5.00"), 1)])
+
+        expense.is_deleted = False
+        expense.save()
+        self.assertMatchesRebuild([("Food", 2026, 1, Decimal("15.00"), 2)])
+
+    def test_date_and_category_moves(self):
+        expense = self.add(self.food, "10.00", datetime.date(2026, 1, 31))
+        self.add(self.rent, "500.00", datetime.date(2026, 1, 1))
+
+        expense.expense_date = datetime.date(2026, 2, 1)
+        expense.save()
+        self.assertMatchesRebuild([
+            ("Food", 2026, 2, Decimal("10.00"), 1),
+            ("Rent", 2026, 1, Decimal("500.00"), 1),
+        ])
+
+        expense.category = self.rent
+        expense.expense_date = datetime.date(2026, 1, 15)
+        expense.save()
+        self.assertMatchesRebuild([("Rent", 2026, 1, Decimal("510.00"), 2)])
+
+        expense.delete()
+        self.assertMatchesRebuild([("Rent", 2026, 1, Decimal("500.00"), 1)])
+
+
+class DailySpendingRollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username="user", email="user@example.com")
+        self.food = Category.objects.create(user=self.user, name="Food")
+        self.rent = Category.objects.create(user=self.user, name="Rent")
+
+    def add(self, category, amount, day):
+        return Expense.objects.create(
+            user=self.user, category=category, title=category.name,
+            amount=Decimal(amount), expense_date=datetime.date(2026, 2, day),
+        )
+
+    def stored(self):
+        return sorted(
+            DailySpendingRollup.objects.filter(user=self.user, count__gt=0)
+            .values_list("date", "total", "count")
+        )
+
+    def test_incremental_updates_match_rebuild(self):
+        self.add(self.food, "10.00", day=1)
+        self.add(self.rent, "500.00", day=1)
+        moved = self.add(self.food, "20.00", day=3)
+        moved.expense_date = datetime.date(2026, 2, 5)
+        moved.amount = Decimal("25.00")
+        moved.save()
+        self.add(self.food, "7.00", day=8).delete()
+
+        incremental = self.stored()
+        self.assertEqual(incremental, [
+            (datetime.date(2026, 2, 1), Decimal("510.00"), 2),
+            (datetime.date(2026, 2, 5), Decimal("25.00"), 1),
+        ])
+
+        rollups.rebuild_rollups_for_user(self.user)
+        self.assertEqual(self.stored(), incremental)
+
+    def test_daily_series_is_dense_and_one_query(self):
+        self.add(self.food, "10.00", day=2)
+        self.add(self.food, "5.00", day=28)
+
+        with self.assertNumQueries(1):
+            series = rollups.daily_series(self.user, periods.month(2026, 2))
+
+        self.assertEqual(len(series), 28)
+        self.assertEqual(series[0], (datetime.date(2026, 2, 1), Decimal("0"), 0))
+        self.assertEqual(series[1].total, Decimal("10.00"))
+        self.assertEqual(series[-1], (datetime.date(2026, 2, 28), Decimal("5.00"), 1))
+        self.assertEqual(sum(point.total for point in series), Decimal("15.00"))
@@ -3,3 +3,15 @@ from django.apps import AppConfig
 
 class ExpensesConfig(AppConfig):
     name = 'apps.expenses'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from .autocomplete import update_on_expense_change
+        from .search import repair_search_index
+        from .signals import expense_changed
+        from .user_cache import invalidate_on_expense_change
+
+        expense_changed.connect(invalidate_on_expense_change, dispatch_uid="expenses_invalidate_user_cache")
+        expense_changed.connect(update_on_expense_change, dispatch_uid="expenses_update_title_index")
+        post_migrate.connect(repair_search_index, sender=self, dispatch_uid="expenses_repair_search_index")
@@ -0,0 +1,121 @@
+"""
+Expense title autocomplete: a per-user prefix index over distinct titles
+
+    autocomplete.suggest(user.id, "gro")   # ["Groceries", "Grofers order"]
+
+Each user's index is three parallel lists sorted by key (the casefolded,
+whitespace-collapsed title): keys, display titles and how many of the user's
+expenses carry that title. A prefix selects the contiguous range
+bisect(keys, prefix) .. bisect(keys, prefix + max char), and the most frequent
+titles in it are returned, so a lookup costs no database query.
+
+The index lives in the user-cache tiers (shared cache, plus the per-worker LRU
+when enabled). It is built lazily from one grouped query on first use, then
+patched in place on expense writes: expense_changed carries the old and new
+title, and the index is adjusted after commit. Writes while no index is cached
+are ignored; the next lookup builds it from the database. Concurrent writes
+for one user can lose an increment, which only affects ranking; the index
+expires after TITLE_INDEX_TTL and is rebuilt.
+"""
+import bisect
+import heapq
+from typing import List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import user_cache
+from .models import Expense
+
+MAX_TITLES = 2000  # Most frequent distinct titles kept per user
+MAX_SUGGESTIONS = 8
+TITLE_INDEX_TTL = 60 * 60 * 24
+
+Index = Tuple[List[str], List[str], List[int]]  # (keys, titles, counts), sorted by key
+
+
+def title_key(title: str) -> str:
+    return " ".join(title.split()).casefold()
+
+
+def _index_key(user_id) -> str:
+    return f"title_index:{user_id}"
+
+
+def build_index(user_id) -> Index:
+    """Index from the user's expenses: one grouped query"""
+    rows = (
+        Expense.objects.filter(user_id=user_id, is_deleted=False)
+        .values_list("title")
+        .annotate(count=Count("id"))
+        .order_by("-count")[:MAX_TITLES]
+    )
+    entries = {}
+    for title, count in rows:
+        key = title_key(title)
+        if not key:
+            continue
+        # Spelling variants of one key merge; the most common spelling is shown
+        if key in entries:
+            entries[key][1] += count
+        else:
+            entries[key] = [title.strip(), count]
+
+    keys = sorted(entries)
+    return keys, [entries[k][0] for k in keys], [entries[k][1] for k in keys]
+
+
+def get_index(user_id) -> Index:
+    key = _index_key(user_id)
+    index = user_cache.tiers().get(key)
+    if index is None:
+        index = build_index(user_id)
+        user_cache.tiers().set(key, index, TITLE_INDEX_TTL)
+    return index
+
+
+def drop_index(user_id) -> None:
+    """Forget the index after writes that bypass expense_changed (bulk deletes)"""
+    user_cache.tiers().delete(_index_key(user_id))
+
+
+def suggest(user_id, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[str]:
+    """Most frequent titles starting with `prefix` (the most frequent overall if empty)"""
+    keys, titles, counts = get_index(user_id)
+    prefix = title_key(prefix)
+    lo = bisect.bisect_left(keys, prefix)
+    hi = bisect.bisect_left(keys, prefix + "\U0010ffff", lo) if prefix else len(keys)
+    best = heapq.nlargest(limit, range(lo, hi), key=counts.__getitem__)
+    return [titles[i] for i in best]
+
+
+def apply_title_change(user_id, before_title: Optional[str], after_title: Optional[str]) -> None:
+    """Patch the cached index for one expense write, if an index is cached"""
+    key = _index_key(user_id)
+    index = user_cache.tiers().get(key)
+    if index is None:
+        return
+
+    # Copy: with the local tier the cached lists are shared with readers
+    keys, titles, counts = (list(part) for part in index)
+    for title, delta in ((before_title, -1), (after_title, 1)):
+        if not title or not title_key(title):
+            continue
+        k = title_key(title)
+        i = bisect.bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k:
+            counts[i] += delta
+            if counts[i] <= 0:
+                del keys[i], titles[i], counts[i]
+        elif delta > 0 and len(keys) < MAX_TITLES:
+            keys.insert(i, k)
+            titles.insert(i, title.strip())
+            counts.insert(i, delta)
+    user_cache.tiers().set(key, (keys, titles, counts), TITLE_INDEX_TTL)
+
+
+def update_on_expense_change(sender, user_id, before_title=None, after_title=None, **kwargs):
+    """expense_changed receiver: patch the index once the write commits"""
+    if before_title == after_title:
+        return
+    transaction.on_commit(lambda: apply_title_change(user_id, before_title, after_title))
@@ -0,0 +1,282 @@
+"""
+Dashboard Data Service - aggregates for the dashboard in a fixed number of queries
+
+Everything the dashboard shows about spending is computed from four queries,
+regardless of how many categories or expenses the user has:
+
+1. Categories LEFT JOIN monthly rollups LEFT JOIN the month's CategoryBudget,
+   with conditional aggregation for all-time and selected-month spending per
+   category.
+2. The MonthlyBudget for the selected month.
+3. The user's persisted spending forecast, served as stored even when out of
+   date: the insight worker refits it (see ai_engine.forecasting).
+4. The month's daily rollups, for the cumulative spending (burn) chart.
+
+The result is cached as a schema-versioned structure of primitives (see
+serialize_dashboard) rather than pickled model instances and Decimals.
+"""
+import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.db.models import F, FilteredRelation, Q, Sum
+from django.utils import timezone
+
+from apps.ai_engine.forecasting import get_forecast
+from apps.ai_engine.models import SpendingInsight
+from apps.analytics.rollups import daily_series
+from . import periods
+from .models import Category, MonthlyBudget
+
+# Bump whenever the serialized layout changes. Entries written under another
+# version (e.g. by the other half of a rolling deploy) are treated as misses.
+DASHBOARD_SCHEMA_VERSION = 3  # 3: daily spending for the burn chart
+
+INSIGHT_TYPE_LABELS = dict(SpendingInsight.INSIGHT_TYPES)
+SEVERITY_LABELS = dict(SpendingInsight.SEVERITY_LEVELS)
+
+
+def _month_sum(year: int, month: int, field: str = "total") -> Sum:
+    return Sum(
+        f"monthly_rollups__{field}",
+        filter=Q(monthly_rollups__year=year, monthly_rollups__month=month),
+    )
+
+
+def _budget_status(percentage) -> str:
+    if percentage > 100:
+        return "danger"
+    if percentage > 80:
+        return "warning"
+    return "success"
+
+
+def category_aggregates(user, year: int, month: int) -> List[Dict]:
+    """
+    One row per category: id, name, budget (None if not set for the month),
+    all_time, month_spent and month_count.
+    """
+    return list(
+        Category.objects.filter(user=user)
+        .annotate(
+            month_budget=FilteredRelation(
+                "budgets",
+                condition=Q(budgets__year=year, budgets__month=month),
+            )
+        )
+        .values("id", "name", budget=F("month_budget__amount"))
+        .annotate(
+            all_time=Sum("monthly_rollups__total"),
+            month_spent=_month_sum(year, month),
+            month_count=_month_sum(year, month, field="count"),
+        )
+        .order_by("name")
+    )
+
+
+def get_dashboard_data(user, year: int, month: int) -> Dict:
+    """Spending, budget and forecast figures for the dashboard of one month"""
+    rows = category_aggregates(user, year, month)
+    period = periods.month(year, month)
+    elapsed = period.days_elapsed(timezone.localdate())
+
+    budget_amount = (
+        MonthlyBudget.objects.filter(user=user, year=year, month=month)
+        .values_list("amount", flat=True)
+        .first()
+    ) or 0
+
+    total_spent = Decimal("0")
+    monthly_spent = Decimal("0")
+    category_data = []
+    category_budget_data = []
+    total_category_budget = 0
+
+    for row in rows:
+        spent = row["month_spent"] or Decimal("0")
+        total_spent += row["all_time"] or 0
+        monthly_spent += spent
+
+        if spent:
+            category_data.append({
+                "category_id": row["id"],
+                "category__name": row["name"],
+                "total": spent,
+            })
+
+        budget = row["budget"]
+        if budget is None:
+            continue
+
+        percentage = (spent / budget * 100) if budget > 0 else 0
+        category_budget_data.append({
+            "category": {"id": row["id"], "name": row["name"]},
+            "budget": budget,
+            "spent": spent,
+            "remaining": budget - spent,
+            "percentage": round(percentage, 1),
+            "status": _budget_status(percentage),
+            "count": row["month_count"] or 0,  # Expense rows load lazily per card
+        })
+        total_category_budget += budget
+
+    percentage_used = (monthly_spent / budget_amount * 100) if budget_amount > 0 else 0
+
+    return {
+        "total_spent": total_spent,
+        "monthly_spent": monthly_spent,
+        "category_data": category_data,
+        "budget_amount": budget_amount,
+        "remaining_amount": budget_amount - monthly_spent,
+        "percentage_used": round(percentage_used, 2),
+        "predicted_next_month": get_forecast(user, refit_outdated=False),
+        # Days of the month so far (the whole month once it has passed)
+        "daily_spending": [point.total for point in daily_series(user, period)[:elapsed]],
+        "days_in_month": period.days,
+        "category_budget_data": category_budget_data,
+        "total_category_budget": total_category_budget,
+        "unallocated_budget": budget_amount - total_category_budget,
+    }
+
+
+# ======================================
+# CACHE SERIALIZATION
+# ======================================
+def to_minor(amount) -> Optional[int]:
+    """Amount in rupees -> integer paise"""
+    if amount is None:
+        return None
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+def from_minor(minor: Optional[int]) -> Optional[Decimal]:
+    """Integer paise -> amount in rupees with two decimal places"""
+    if minor is None:
+        return None
+    return Decimal(minor).scaleb(-2)
+
+
+def serialize_dashboard(data: Dict) -> Dict:
+    """
+    Compact, pickle-safe form of get_dashboard_data() output plus `ai_insights`.
+    Only ints, floats, strings, lists and None: amounts in paise, UUIDs as strings,
+    rows as positional lists. Derived figures are recomputed on the way out.
+    """
+    return {
+        "v": DASHBOARD_SCHEMA_VERSION,
+        "total": to_minor(data["total_spent"]),
+        "month": to_minor(data["monthly_spent"]),
+        "budget": to_minor(data["budget_amount"]),
+        "forecast": to_minor(data["predicted_next_month"]),
+        "daily": [to_minor(total) for total in data["daily_spending"]],
+        "days": data["days_in_month"],
+        "categories": [
+            [str(item["category_id"]), item["category__name"], to_minor(item["total"])]
+            for item in data["category_data"]
+        ],
+        "category_budgets": [
+            [
+                str(item["category"]["id"]),
+                item["category"]["name"],
+                to_minor(item["budget"]),
+                to_minor(item["spent"]),
+                item["count"],
+            ]
+            for item in data["category_budget_data"]
+        ],
+        "insights": [
+            [
+                str(insight.id),
+                insight.insight_type,
+                insight.severity,
+                insight.title,
+                insight.message,
+                to_minor(insight.predicted_amount),
+                to_minor(insight.actual_amount),
+                insight.risk_score,
+                int(insight.created_at.timestamp()),
+            ]
+            for insight in data.get("ai_insights", [])
+        ],
+    }
+
+
+def burn_chart(daily_minor: List[int], days: int, budget_minor: int) -> Dict:
+    """
+    Cumulative spending per elapsed day of the month against an even pace to
+    the budget, in rupees, for the dashboard's burn chart
+    """
+    cumulative, running = [], 0
+    for minor in daily_minor:
+        running += minor
+        cumulative.append(running / 100)
+    return {
+        "labels": list(range(1, days + 1)),
+        "spent": cumulative,
+        "pace": [round(budget_minor / 100 * day / days, 2) for day in range(1, days + 1)],
+    }
+
+
+def deserialize_dashboard(payload) -> Optional[Dict]:
+    """
+    Template context from a serialize_dashboard() payload.
+    Returns None for anything written under a different schema version.
+    """
+    if not isinstance(payload, dict) or payload.get("v") != DASHBOARD_SCHEMA_VERSION:
+        return None
+
+    monthly_spent = from_minor(payload["month"])
+    budget_amount = from_minor(payload["budget"])
+    percentage_used = (monthly_spent / budget_amount * 100) if budget_amount > 0 else 0
+
+    category_budget_data = []
+    total_category_budget = Decimal("0.00")
+    for category_id, name, budget_minor, spent_minor, count in payload["category_budgets"]:
+        budget = from_minor(budget_minor)
+        spent = from_minor(spent_minor)
+        percentage = (spent / budget * 100) if budget > 0 else 0
+        category_budget_data.append({
+            "category": {"id": category_id, "name": name},
+            "budget": budget,
+            "spent": spent,
+            "remaining": budget - spent,
+            "percentage": round(percentage, 1),
+            "status": _budget_status(percentage),
+            "count": count,
+        })
+        total_category_budget += budget
+
+    ai_insights = []
+    for (insight_id, insight_type, severity, title, message,
+         predicted_minor, actual_minor, risk_score, created_ts) in payload["insights"]:
+        ai_insights.append({
+            "id": insight_id,
+            "insight_type": insight_type,
+            "type_label": INSIGHT_TYPE_LABELS.get(insight_type, insight_type),
+            "severity": severity,
+            "severity_label": SEVERITY_LABELS.get(severity, severity),
+            "title": title,
+            "message": message,
+            "predicted_amount": from_minor(predicted_minor),
+            "actual_amount": from_minor(actual_minor),
+            "risk_score": risk_score,
+            "created_at": datetime.datetime.fromtimestamp(created_ts, tz=datetime.timezone.utc),
+        })
+
+    return {
+        "total_spent": from_minor(payload["total"]),
+        "monthly_spent": monthly_spent,
+        "category_data": [
+            {"category_id": category_id, "category__name": name, "total": from_minor(total)}
+            for category_id, name, total in payload["categories"]
+        ],
+        "budget_amount": budget_amount,
+        "remaining_amount": budget_amount - monthly_spent,
+        "percentage_used": round(percentage_used, 2),
+        "predicted_next_month": from_minor(payload["forecast"]),
+        "burn_chart": burn_chart(payload["daily"], payload["days"], payload["budget"]),
+        "category_budget_data": category_budget_data,
+        "total_category_budget": total_category_budget,
+        "unallocated_budget": budget_amount - total_category_budget,
+        "ai_insights": ai_insights,
+    }
@@ -5,12 +5,14 @@ Only accessible to superusers
 from django.http import HttpResponse, HttpResponseForbidden
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.core.cache import cache
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 import random
 
+from . import autocomplete, periods, user_cache
 from .models import Expense, Category, MonthlyBudget, CategoryBudget
+from apps.ai_engine.models import SpendingForecast
+from apps.analytics.models import DailySpendingRollup, MonthlySpendingRollup
 
 
 @login_required
@@ -79,7 +81,7 @@ def add_demo_data(request):
     expenses_added = 0
     
     for month_offset in range(3):
-        month_date = now - timedelta(days=30 * month_offset)
+        year, month = periods.add_months(now.year, now.month, -month_offset)
         
         for cat_name, expense_types in categories_data:
             category = created_categories[cat_name]
@@ -101,7 +103,7 @@ def add_demo_data(request):
                     amount = Decimal(str(random.randint(500, 2500)))
                 
                 day = random.randint(1, 28)
-                expense_date = datetime(month_date.year, month_date.month, day).date()
+                expense_date = datetime(year, month, day).date()
                 
                 Expense.objects.create(
                     user=user,
@@ -126,16 +128,8 @@ def add_demo_data(request):
     )
     expenses_added += 1
     
-    # Clear dashboard cache to show fresh data
-    now = timezone.now()
-    cache_key = f'dashboard_{user.id}_{now.year}_{now.month}'
-    cache.delete(cache_key)
-    
-    # Also clear previous months cache (last 3 months)
-    for month_offset in range(1, 4):
-        month_date = now - timedelta(days=30 * month_offset)
-        cache_key = f'dashboard_{user.id}_{month_date.year}_{month_date.month}'
-        cache.delete(cache_key)
+    # Invalidate all cached pages (every month) to show fresh data
+    user_cache.invalidate_user(user.id)
     
     # Generate response
     html = f"""
@@ -225,18 +219,6 @@ def clear_demo_data(request):
     Web endpoint to clear demo data
     Only accessible to superusers
     URL: /demo-data/clear/
-    # Clear all cached dashboard data for this user (all months)
-    now = timezone.now()
-    # Clear current month and last 12 months to be thorough
-    for month_offset in range(13):
-        month_date = now - timedelta(days=30 * month_offset)
-        cache_key = f'dashboard_{user.id}_{month_date.year}_{month_date.month}'
-        cache.delete(cache_key)
-    
-    # Also clear AI insights if they're cached separately
-    from apps.ai_engine.models import SpendingInsight
-    SpendingInsight.objects.filter(user=user).delete()
-    
     """
     user = request.user
     
@@ -248,6 +230,14 @@ def clear_demo_data(request):
     categories_deleted = Category.objects.filter(user=user).count()
     Category.objects.filter(user=user).delete()
     
+    # Bulk deletes bypass expense_changed, so clear derived data explicitly:
+    # daily rollups and the total forecast have no category to cascade from
+    MonthlySpendingRollup.objects.filter(user=user).delete()
+    DailySpendingRollup.objects.filter(user=user).delete()
+    SpendingForecast.objects.filter(user=user).delete()
+    user_cache.invalidate_user(user.id)
+    autocomplete.drop_index(user.id)
+    
     html = f"""
     <!DOCTYPE html>
     <html>
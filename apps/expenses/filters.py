@@ -0,0 +1,141 @@
+"""
+Expense list filters: parsing, query conditions and cached statistics
+
+    filters = parse_filters(request.GET)
+    queryset = Expense.objects.filter(user=user, is_deleted=False).filter(*conditions(filters))
+    stats = list_stats(user, filters)
+
+parse_filters keeps only valid values, in canonical form (whitespace-collapsed
+lowercase search, UUID category, two-decimal amounts, ISO dates), so query
+strings that filter the same rows share one signature() and therefore one
+cached statistics entry. Invalid values are ignored.
+
+The statistics (all-time count, filtered count, filtered total) come from one
+conditional-aggregate query, cached under the filter signature and the user's
+cache generation: paging through a filtered list doesn't recompute them, and
+any expense write (which bumps the generation) does.
+"""
+import datetime
+import hashlib
+import uuid
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils.http import urlencode
+
+from . import pagination, user_cache
+from .models import Expense
+from .search import get_backend as search_backend
+
+FILTER_PARAMS = ("search", "category", "min_amount", "max_amount", "start_date", "end_date")
+
+STATS_SOFT_TTL = 60 * 15
+STATS_HARD_TTL = 60 * 60
+
+
+def parse_filters(params) -> Dict[str, str]:
+    """Valid filters from query parameters, normalized"""
+    filters = {}
+
+    search = " ".join(params.get("search", "").split()).lower()
+    if search:
+        filters["search"] = search
+
+    category = params.get("category", "").strip()
+    if category:
+        try:
+            filters["category"] = str(uuid.UUID(category))
+        except ValueError:
+            pass
+
+    for name in ("min_amount", "max_amount"):
+        value = params.get(name, "").strip()
+        if value:
+            try:
+                amount = Decimal(value)
+                if amount.is_finite():
+                    filters[name] = str(amount.quantize(Decimal("0.01")))
+            except InvalidOperation:
+                pass
+
+    for name in ("start_date", "end_date"):
+        value = params.get(name, "").strip()
+        if value:
+            try:
+                filters[name] = datetime.date.fromisoformat(value).isoformat()
+            except ValueError:
+                pass
+
+    return filters
+
+
+def conditions(filters: Dict[str, str]) -> List:
+    """Filter conditions (Q objects or boolean expressions) for Expense"""
+    result = []
+    if "search" in filters:
+        result.append(search_backend().condition(filters["search"]))
+    if "category" in filters:
+        result.append(Q(category_id=filters["category"]))
+    if "min_amount" in filters:
+        result.append(Q(amount__gte=Decimal(filters["min_amount"])))
+    if "max_amount" in filters:
+        result.append(Q(amount__lte=Decimal(filters["max_amount"])))
+    if "start_date" in filters:
+        result.append(Q(expense_date__gte=filters["start_date"]))
+    if "end_date" in filters:
+        result.append(Q(expense_date__lte=filters["end_date"]))
+    return result
+
+
+def signature(filters: Dict[str, str]) -> str:
+    """Stable, cache-key-safe identifier of a set of normalized filters"""
+    if not filters:
+        return "all"
+    return hashlib.sha1(urlencode(sorted(filters.items())).encode()).hexdigest()
+
+
+# ======================================
+# STATISTICS
+# ======================================
+def _compute_stats(user, filters: Dict[str, str]) -> Dict:
+    expenses = Expense.objects.filter(user=user, is_deleted=False)
+    matching = Q(*conditions(filters))
+    count_limit = getattr(settings, "EXPENSE_LIST_COUNT_LIMIT", None)
+
+    if count_limit:
+        # Approximate mode: bounded counts instead of one full aggregate
+        total, total_exact = pagination.count_up_to(expenses, count_limit)
+        filtered, filtered_exact = pagination.count_up_to(expenses.filter(matching), count_limit)
+        amount = expenses.filter(matching).aggregate(amount=Sum("amount"))["amount"]
+    else:
+        if filters:
+            row = expenses.aggregate(
+                total=Count("id"),
+                filtered=Count("id", filter=matching),
+                amount=Sum("amount", filter=matching),
+            )
+        else:
+            row = expenses.aggregate(total=Count("id"), amount=Sum("amount"))
+            row["filtered"] = row["total"]
+        total, filtered, amount = row["total"], row["filtered"], row["amount"]
+        total_exact = filtered_exact = True
+
+    return {
+        "total": total,
+        "total_exact": total_exact,
+        "filtered": filtered,
+        "filtered_exact": filtered_exact,
+        "amount": str(amount or Decimal("0")),
+    }
+
+
+def list_stats(user, filters: Dict[str, str]) -> Dict:
+    """Cached statistics for the expense list under the given filters"""
+    key = user_cache.make_key(user.id, "expense_list_stats", signature(filters))
+    stats = user_cache.get_or_compute(
+        key, lambda: _compute_stats(user, filters),
+        soft_ttl=STATS_SOFT_TTL, hard_ttl=STATS_HARD_TTL,
+    )
+    return dict(stats, amount=Decimal(stats["amount"]))
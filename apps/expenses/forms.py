@@ -123,6 +123,7 @@ class ExpenseFilterForm(forms.Form):
             ("amount", "Lowest Amount"),
             ("title", "Title (A-Z)"),
             ("-title", "Title (Z-A)"),
+            ("relevance", "Best Match"),
         ],
         label="Sort By",
         widget=forms.Select(attrs={
@@ -4,11 +4,15 @@ Usage: python manage.py add_demo_data --user=email@example.com
 """
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 import random
 
+from apps.ai_engine.models import SpendingForecast
+from apps.analytics.models import DailySpendingRollup, MonthlySpendingRollup
+from apps.expenses import autocomplete, periods, user_cache
 from apps.expenses.models import Expense, Category, MonthlyBudget, CategoryBudget
 
 User = get_user_model()
@@ -52,10 +56,17 @@ class Command(BaseCommand):
         # Clear existing data if requested
         if clear_data:
             self.stdout.write('Clearing existing data...')
-            Expense.objects.filter(user=user).delete()
-            CategoryBudget.objects.filter(user=user).delete()
-            MonthlyBudget.objects.filter(user=user).delete()
-            Category.objects.filter(user=user).delete()
+            with transaction.atomic():
+                Expense.objects.filter(user=user).delete()
+                CategoryBudget.objects.filter(user=user).delete()
+                MonthlyBudget.objects.filter(user=user).delete()
+                Category.objects.filter(user=user).delete()
+                # Bulk deletes bypass expense_changed, so clear derived data explicitly
+                MonthlySpendingRollup.objects.filter(user=user).delete()
+                DailySpendingRollup.objects.filter(user=user).delete()
+                SpendingForecast.objects.filter(user=user).delete()
+                user_cache.invalidate_user_on_commit(user.id)
+                transaction.on_commit(lambda: autocomplete.drop_index(user.id))
 
         # Create categories
         categories_data = [
@@ -115,7 +126,7 @@ class Command(BaseCommand):
         expenses_added = 0
 
         for month_offset in range(3):
-            month_date = now - timedelta(days=30 * month_offset)
+            year, month = periods.add_months(now.year, now.month, -month_offset)
             
             for cat_name, expense_types in categories_data:
                 category = created_categories[cat_name]
@@ -137,7 +148,7 @@ class Command(BaseCommand):
                         amount = Decimal(str(random.randint(500, 2500)))
                     
                     day = random.randint(1, 28)
-                    expense_date = datetime(month_date.year, month_date.month, day).date()
+                    expense_date = datetime(year, month, day).date()
                     
                     Expense.objects.create(
                         user=user,
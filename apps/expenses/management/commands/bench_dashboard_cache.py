@@ -0,0 +1,137 @@
+"""
+Management command to benchmark the dashboard cache payload
+Usage: python manage.py bench_dashboard_cache [--categories=30] [--insights=6] [--iterations=2000]
+
+Compares the versioned primitive payload (serialize_dashboard) with pickling the
+dashboard dict as it was cached before (Decimals, UUIDs, dates, model instances).
+Both go through pickle + zlib, which is what django-redis does with our settings.
+No database access - the dashboard data is synthetic.
+"""
+import datetime
+import pickle
+import time
+import uuid
+import zlib
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.ai_engine.models import SpendingInsight
+from apps.expenses.dashboard import deserialize_dashboard, serialize_dashboard
+from apps.expenses.models import Category
+
+
+def _synthetic_dashboard(categories: int, insights: int) -> dict:
+    category_data = []
+    category_budget_data = []
+    for i in range(categories):
+        category_id = uuid.uuid4()
+        spent = Decimal(f"{1234 + i * 17}.50")
+        budget = Decimal(f"{2000 + i * 25}.00")
+        category_data.append({
+            "category_id": category_id,
+            "category__name": f"Category {i}",
+            "total": spent,
+        })
+        category_budget_data.append({
+            "category": {"id": category_id, "name": f"Category {i}"},
+            "budget": budget,
+            "spent": spent,
+            "remaining": budget - spent,
+            "percentage": round(spent / budget * 100, 1),
+            "status": "success",
+            "count": 12,
+        })
+
+    now = timezone.now()
+    ai_insights = [
+        SpendingInsight(
+            user_id=uuid.uuid4(),
+            insight_type="forecast",
+            severity="info",
+            title=f"Next Month Forecast: ₹{40000 + i}.00",
+            message="Based on your last 3 months, you're likely to spend ₹40000.00 next month.",
+            predicted_amount=Decimal(f"{40000 + i}.00"),
+            applies_to_month=now.month,
+            applies_to_year=now.year,
+            created_at=now,
+        )
+        for i in range(insights)
+    ]
+
+    return {
+        "total_spent": Decimal("987654.25"),
+        "monthly_spent": Decimal("45678.50"),
+        "category_data": category_data,
+        "budget_amount": Decimal("50000.00"),
+        "remaining_amount": Decimal("4321.50"),
+        "percentage_used": Decimal("91.36"),
+        "predicted_next_month": Decimal("41234.17"),
+        "category_budget_data": category_budget_data,
+        "total_category_budget": sum(item["budget"] for item in category_budget_data),
+        "unallocated_budget": Decimal("0.00"),
+        "ai_insights": ai_insights,
+    }
+
+
+def _legacy_payload(data: dict) -> dict:
+    """The dashboard dict as it used to be cached: model instances and a date"""
+    legacy = dict(data)
+    legacy["category_budget_data"] = [
+        dict(item, category=Category(id=item["category"]["id"], name=item["category"]["name"]))
+        for item in data["category_budget_data"]
+    ]
+    legacy["current_month"] = datetime.date.today().replace(day=1)
+    legacy["current_year"] = legacy["current_month"].year
+    return legacy
+
+
+def _time(func, iterations: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Benchmark dashboard cache payload size and (de)serialization time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=30)
+        parser.add_argument('--insights', type=int, default=6)
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        data = _synthetic_dashboard(options['categories'], options['insights'])
+
+        legacy = _legacy_payload(data)
+        legacy_blob = zlib.compress(pickle.dumps(legacy, pickle.HIGHEST_PROTOCOL))
+
+        compact = serialize_dashboard(data)
+        compact_blob = zlib.compress(pickle.dumps(compact, pickle.HIGHEST_PROTOCOL))
+
+        results = [
+            (
+                'legacy pickle',
+                len(legacy_blob),
+                _time(lambda: zlib.compress(pickle.dumps(legacy, pickle.HIGHEST_PROTOCOL)), iterations),
+                _time(lambda: pickle.loads(zlib.decompress(legacy_blob)), iterations),
+            ),
+            (
+                f'schema v{compact["v"]}',
+                len(compact_blob),
+                _time(lambda: zlib.compress(pickle.dumps(serialize_dashboard(data), pickle.HIGHEST_PROTOCOL)), iterations),
+                _time(lambda: deserialize_dashboard(pickle.loads(zlib.decompress(compact_blob))), iterations),
+            ),
+        ]
+
+        self.stdout.write(
+            f"{options['categories']} categories, {options['insights']} insights, "
+            f"{iterations} iterations\n"
+        )
+        self.stdout.write(f"{'format':<16}{'bytes':>10}{'serialize µs':>16}{'deserialize µs':>18}")
+        for name, size, ser, deser in results:
+            self.stdout.write(f"{name:<16}{size:>10}{ser:>16.1f}{deser:>18.1f}")
@@ -0,0 +1,88 @@
+"""
+Management command to measure expense export time and peak memory
+Usage: python manage.py bench_expense_export [--expenses=1000000] [--keep]
+
+Creates a throwaway user with --expenses synthetic expenses (bulk inserted),
+then streams a full export in every format the way ExpenseExportView does,
+reporting rows, time, throughput and the peak Python memory traced while
+exporting (tracemalloc). The user and its expenses are deleted afterwards
+unless --keep is given.
+"""
+import datetime
+import random
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.expenses import export
+from apps.expenses.models import Category, Expense
+
+User = get_user_model()
+
+BENCH_EMAIL = 'export-bench@example.com'
+TITLES = ['Lunch', 'Coffee', 'Groceries', 'Taxi', 'Fuel', 'Rent', 'Internet', 'Pharmacy', 'Gym']
+
+
+class Command(BaseCommand):
+    help = 'Measure streaming export time and peak memory for a user with many expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expenses', type=int, default=1_000_000)
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark user')
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        user = User.objects.create(username='export-bench', email=BENCH_EMAIL)
+        try:
+            self._populate(user, options['expenses'])
+            self._run(user)
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def _populate(self, user, count: int):
+        rng = random.Random(42)
+        categories = [
+            Category.objects.create(user=user, name=name)
+            for name in ('Food', 'Transport', 'Bills', 'Shopping', 'Travel')
+        ]
+        today = datetime.date.today()
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            Expense.objects.bulk_create([
+                Expense(
+                    user=user,
+                    category=rng.choice(categories),
+                    title=rng.choice(TITLES),
+                    notes='Paid by card' if rng.random() < 0.3 else None,
+                    amount=Decimal(rng.randint(50, 500_000)) / 100,
+                    expense_date=today - datetime.timedelta(days=rng.randint(0, 1500)),
+                )
+                for _ in range(min(5000, count - offset))
+            ])
+        self.stdout.write(f'Inserted {count} expenses in {time.perf_counter() - started:.1f}s')
+
+    def _run(self, user):
+        queryset = Expense.objects.filter(user=user, is_deleted=False)
+        self.stdout.write(f"\n{'format':<10}{'rows':>10}{'MB':>10}{'seconds':>10}{'rows/s':>10}{'peak MB':>10}")
+        for fmt in export.FORMATS:
+            tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                size = rows = 0
+                for chunk in export.stream(queryset, fmt):
+                    size += len(chunk.encode())
+                    rows += chunk.count('\n')
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            elapsed = time.perf_counter() - started
+            rows -= fmt == 'csv'  # Header
+            self.stdout.write(
+                f'{fmt:<10}{rows:>10}{size / 1e6:>10.1f}{elapsed:>10.1f}'
+                f'{rows / elapsed:>10.0f}{peak / 1e6:>10.1f}'
+            )
+        self.stdout.write(self.style.SUCCESS('\n✓ Export benchmark complete'))
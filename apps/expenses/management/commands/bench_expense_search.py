@@ -0,0 +1,101 @@
+"""
+Management command to benchmark expense search latency
+Usage: python manage.py bench_expense_search [--expenses=100000] [--repeat=20] [--keep]
+
+Creates a throwaway user with --expenses synthetic expenses (bulk inserted, so
+the database maintains the search index exactly as it does for raw writes),
+then times the list view's search query - count plus first page - with the
+configured search backend and with the old icontains scan. The user and its
+expenses are deleted afterwards unless --keep is given.
+"""
+import datetime
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.expenses.models import Category, Expense
+from apps.expenses.search import IContainsBackend, get_backend
+
+User = get_user_model()
+
+BENCH_EMAIL = 'search-bench@example.com'
+WORDS = [
+    'lunch', 'dinner', 'coffee', 'groceries', 'taxi', 'metro', 'fuel', 'rent', 'electricity',
+    'internet', 'movie', 'books', 'pharmacy', 'gym', 'snacks', 'office', 'supplies', 'gift',
+    'flight', 'hotel', 'parking', 'laundry', 'repair', 'insurance', 'subscription', 'bakery',
+]
+QUERIES = ['lunch', 'cof', 'groceries market', 'taxi airport', 'subscr', 'zzz']
+PAGE_SIZE = 20
+
+
+def _title(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))).capitalize()
+
+
+class Command(BaseCommand):
+    help = 'Benchmark expense search latency for a user with many expenses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expenses', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark user')
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        user = User.objects.create(username='search-bench', email=BENCH_EMAIL)
+        try:
+            self._populate(user, options['expenses'])
+            self._run(user, options['expenses'], options['repeat'])
+        finally:
+            if not options['keep']:
+                user.delete()
+
+    def _populate(self, user, count: int):
+        rng = random.Random(42)
+        categories = [
+            Category.objects.create(user=user, name=name)
+            for name in ('Food', 'Transport', 'Bills', 'Shopping', 'Travel')
+        ]
+        places = ['market', 'airport', 'station', 'mall', 'downtown']
+        today = datetime.date.today()
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            Expense.objects.bulk_create([
+                Expense(
+                    user=user,
+                    category=rng.choice(categories),
+                    title=_title(rng),
+                    notes=f'{rng.choice(WORDS)} near {rng.choice(places)}' if rng.random() < 0.3 else None,
+                    amount=Decimal(rng.randint(50, 500_000)) / 100,
+                    expense_date=today - datetime.timedelta(days=rng.randint(0, 1500)),
+                )
+                for _ in range(min(5000, count - offset))
+            ])
+        self.stdout.write(f'Inserted {count} expenses in {time.perf_counter() - started:.1f}s')
+
+    def _time(self, base, backend, query: str, repeat: int):
+        """(median ms, p95 ms, matches) for count + first page, as ExpenseListView runs them"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            queryset = backend.filter(base, query)
+            matches = queryset.count()
+            list(queryset.order_by('-expense_date')[:PAGE_SIZE])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[int(0.95 * (len(timings) - 1))], matches
+
+    def _run(self, user, count: int, repeat: int):
+        base = Expense.objects.filter(user=user, is_deleted=False).select_related('category')
+        backends = [('icontains', IContainsBackend()), (type(get_backend()).__name__, get_backend())]
+
+        self.stdout.write(f'\n{count} expenses, {repeat} runs per query (count + first page)\n')
+        self.stdout.write(f"{'query':<20}{'backend':<24}{'matches':>9}{'median ms':>11}{'p95 ms':>9}")
+        for query in QUERIES:
+            for name, backend in backends:
+                median, p95, matches = self._time(base, backend, query, repeat)
+                self.stdout.write(f'{query:<20}{name:<24}{matches:>9}{median:>11.1f}{p95:>9.1f}')
@@ -0,0 +1,76 @@
+"""
+Management command to benchmark expense title autocomplete latency
+Usage: python manage.py bench_title_suggestions [--titles=2000] [--repeat=200] [--keep]
+
+Creates a throwaway user with --titles distinct expense titles (bulk inserted,
+one expense each), builds the autocomplete index once, then times
+autocomplete.suggest() - served from the cached index, no database query - for
+prefixes of different selectivity. The user and its expenses are deleted
+afterwards unless --keep is given.
+"""
+import datetime
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from apps.expenses import autocomplete
+from apps.expenses.models import Category, Expense
+
+User = get_user_model()
+
+BENCH_EMAIL = 'suggest-bench@example.com'
+PREFIXES = ['', 'm', 'merchant 01', 'merchant 0123', 'zzz']
+
+
+class Command(BaseCommand):
+    help = 'Benchmark expense title autocomplete latency for a user with many distinct titles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=autocomplete.MAX_TITLES)
+        parser.add_argument('--repeat', type=int, default=200, help='Timed runs per prefix')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark user')
+
+    def handle(self, *args, **options):
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        user = User.objects.create(username='suggest-bench', email=BENCH_EMAIL)
+        try:
+            self._populate(user, options['titles'])
+            self._run(user, options['repeat'])
+        finally:
+            autocomplete.drop_index(user.id)
+            if not options['keep']:
+                user.delete()
+
+    def _populate(self, user, count: int):
+        category = Category.objects.create(user=user, name='Shopping')
+        today = datetime.date.today()
+        for offset in range(0, count, 5000):
+            Expense.objects.bulk_create([
+                Expense(
+                    user=user, category=category, title=f'Merchant {i:04d}',
+                    amount=Decimal('1.00'), expense_date=today,
+                )
+                for i in range(offset, min(offset + 5000, count))
+            ])
+
+    def _run(self, user, repeat: int):
+        started = time.perf_counter()
+        keys, _, _ = autocomplete.get_index(user.id)
+        self.stdout.write(f'Built index of {len(keys)} titles in {(time.perf_counter() - started) * 1000:.1f}ms')
+
+        self.stdout.write(f"\n{'prefix':<16}{'results':>9}{'median ms':>11}{'p95 ms':>9}")
+        for prefix in PREFIXES:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                results = autocomplete.suggest(user.id, prefix)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'{prefix!r:<16}{len(results):>9}{statistics.median(timings):>11.3f}'
+                f'{timings[int(0.95 * (len(timings) - 1))]:>9.3f}'
+            )
+        self.stdout.write(self.style.SUCCESS('\n✓ Autocomplete benchmark complete'))
@@ -0,0 +1,86 @@
+"""
+Management command to check what a web worker imports at startup
+Usage: python manage.py check_startup_imports [--budget-ms=1000] [--top=15]
+
+Runs `python -X importtime` over config.wsgi and the URLconf (loaded by the
+first request) in a fresh interpreter. Fails when the imports take longer than
+STARTUP_IMPORT_BUDGET_MS or pull in a module from STARTUP_FORBIDDEN_IMPORTS:
+numpy and scikit-learn are loaded by the AI engine on first use, never at
+startup. Run it in CI; timings are noisy, so keep the budget generous.
+"""
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+STARTUP_MODULES = ('config.wsgi', 'config.urls')
+
+
+def import_times(modules) -> List[Tuple[str, int, int]]:
+    """(module, cumulative microseconds, nesting depth) per import, in import order"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(f"Importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Name column: one space, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(cumulative), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Fail if web worker startup imports exceed the time budget or load forbidden modules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=settings.STARTUP_IMPORT_BUDGET_MS,
+            help='Maximum total import time in milliseconds',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Slowest imports to list',
+        )
+
+    def handle(self, *args, **options):
+        rows = import_times(STARTUP_MODULES)
+        total_ms = sum(us for _, us, depth in rows if depth == 0) / 1000
+
+        self.stdout.write('Slowest imports (cumulative):')
+        for name, us, _ in sorted(rows, key=lambda row: -row[1])[:options['top']]:
+            self.stdout.write(f'  {us / 1000:8.1f}ms  {name}')
+
+        forbidden = sorted({
+            name for name, _, _ in rows
+            if name.split('.')[0] in settings.STARTUP_FORBIDDEN_IMPORTS
+        })
+        if forbidden:
+            raise CommandError(
+                f"Startup imports forbidden modules: {', '.join(forbidden[:10])} "
+                f"(import them inside the functions that need them)"
+            )
+        if total_ms > options['budget_ms']:
+            raise CommandError(
+                f'Startup imports took {total_ms:.0f}ms, over the {options["budget_ms"]:.0f}ms budget'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Startup imports took {total_ms:.0f}ms (budget {options["budget_ms"]:.0f}ms)'
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:05
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from apps.expenses.search import backend_for
+
+    backend_for(schema_editor.connection).install(schema_editor.connection)
+
+
+def uninstall_search_index(apps, schema_editor):
+    from apps.expenses.search import backend_for
+
+    backend_for(schema_editor.connection).uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_categorybudget_expenses_ca_user_id_0141d5_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -1,7 +1,13 @@
-from django.db import models
+from decimal import Decimal
+from typing import NamedTuple, Optional, Tuple
+import datetime
+
+from django.db import models, transaction
 from django.conf import settings
 import uuid
 
+from .signals import expense_changed
+
 class Category(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -59,6 +65,14 @@ class CategoryBudget(models.Model):
         return f"{self.category.name}: {self.amount} ({self.month}/{self.year})"
 
 
+class ExpenseSnapshot(NamedTuple):
+    """The fields of an expense that derived spending data depends on"""
+    user_id: uuid.UUID
+    category_id: uuid.UUID
+    expense_date: datetime.date
+    amount: Decimal
+
+
 class Expense(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -98,6 +112,53 @@ class Expense(models.Model):
     def __str__(self):
         return f"{self.title} - {self.amount}"
 
+    def snapshot(self) -> Optional[ExpenseSnapshot]:
+        """Spending-relevant state of this instance, None if it doesn't count"""
+        if self.is_deleted:
+            return None
+        expense_date = self.expense_date
+        if isinstance(expense_date, str):
+            expense_date = datetime.date.fromisoformat(expense_date)
+        return ExpenseSnapshot(
+            user_id=self.user_id,
+            category_id=self.category_id,
+            expense_date=expense_date,
+            amount=Decimal(str(self.amount)),
+        )
+
+    def _stored_state(self) -> Tuple[Optional[ExpenseSnapshot], Optional[str]]:
+        """Spending-relevant state and title currently in the database (row is locked)"""
+        if self._state.adding:
+            return None, None
+        row = (
+            Expense.objects.select_for_update()
+            .filter(pk=self.pk, is_deleted=False)
+            .values_list(*ExpenseSnapshot._fields, "title")
+            .first()
+        )
+        return (ExpenseSnapshot(*row[:-1]), row[-1]) if row else (None, None)
+
+    def save(self, *args, **kwargs):
+        # Derived spending data is updated in the same transaction as the row
+        with transaction.atomic():
+            before, before_title = self._stored_state()
+            super().save(*args, **kwargs)
+            after = self.snapshot()
+            expense_changed.send(
+                sender=Expense, user_id=self.user_id, before=before, after=after,
+                before_title=before_title, after_title=self.title if after else None,
+            )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            before, before_title = self._stored_state()
+            result = super().delete(*args, **kwargs)
+            expense_changed.send(
+                sender=Expense, user_id=self.user_id, before=before, after=None,
+                before_title=before_title, after_title=None,
+            )
+        return result
+
 
 
 
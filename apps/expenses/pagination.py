@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) pagination
+
+    page = paginate(queryset, "-expense_date", request.GET.get("cursor"), page_size=20)
+    page.object_list, page.next_token, page.previous_token
+
+Rows are ordered by (sort key, id) and a page continues from the last row of
+the previous one with a range predicate on those two columns, so page 500
+reads the same ~20 index entries as page 1 and no COUNT(*) is needed to know
+whether another page exists: one extra row is fetched instead.
+
+Tokens are signed and opaque to the client. A token that doesn't verify or
+was issued for another sort order starts again from the first page.
+"""
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+TOKEN_SALT = "expenses.pagination"
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class KeysetPage(NamedTuple):
+    object_list: List
+    next_token: Optional[str]
+    previous_token: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_token is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_token is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+
+def _split(key: str) -> Tuple[str, bool]:
+    """("-amount") -> ("amount", descending)"""
+    return key.lstrip("-"), key.startswith("-")
+
+
+def _ordering(key: str, reverse: bool = False) -> Tuple[str, str]:
+    name, descending = _split(key)
+    descending ^= reverse
+    prefix = "-" if descending else ""
+    return f"{prefix}{name}", f"{prefix}id"
+
+
+def _after(name: str, descending: bool, value: Any, pk: Any) -> Q:
+    """Rows strictly after (value, pk) in (name, id) order"""
+    op = "lt" if descending else "gt"
+    return Q(**{f"{name}__{op}": value}) | Q(**{name: value, f"id__{op}": pk})
+
+
+def _encode(key: str, direction: str, row) -> str:
+    name, _ = _split(key)
+    return signing.dumps(
+        {"k": key, "d": direction, "v": str(getattr(row, name)), "id": str(row.pk)},
+        salt=TOKEN_SALT,
+    )
+
+
+def _decode(queryset: QuerySet, key: str, token: Optional[str]):
+    """(direction, value, pk) from a token, or None to start at the first page"""
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        return None
+    if payload.get("k") != key or payload.get("d") not in (NEXT, PREVIOUS):
+        return None
+
+    name, _ = _split(key)
+    meta = queryset.model._meta
+    try:
+        if name in queryset.query.annotations:
+            value = float(payload["v"])
+        else:
+            value = meta.get_field(name).to_python(payload["v"])
+        pk = meta.pk.to_python(payload["id"])
+    except (KeyError, TypeError, ValueError, ValidationError):
+        return None
+    return payload["d"], value, pk
+
+
+def paginate(queryset: QuerySet, key: str, token: Optional[str], page_size: int) -> KeysetPage:
+    """
+    One page of `queryset` ordered by `key` (a field or annotation, "-" for
+    descending) with id as tie-breaker, continuing from `token`
+    """
+    name, descending = _split(key)
+    cursor = _decode(queryset, key, token)
+
+    if cursor is None:
+        rows = list(queryset.order_by(*_ordering(key))[:page_size + 1])
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        return KeysetPage(
+            rows,
+            _encode(key, NEXT, rows[-1]) if more else None,
+            None,
+        )
+
+    direction, value, pk = cursor
+    if direction == NEXT:
+        rows = list(
+            queryset.filter(_after(name, descending, value, pk))
+            .order_by(*_ordering(key))[:page_size + 1]
+        )
+        more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_token = _encode(key, NEXT, rows[-1]) if more else None
+        previous_token = _encode(key, PREVIOUS, rows[0]) if rows else None
+        return KeysetPage(rows, next_token, previous_token)
+
+    # Walk backwards from the cursor, then restore display order
+    rows = list(
+        queryset.filter(_after(name, not descending, value, pk))
+        .order_by(*_ordering(key, reverse=True))[:page_size + 1]
+    )
+    more = len(rows) > page_size
+    rows = rows[:page_size][::-1]
+    previous_token = _encode(key, PREVIOUS, rows[0]) if more else None
+    next_token = _encode(key, NEXT, rows[-1]) if rows else None
+    return KeysetPage(rows, next_token, previous_token)
+
+
+def count_up_to(queryset: QuerySet, limit: Optional[int]) -> Tuple[int, bool]:
+    """
+    (count, exact): counts at most `limit` + 1 rows, so a huge result set costs
+    no more than a `limit`-row scan. No limit counts everything.
+    """
+    if not limit:
+        return queryset.count(), True
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count <= limit
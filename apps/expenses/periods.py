@@ -0,0 +1,120 @@
+"""
+Calendar periods as half-open date ranges
+
+Every period is [start, end): `start` is the first day included and `end` the
+first day after it. Filtering a date column with
+
+    queryset.filter(period.q("expense_date"))
+
+compiles to `expense_date >= start AND expense_date < end`, which can use the
+(user, is_deleted, expense_date) index, unlike `expense_date__year=...` /
+`expense_date__month=...` (EXTRACT expressions on Postgres).
+
+Month offsets are calendar arithmetic on a month index (year * 12 + month - 1),
+never `timedelta(days=30 * n)`, which skips or repeats months.
+"""
+import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Period(NamedTuple):
+    start: datetime.date  # Inclusive
+    end: datetime.date  # Exclusive
+
+    def q(self, field: str = "expense_date") -> Q:
+        """Range predicate on a date field"""
+        return Q(**{f"{field}__gte": self.start, f"{field}__lt": self.end})
+
+    def __contains__(self, day: datetime.date) -> bool:
+        return self.start <= day < self.end
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days
+
+    def days_elapsed(self, today: datetime.date) -> int:
+        """Days of the period up to and including `today` (0 before it, all after it)"""
+        return max(0, min(self.days, (today - self.start).days + 1))
+
+    def months(self) -> List[Tuple[int, int]]:
+        """(year, month) pairs overlapping the period, oldest first"""
+        first = month_index(self.start.year, self.start.month)
+        last = month_index(*month_of(self.end - datetime.timedelta(days=1)))
+        return [from_month_index(i) for i in range(first, last + 1)]
+
+
+# ======================================
+# MONTH ARITHMETIC
+# ======================================
+def month_index(year: int, month: int) -> int:
+    """Months since year 0, so consecutive months are consecutive integers"""
+    return year * 12 + (month - 1)
+
+
+def from_month_index(index: int) -> Tuple[int, int]:
+    return index // 12, index % 12 + 1
+
+
+def add_months(year: int, month: int, count: int) -> Tuple[int, int]:
+    """(year, month) `count` months after (negative: before) the given month"""
+    return from_month_index(month_index(year, month) + count)
+
+
+def month_of(day) -> Tuple[int, int]:
+    """(year, month) of a date or datetime"""
+    return day.year, day.month
+
+
+def _first_day(year: int, month: int) -> datetime.date:
+    return datetime.date(year, month, 1)
+
+
+def _today(today: Optional[datetime.date]) -> datetime.date:
+    return today or timezone.localdate()
+
+
+# ======================================
+# PERIODS
+# ======================================
+def month(year: int, month: int) -> Period:
+    return Period(_first_day(year, month), _first_day(*add_months(year, month, 1)))
+
+
+def months(year: int, month: int, count: int) -> Period:
+    """`count` whole months starting with (year, month)"""
+    return Period(_first_day(year, month), _first_day(*add_months(year, month, count)))
+
+
+def quarter(year: int, number: int) -> Period:
+    """Calendar quarter 1-4"""
+    return months(year, 3 * (number - 1) + 1, 3)
+
+
+def year(year: int) -> Period:
+    return Period(datetime.date(year, 1, 1), datetime.date(year + 1, 1, 1))
+
+
+def trailing_months(count: int, today: Optional[datetime.date] = None,
+                    include_current: bool = False) -> Period:
+    """
+    The last `count` closed months before today's month, or ending with
+    today's month (still open) when `include_current` is set
+    """
+    current = month_of(_today(today))
+    last = current if include_current else add_months(*current, -1)
+    return months(*add_months(*last, -(count - 1)), count)
+
+
+def trailing_days(count: int, today: Optional[datetime.date] = None) -> Period:
+    """The last `count` days, today included"""
+    end = _today(today) + datetime.timedelta(days=1)
+    return Period(end - datetime.timedelta(days=count), end)
+
+
+def closed_months(count: int, today: Optional[datetime.date] = None) -> List[Tuple[int, int]]:
+    """The `count` closed months before today's month as (year, month), most recent first"""
+    current = month_index(*month_of(_today(today)))
+    return [from_month_index(current - i) for i in range(1, count + 1)]
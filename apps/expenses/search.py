@@ -0,0 +1,197 @@
+"""
+Full-text search over expense titles and notes
+
+    backend = search.get_backend()
+    queryset = backend.filter(queryset, "lunch caf")     # every word, as a prefix
+    queryset = queryset.annotate(search_score=backend.score("lunch caf")).order_by("-search_score")
+
+Backends keep their index in the database, maintained by the database itself,
+so bulk writes and raw SQL stay searchable:
+
+- PostgresSearchBackend: a generated `search_vector` tsvector column (title
+  weighted above notes) with a GIN index, queried with prefix tsqueries and
+  ranked with ts_rank
+- SqliteFtsBackend: an FTS5 external-content table kept in sync by triggers,
+  ranked with bm25 (dev and tests)
+- IContainsBackend: substring match, no index (any other database)
+
+EXPENSE_SEARCH_BACKEND selects a backend by dotted path; by default it follows
+the database vendor. The index is created by migration 0005_expense_search.
+"""
+import re
+from typing import List
+
+from django.conf import settings
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+MAX_SEARCH_TERMS = 8
+
+TABLE = "expenses_expense"
+
+
+def search_terms(query: str) -> List[str]:
+    """Lowercased words of the query; punctuation never reaches the index syntax"""
+    return re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+
+
+class IContainsBackend:
+    """Case-insensitive substring match (sequential scan of the user's rows)"""
+
+    def install(self, connection) -> None:
+        """Create (or repair) the index; idempotent"""
+
+    def uninstall(self, connection) -> None:
+        pass
+
+    def condition(self, query: str):
+        """Filter condition (a Q or boolean expression) for rows matching the query"""
+        return Q(title__icontains=query) | Q(notes__icontains=query)
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        """Rows matching the query"""
+        return queryset.filter(self.condition(query))
+
+    def score(self, query: str):
+        """Relevance expression, higher for better matches"""
+        return Value(0.0, output_field=FloatField())
+
+
+class PostgresSearchBackend(IContainsBackend):
+    CONFIG = "simple"  # No stemming: titles are short, often names and non-English words
+
+    def install(self, connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                f"GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{self.CONFIG}', coalesce(title, '')), 'A') || "
+                f"setweight(to_tsvector('{self.CONFIG}', coalesce(notes, '')), 'B')"
+                f") STORED"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TABLE}_search_idx ON {TABLE} USING GIN (search_vector)"
+            )
+
+    def uninstall(self, connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector")
+
+    def _tsquery(self, terms: List[str]) -> str:
+        return " & ".join(f"{term}:*" for term in terms)
+
+    def condition(self, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return super().condition(query)
+        return RawSQL(
+            f'"{TABLE}"."search_vector" @@ to_tsquery(\'{self.CONFIG}\', %s)',
+            [self._tsquery(terms)],
+            output_field=BooleanField(),
+        )
+
+    def score(self, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return super().score(query)
+        return RawSQL(
+            f'ts_rank("{TABLE}"."search_vector", to_tsquery(\'{self.CONFIG}\', %s))',
+            [self._tsquery(terms)],
+            output_field=FloatField(),
+        )
+
+
+class SqliteFtsBackend(IContainsBackend):
+    FTS_TABLE = f"{TABLE}_fts"
+    TRIGGERS = {
+        "ai": f"AFTER INSERT ON {TABLE} BEGIN "
+              f"INSERT INTO {TABLE}_fts(rowid, title, notes) VALUES (new.rowid, new.title, new.notes); END",
+        "ad": f"AFTER DELETE ON {TABLE} BEGIN "
+              f"INSERT INTO {TABLE}_fts({TABLE}_fts, rowid, title, notes) "
+              f"VALUES ('delete', old.rowid, old.title, old.notes); END",
+        "au": f"AFTER UPDATE OF title, notes ON {TABLE} BEGIN "
+              f"INSERT INTO {TABLE}_fts({TABLE}_fts, rowid, title, notes) "
+              f"VALUES ('delete', old.rowid, old.title, old.notes); "
+              f"INSERT INTO {TABLE}_fts(rowid, title, notes) VALUES (new.rowid, new.title, new.notes); END",
+    }
+
+    def install(self, connection) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.FTS_TABLE} USING fts5("
+                f"title, notes, content='{TABLE}', content_rowid='rowid', tokenize='unicode61')"
+            )
+            for suffix, body in self.TRIGGERS.items():
+                cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {self.FTS_TABLE}_{suffix} {body}")
+            cursor.execute(f"INSERT INTO {self.FTS_TABLE}({self.FTS_TABLE}) VALUES ('rebuild')")
+
+    def uninstall(self, connection) -> None:
+        with connection.cursor() as cursor:
+            for suffix in self.TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {self.FTS_TABLE}_{suffix}")
+            cursor.execute(f"DROP TABLE IF EXISTS {self.FTS_TABLE}")
+
+    def is_installed(self, connection) -> bool:
+        names = {f"{self.FTS_TABLE}_{suffix}" for suffix in self.TRIGGERS}
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            return names <= {row[0] for row in cursor.fetchall()}
+
+    def _match(self, terms: List[str]) -> str:
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def condition(self, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return super().condition(query)
+        return RawSQL(
+            f'"{TABLE}".rowid IN (SELECT rowid FROM {self.FTS_TABLE} WHERE {self.FTS_TABLE} MATCH %s)',
+            [self._match(terms)],
+            output_field=BooleanField(),
+        )
+
+    def score(self, query: str):
+        terms = search_terms(query)
+        if not terms:
+            return super().score(query)
+        # bm25 is lower for better matches, so negate it; titles weigh more than notes
+        return RawSQL(
+            f"(SELECT -bm25({self.FTS_TABLE}, 10.0, 1.0) FROM {self.FTS_TABLE} "
+            f'WHERE {self.FTS_TABLE} MATCH %s AND rowid = "{TABLE}".rowid)',
+            [self._match(terms)],
+            output_field=FloatField(),
+        )
+
+
+VENDOR_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SqliteFtsBackend,
+}
+
+
+def backend_for(connection) -> IContainsBackend:
+    path = getattr(settings, "EXPENSE_SEARCH_BACKEND", None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS.get(connection.vendor, IContainsBackend)()
+
+
+def get_backend() -> IContainsBackend:
+    return backend_for(connection)
+
+
+def repair_search_index(sender, using="default", **kwargs):
+    """
+    post_migrate: SQLite rebuilds a table to alter it, dropping its triggers
+    and renumbering rowids, so reinstall and rebuild the FTS index if needed
+    """
+    db = connections[using]
+    backend = backend_for(db)
+    if (
+        isinstance(backend, SqliteFtsBackend)
+        and TABLE in db.introspection.table_names()
+        and not backend.is_installed(db)
+    ):
+        backend.install(db)
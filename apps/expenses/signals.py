@@ -0,0 +1,15 @@
+"""
+Signals emitted by the expenses app
+
+expense_changed is sent from inside the same transaction as the expense write,
+so receivers that maintain derived data (rollups, statistics) commit or roll
+back together with the expense row itself.
+"""
+from django.dispatch import Signal
+
+# Sent with: user_id, before, after, before_title, after_title
+# before/after are ExpenseSnapshot instances (or None when the expense did not
+# count towards spending on that side of the write: created, soft-deleted, deleted)
+# before_title/after_title are the expense title on each side (None likewise);
+# they are kept out of the snapshots so title edits don't touch spending data
+expense_changed = Signal()
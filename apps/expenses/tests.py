@@ -1,3 +1,972 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.ai_engine.anomalies import score_expense
+from apps.ai_engine.forecasting import get_forecast
+from apps.ai_engine.models import SpendingForecast, SpendingInsight
+from apps.analytics.models import DailySpendingRollup, MonthlySpendingRollup
+from . import autocomplete, export, filters, periods, search, user_cache
+from .dashboard import (
+    DASHBOARD_SCHEMA_VERSION,
+    deserialize_dashboard,
+    get_dashboard_data,
+    serialize_dashboard,
+)
+from .models import Category, CategoryBudget, Expense, MonthlyBudget
+from .tiered_cache import InMemoryBroadcaster, LocalLRU, TieredCache
+
+User = get_user_model()
+
+
+def make_user(email="user@example.com"):
+    return User.objects.create(username=email.split("@")[0], email=email)
+
+
+class DashboardDataTests(TestCase):
+    """get_dashboard_data() must cost the same number of queries for any user"""
+
+    def setUp(self):
+        self.user = make_user()
+
+    def add_categories(self, count, expenses_per_category=3):
+        start = Category.objects.filter(user=self.user).count()
+        for i in range(start, start + count):
+            category = Category.objects.create(user=self.user, name=f"Category {i:02d}")
+            CategoryBudget.objects.create(
+                user=self.user, category=category, year=2026, month=3, amount=Decimal("100.00")
+            )
+            for day in range(1, expenses_per_category + 1):
+                Expense.objects.create(
+                    user=self.user,
+                    category=category,
+                    title=f"Expense {day}",
+                    amount=Decimal("10.00"),
+                    expense_date=datetime.date(2026, 3, day),
+                )
+
+    def test_totals(self):
+        food = Category.objects.create(user=self.user, name="Food")
+        rent = Category.objects.create(user=self.user, name="Rent")
+        MonthlyBudget.objects.create(user=self.user, year=2026, month=3, amount=Decimal("1000.00"))
+        CategoryBudget.objects.create(
+            user=self.user, category=food, year=2026, month=3, amount=Decimal("200.00")
+        )
+        Expense.objects.create(
+            user=self.user, category=food, title="Lunch", amount=Decimal("50.00"),
+            expense_date=datetime.date(2026, 3, 2),
+        )
+        Expense.objects.create(
+            user=self.user, category=rent, title="Rent", amount=Decimal("500.00"),
+            expense_date=datetime.date(2026, 3, 1),
+        )
+        Expense.objects.create(
+            user=self.user, category=food, title="Dinner", amount=Decimal("30.00"),
+            expense_date=datetime.date(2026, 2, 20),
+        )
+        Expense.objects.create(
+            user=self.user, category=food, title="Deleted", amount=Decimal("999.00"),
+            expense_date=datetime.date(2026, 3, 3), is_deleted=True,
+        )
+
+        data = get_dashboard_data(self.user, 2026, 3)
+
+        self.assertEqual(data["total_spent"], Decimal("580.00"))
+        self.assertEqual(data["monthly_spent"], Decimal("550.00"))
+        self.assertEqual(data["budget_amount"], Decimal("1000.00"))
+        self.assertEqual(data["remaining_amount"], Decimal("450.00"))
+        self.assertEqual(
+            [(item["category__name"], item["total"]) for item in data["category_data"]],
+            [("Food", Decimal("50.00")), ("Rent", Decimal("500.00"))],
+        )
+        self.assertEqual(len(data["category_budget_data"]), 1)
+        food_budget = data["category_budget_data"][0]
+        self.assertEqual(food_budget["category"]["name"], "Food")
+        self.assertEqual(food_budget["spent"], Decimal("50.00"))
+        self.assertEqual(food_budget["remaining"], Decimal("150.00"))
+        self.assertEqual(data["total_category_budget"], Decimal("200.00"))
+        self.assertEqual(data["unallocated_budget"], Decimal("800.00"))
+
+    def test_query_count_is_fixed(self):
+        self.add_categories(1)
+        get_forecast(self.user)  # Fit the forecast; serving it is then one lookup
+        with self.assertNumQueries(4):
+            get_dashboard_data(self.user, 2026, 3)
+
+        self.add_categories(30, expenses_per_category=5)
+        get_forecast(self.user)
+        with self.assertNumQueries(4):
+            data = get_dashboard_data(self.user, 2026, 3)
+
+        self.assertEqual(len(data["category_budget_data"]), 31)
+
+
+class DashboardCacheInvalidationTests(TestCase):
+    """Writes to expenses in past months must refresh those months' cached dashboards"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        self.expense = self.write(lambda: Expense.objects.create(
+            user=self.user, category=self.food, title="Lunch", amount=Decimal("40.00"),
+            expense_date=datetime.date(2025, 1, 10),
+        ))
+
+    def write(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            return action()
+
+    def monthly_spent(self, year, month):
+        response = self.client.get(reverse("dashboard"), {"year": year, "month": month})
+        return response.context["monthly_spent"]
+
+    def test_edit_delete_and_move_in_older_month(self):
+        self.assertEqual(self.monthly_spent(2025, 1), Decimal("40.00"))
+        self.assertEqual(self.monthly_spent(2025, 2), Decimal("0"))
+
+        self.expense.amount = Decimal("55.00")
+        self.write(self.expense.save)
+        self.assertEqual(self.monthly_spent(2025, 1), Decimal("55.00"))
+
+        self.expense.expense_date = datetime.date(2025, 2, 3)
+        self.write(self.expense.save)
+        self.assertEqual(self.monthly_spent(2025, 1), Decimal("0"))
+        self.assertEqual(self.monthly_spent(2025, 2), Decimal("55.00"))
+
+        self.write(self.expense.delete)
+        self.assertEqual(self.monthly_spent(2025, 2), Decimal("0"))
+
+    def budget_amount(self, year, month):
+        response = self.client.get(reverse("dashboard"), {"year": year, "month": month})
+        return response.context["budget_amount"]
+
+    def test_budget_writes_invalidate_on_commit(self):
+        form = {"year": 2025, "month": 1, "amount": "500.00"}
+        self.assertEqual(self.budget_amount(2025, 1), 0)
+        self.write(lambda: self.client.post(reverse("budget-add"), form))
+        self.assertEqual(self.budget_amount(2025, 1), Decimal("500.00"))
+        budget = MonthlyBudget.objects.get(user=self.user)
+
+        # Until the edit commits, the cached page is kept
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse("budget-edit", args=[budget.pk]), {**form, "amount": "700.00"})
+        self.assertEqual(self.budget_amount(2025, 1), Decimal("500.00"))
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.budget_amount(2025, 1), Decimal("700.00"))
+
+        self.assertEqual(self.budget_amount(2025, 2), 0)
+        self.write(lambda: self.client.post(
+            reverse("budget-edit", args=[budget.pk]), {**form, "month": 2, "amount": "700.00"}
+        ))
+        self.assertEqual(self.budget_amount(2025, 1), 0)
+        self.assertEqual(self.budget_amount(2025, 2), Decimal("700.00"))
+
+        self.write(lambda: self.client.post(reverse("budget-delete", args=[budget.pk])))
+        self.assertEqual(self.budget_amount(2025, 2), 0)
+
+
+class CategoryExpensesViewTests(TestCase):
+    """Dashboard category drill-down: one page of the user's expenses in a category and month"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        for day in range(1, 23):
+            Expense.objects.create(
+                user=self.user, category=self.food, title=f"Lunch {day}", amount=Decimal("10.00"),
+                expense_date=datetime.date(2026, 3, day),
+            )
+        Expense.objects.create(
+            user=self.user, category=self.food, title="Deleted", amount=Decimal("99.00"),
+            expense_date=datetime.date(2026, 3, 23), is_deleted=True,
+        )
+        Expense.objects.create(
+            user=self.user, category=self.food, title="April", amount=Decimal("5.00"),
+            expense_date=datetime.date(2026, 4, 1),
+        )
+
+    def get(self, category, **params):
+        url = reverse("dashboard-category-expenses", args=[category.id])
+        return self.client.get(url, dict({"year": 2026, "month": 3}, **params))
+
+    def test_pages_of_the_month(self):
+        first = self.get(self.food).json()
+        self.assertEqual(first["page"], 1)
+        self.assertTrue(first["has_next"])
+        self.assertEqual(len(first["results"]), 20)
+        self.assertEqual(first["results"][0], {
+            "id": str(Expense.objects.get(title="Lunch 22").id),
+            "title": "Lunch 22",
+            "amount": "10.00",
+            "date": "2026-03-22",
+        })
+
+        second = self.get(self.food, page=2).json()
+        self.assertFalse(second["has_next"])
+        self.assertEqual([row["title"] for row in second["results"]], ["Lunch 2", "Lunch 1"])
+
+    def test_empty_month(self):
+        self.assertEqual(self.get(self.food, month=2).json(), {"page": 1, "has_next": False, "results": []})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get(self.food, month=13).status_code, 400)
+        self.assertEqual(self.get(self.food, page="x").status_code, 400)
+
+    def test_scoped_to_owner(self):
+        self.client.force_login(make_user("other@example.com"))
+        self.assertEqual(self.get(self.food).json()["results"], [])
+
+        self.client.logout()
+        response = self.get(self.food)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("login"), response["Location"])
+
+
+class DashboardSerializationTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        food = Category.objects.create(user=self.user, name="Food")
+        MonthlyBudget.objects.create(user=self.user, year=2026, month=3, amount=Decimal("1000.00"))
+        CategoryBudget.objects.create(
+            user=self.user, category=food, year=2026, month=3, amount=Decimal("200.00")
+        )
+        Expense.objects.create(
+            user=self.user, category=food, title="Lunch", amount=Decimal("50.25"),
+            expense_date=datetime.date(2026, 3, 2),
+        )
+
+    def test_round_trip(self):
+        data = get_dashboard_data(self.user, 2026, 3)
+        data["ai_insights"] = []
+        payload = serialize_dashboard(data)
+
+        self.assertEqual(payload["v"], DASHBOARD_SCHEMA_VERSION)
+        self.assertEqual(payload["month"], 5025)
+
+        restored = deserialize_dashboard(payload)
+        for key in ("total_spent", "monthly_spent", "budget_amount", "remaining_amount",
+                    "total_category_budget", "unallocated_budget"):
+            self.assertEqual(restored[key], data[key], key)
+        self.assertEqual(restored["category_budget_data"][0]["spent"], Decimal("50.25"))
+        self.assertEqual(restored["category_budget_data"][0]["category"]["id"],
+                         str(data["category_budget_data"][0]["category"]["id"]))
+
+        # March 2026 has passed: the burn chart covers the whole month
+        chart = restored["burn_chart"]
+        self.assertEqual(chart["labels"], list(range(1, 32)))
+        self.assertEqual(chart["spent"][:3], [0.0, 50.25, 50.25])
+        self.assertEqual(chart["spent"][-1], 50.25)
+        self.assertEqual(chart["pace"][-1], 1000.0)
+
+    def test_other_schema_versions_are_ignored(self):
+        data = get_dashboard_data(self.user, 2026, 3)
+        data["ai_insights"] = []
+        payload = serialize_dashboard(data)
+        payload["v"] = DASHBOARD_SCHEMA_VERSION + 1
+
+        self.assertIsNone(deserialize_dashboard(payload))
+        self.assertIsNone(deserialize_dashboard({"total_spent": Decimal("1.00")}))
+        self.assertIsNone(deserialize_dashboard(None))
+
+    def test_view_recomputes_entry_of_another_schema_version(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        data = get_dashboard_data(self.user, 2026, 3)
+        data["ai_insights"] = []
+        data["monthly_spent"] = Decimal("1.00")
+        payload = serialize_dashboard(data)
+        payload["v"] = DASHBOARD_SCHEMA_VERSION + 1
+        key = user_cache.make_key(
+            self.user.id, f"dashboard:v{DASHBOARD_SCHEMA_VERSION}", period=(2026, 3)
+        )
+        user_cache.store(key, payload, soft_ttl=300, hard_ttl=3600)
+
+        response = self.client.get(reverse("dashboard"), {"year": 2026, "month": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["monthly_spent"], Decimal("50.25"))
+        # The unreadable entry was replaced
+        _, cached = user_cache.tiers().get(key)
+        self.assertEqual(cached["v"], DASHBOARD_SCHEMA_VERSION)
+
+
+class GetOrComputeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Plain shared tier, independent of USER_CACHE_LOCAL_TIER
+        patcher = mock.patch.object(user_cache, "_tiers", TieredCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_fresh_entry_is_not_recomputed(self):
+        self.assertEqual(user_cache.get_or_compute("k", self.compute, 60, 600), 1)
+        self.assertEqual(user_cache.get_or_compute("k", self.compute, 60, 600), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_entry_is_served_while_locked(self):
+        user_cache.get_or_compute("k", self.compute, 60, 600)
+        with mock.patch.object(user_cache.time, "time", return_value=user_cache.time.time() + 120):
+            # Another request holds the lock - serve the stale value
+            cache.add("lock:k", "other", 30)
+            self.assertEqual(user_cache.get_or_compute("k", self.compute, 60, 600), 1)
+            self.assertEqual(self.calls, 1)
+
+            # Lock free - this request recomputes
+            cache.delete("lock:k")
+            self.assertEqual(user_cache.get_or_compute("k", self.compute, 60, 600), 2)
+        self.assertIsNone(cache.get("lock:k"))
+
+
+class TieredCacheTests(TestCase):
+    """Two workers sharing one cache, each with its own local tier"""
+
+    def setUp(self):
+        cache.clear()
+        broadcaster = InMemoryBroadcaster()
+        self.worker_a = TieredCache(local=LocalLRU(), broadcaster=broadcaster)
+        self.worker_b = TieredCache(local=LocalLRU(), broadcaster=broadcaster)
+
+    def test_reads_are_served_locally(self):
+        self.worker_a.set("k", 1, 60)
+        self.assertEqual(self.worker_b.get("k"), 1)
+        cache.set("k", 2)  # Written behind the tiers' back
+        self.assertEqual(self.worker_a.get("k"), 1)
+        self.assertEqual(self.worker_b.get("k"), 1)
+        self.assertEqual(self.worker_b.hit_rates(), {"local": 0.5, "shared": 1.0})
+
+    def test_writes_invalidate_other_workers(self):
+        self.worker_a.set("gen", 1, None)
+        self.assertEqual(self.worker_b.get("gen"), 1)
+
+        self.worker_a.incr("gen")
+        self.assertEqual(self.worker_b.get("gen"), 2)
+
+        self.worker_b.set("gen", 5, None)
+        self.assertEqual(self.worker_a.get("gen"), 5)
+
+        self.worker_a.delete("gen")
+        self.assertIsNone(self.worker_b.get("gen"))
+
+    def read_during(self, worker, key, write):
+        """worker.get(key) with `write` landing while the shared read is in flight"""
+        class WriteDuringRead:
+            def get_many(_, keys):
+                values = cache.get_many(keys)
+                write()
+                return values
+
+        worker.shared = WriteDuringRead()
+        try:
+            return worker.get(key)
+        finally:
+            worker.shared = cache
+
+    def test_invalidation_during_shared_read_is_not_cached_locally(self):
+        self.worker_a.set("gen", 1, None)
+        self.assertEqual(self.read_during(self.worker_b, "gen", lambda: self.worker_a.incr("gen")), 1)
+        self.assertEqual(self.worker_b.get("gen"), 2)
+
+        # A reconnect of the invalidation channel (messages possibly missed) also counts
+        def write_unannounced():
+            cache.incr("other")
+            self.worker_b._on_message(None)
+
+        self.worker_a.set("other", 1, None)
+        self.assertEqual(self.read_during(self.worker_b, "other", write_unannounced), 1)
+        self.assertEqual(self.worker_b.get("other"), 2)
+
+    def test_lru_is_bounded(self):
+        lru = LocalLRU(max_entries=2)
+        for key in ("a", "b", "c"):
+            lru.set(key, key)
+        self.assertEqual(len(lru), 2)
+        self.assertIs(lru.get("a"), lru.get("missing"))
+
+
+class ExpenseAnomalyFlagTests(TestCase):
+    """Expense create/update score the amount against the category baseline"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.coffee = Category.objects.create(user=self.user, name="Coffee")
+        for day in range(1, 11):
+            Expense.objects.create(
+                user=self.user, category=self.coffee, title="Coffee", amount=Decimal("5.00"),
+                expense_date=datetime.date(2026, 3, day),
+            )
+
+    def post_expense(self, url, amount):
+        return self.client.post(url, {
+            "title": "Coffee", "amount": amount, "category": self.coffee.id,
+            "expense_date": "2026-03-12", "notes": "",
+        })
+
+    def anomalies(self):
+        return SpendingInsight.objects.filter(user=self.user, insight_type="anomaly")
+
+    def test_normal_amount_is_not_flagged(self):
+        response = self.post_expense(reverse("expense-add"), "5.00")
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.anomalies().exists())
+
+    def test_anomalous_amount_is_flagged_on_create_and_update(self):
+        with self.assertNumQueries(1):
+            self.assertIsNotNone(score_expense(self.user.id, self.coffee.id, Decimal("80.00")))
+
+        self.post_expense(reverse("expense-add"), "80.00")
+        self.assertEqual(self.anomalies().count(), 1)
+        self.assertEqual(self.anomalies().get().actual_amount, Decimal("80.00"))
+
+        expense = Expense.objects.get(user=self.user, amount=Decimal("5.00"), expense_date=datetime.date(2026, 3, 1))
+        self.post_expense(reverse("expense-edit", args=[expense.id]), "90.00")
+        self.assertEqual(self.anomalies().count(), 2)
+
+
+class ExpenseSearchTests(TestCase):
+    """Search goes through the database's full-text index (FTS5 under SQLite)"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        self.add("Lunch at cafe", notes="with the team")
+        self.add("Groceries", notes="lunchbox and fruit")
+        self.add("Taxi to airport")
+        other = make_user("other@example.com")
+        Expense.objects.create(
+            user=other, category=Category.objects.create(user=other, name="Food"),
+            title="Lunch", amount=Decimal("10.00"), expense_date=datetime.date(2026, 3, 1),
+        )
+
+    def add(self, title, notes=None, day=1):
+        return Expense.objects.create(
+            user=self.user, category=self.food, title=title, notes=notes,
+            amount=Decimal("10.00"), expense_date=datetime.date(2026, 3, day),
+        )
+
+    def search(self, query):
+        base = Expense.objects.filter(user=self.user, is_deleted=False)
+        return sorted(e.title for e in search.get_backend().filter(base, query))
+
+    def test_sqlite_uses_fts_backend(self):
+        self.assertIsInstance(search.get_backend(), search.SqliteFtsBackend)
+
+    def test_prefix_match_on_title_and_notes(self):
+        self.assertEqual(self.search("lunch"), ["Groceries", "Lunch at cafe"])
+        self.assertEqual(self.search("LUN caf"), ["Lunch at cafe"])
+        self.assertEqual(self.search("air"), ["Taxi to airport"])
+        self.assertEqual(self.search("sushi"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        expense = Expense.objects.get(title="Taxi to airport")
+        expense.title = "Train to station"
+        expense.save()
+        self.assertEqual(self.search("airport"), [])
+        self.assertEqual(self.search("station"), ["Train to station"])
+
+        expense.delete()
+        self.assertEqual(self.search("station"), [])
+
+    def test_punctuation_only_query_falls_back_to_substring(self):
+        self.add("Books & stationery")
+        self.assertEqual(self.search("&"), ["Books & stationery"])
+        self.assertEqual(search.search_terms('"lunch*" OR (cafe'), ["lunch", "or", "cafe"])
+
+    def test_list_view_ranks_title_matches_first(self):
+        self.add("Lunch", day=2)
+        response = self.client.get(reverse("expense-list"), {
+            "search": "lunch", "sort_by": "relevance", "category": self.food.id,
+        })
+        titles = [e.title for e in response.context["expenses"]]
+        self.assertEqual(titles[-1], "Groceries")
+        self.assertEqual(sorted(titles), ["Groceries", "Lunch", "Lunch at cafe"])
+
+
+class ExpenseListPaginationTests(TestCase):
+    """Keyset pages cover every row exactly once, in both directions, for every sort"""
+
+    SORTS = ["-expense_date", "expense_date", "-amount", "amount", "title", "-title"]
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        food = Category.objects.create(user=self.user, name="Food")
+        # Repeated dates, amounts and titles so ties are broken by id
+        for i in range(47):
+            Expense.objects.create(
+                user=self.user, category=food, title=f"Expense {i % 7}",
+                amount=Decimal(10 + i % 5), expense_date=datetime.date(2026, 3, 1 + i % 9),
+            )
+
+    def get(self, **params):
+        return self.client.get(reverse("expense-list"), params)
+
+    def walk(self, sort_by):
+        pages, cursor = [], None
+        while True:
+            params = {"sort_by": sort_by}
+            if cursor:
+                params["cursor"] = cursor
+            page = self.get(**params).context["page_obj"]
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_token
+
+    def test_pages_cover_all_rows_in_order(self):
+        for sort_by in self.SORTS:
+            with self.subTest(sort_by=sort_by):
+                pages = self.walk(sort_by)
+                ids = [e.id for page in pages for e in page.object_list]
+                expected = list(
+                    Expense.objects.filter(user=self.user)
+                    .order_by(sort_by, ("-" if sort_by.startswith("-") else "") + "id")
+                    .values_list("id", flat=True)
+                )
+                self.assertEqual([len(p.object_list) for p in pages], [20, 20, 7])
+                self.assertEqual(ids, expected)
+
+    def test_previous_tokens_walk_back(self):
+        pages = self.walk("-amount")
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = self.get(sort_by="-amount", cursor=page.previous_token).context["page_obj"]
+            self.assertEqual([e.id for e in page.object_list], [e.id for e in expected.object_list])
+        self.assertFalse(page.has_previous)
+
+    def test_deep_page_costs_the_same_as_first(self):
+        cursor = self.walk("-expense_date")[1].next_token
+        with CaptureQueriesContext(connection) as first_queries:
+            self.get()
+        with CaptureQueriesContext(connection) as last_queries:
+            self.get(cursor=cursor)
+        self.assertEqual(len(first_queries), len(last_queries))
+        self.assertFalse(any("OFFSET" in q["sql"] for q in last_queries))
+
+    def test_bad_or_foreign_token_starts_over(self):
+        first = [e.id for e in self.get().context["expenses"]]
+        token = self.get().context["page_obj"].next_token
+        for cursor in ("garbage", token[:-2] + "xx"):
+            self.assertEqual([e.id for e in self.get(cursor=cursor).context["expenses"]], first)
+        # Issued for another sort order
+        by_amount = [e.id for e in self.get(sort_by="amount").context["expenses"]]
+        self.assertEqual([e.id for e in self.get(sort_by="amount", cursor=token).context["expenses"]], by_amount)
+
+    @override_settings(EXPENSE_LIST_COUNT_LIMIT=30)
+    def test_approximate_counts(self):
+        context = self.get().context
+        self.assertEqual((context["total_expenses"], context["total_exact"]), (30, False))
+        context = self.get(search="Expense 1").context
+        self.assertEqual((context["filtered_expenses"], context["filtered_exact"]), (7, True))
+
+
+class ExpenseListStatsTests(TestCase):
+    """List statistics: one aggregate query, cached per normalized filter set"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        for i in range(30):
+            Expense.objects.create(
+                user=self.user, category=self.food, title="Lunch" if i % 3 else "Taxi",
+                amount=Decimal("10.00"), expense_date=datetime.date(2026, 3, 1 + i % 28),
+            )
+
+    def get(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("expense-list"), params)
+        aggregates = [q["sql"] for q in queries if "COUNT(" in q["sql"] or "SUM(" in q["sql"]]
+        return response.context, aggregates
+
+    def test_single_query_then_cached_across_pages(self):
+        context, aggregates = self.get(search="lunch")
+        self.assertEqual(len(aggregates), 1)
+        self.assertEqual(
+            (context["total_expenses"], context["filtered_expenses"], context["total_amount"]),
+            (30, 20, Decimal("200.00")),
+        )
+
+        context, aggregates = self.get(max_amount="50")
+        self.assertEqual(len(aggregates), 1)
+        context, aggregates = self.get(max_amount="50", cursor=context["page_obj"].next_token)
+        self.assertEqual(aggregates, [])
+        self.assertEqual(context["filtered_expenses"], 30)
+
+    def test_equivalent_filters_share_an_entry(self):
+        self.get(search="lunch", min_amount="5")
+        context, aggregates = self.get(search="  LUNCH ", min_amount="5.00", sort_by="amount")
+        self.assertEqual(aggregates, [])
+        self.assertEqual(filters.signature(filters.parse_filters({"search": " Lunch"})),
+                         filters.signature(filters.parse_filters({"search": "lunch", "category": "nope"})))
+
+    def test_expense_write_refreshes_stats(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(
+                user=self.user, category=self.food, title="Dinner", amount=Decimal("5.00"),
+                expense_date=datetime.date(2026, 3, 2),
+            )
+        context, aggregates = self.get()
+        self.assertEqual(len(aggregates), 1)
+        self.assertEqual((context["total_expenses"], context["total_amount"]), (31, Decimal("305.00")))
+
+    def test_invalid_filters_are_ignored(self):
+        context, _ = self.get(category="not-a-uuid", start_date="2026-13-01", max_amount="abc")
+        self.assertEqual(context["filtered_expenses"], 30)
+
+
+class TitleAutocompleteTests(TestCase):
+    """Title suggestions come from a cached prefix index patched on writes"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        for title, count in (("Groceries", 3), ("Grofers order", 1), ("Gym", 2), ("Lunch", 1)):
+            for _ in range(count):
+                self.add(title)
+
+    def add(self, title):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Expense.objects.create(
+                user=self.user, category=self.food, title=title,
+                amount=Decimal("10.00"), expense_date=datetime.date(2026, 3, 1),
+            )
+
+    def test_prefix_ranked_by_frequency(self):
+        self.assertEqual(autocomplete.suggest(self.user.id, "g"), ["Groceries", "Gym", "Grofers order"])
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.suggest(self.user.id, "  GRO"), ["Groceries", "Grofers order"])
+            self.assertEqual(autocomplete.suggest(self.user.id, "x"), [])
+            self.assertEqual(autocomplete.suggest(self.user.id, "")[0], "Groceries")
+
+    def test_index_is_patched_on_writes(self):
+        autocomplete.suggest(self.user.id, "")  # Build
+        expense = self.add("Grocery outlet")
+        self.add("Grocery outlet")
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.suggest(self.user.id, "groc"), ["Groceries", "Grocery outlet"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.title = "Gym"
+            expense.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.filter(title="Lunch").get().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.suggest(self.user.id, "g")[:2], ["Groceries", "Gym"])
+            self.assertEqual(autocomplete.suggest(self.user.id, "lu"), [])
+        self.assertEqual(autocomplete.get_index(self.user.id), autocomplete.build_index(self.user.id))
+
+    def test_endpoint_and_bounded_work(self):
+        # Latency is measured by `manage.py bench_title_suggestions`
+        Expense.objects.bulk_create(
+            Expense(user=self.user, category=self.food, title=f"Merchant {i:04d}",
+                    amount=Decimal("1.00"), expense_date=datetime.date(2026, 3, 1))
+            for i in range(autocomplete.MAX_TITLES + 100)
+        )
+        response = self.client.get(reverse("expense-title-suggestions"), {"q": "merchant 01"})
+        self.assertEqual(len(response.json()["results"]), autocomplete.MAX_SUGGESTIONS)
+        keys, _, _ = autocomplete.get_index(self.user.id)
+        self.assertEqual(len(keys), autocomplete.MAX_TITLES)
+
+        # Only the prefix's range of the (capped) index is ranked
+        with self.assertNumQueries(0), \
+                mock.patch.object(autocomplete.heapq, "nlargest", wraps=autocomplete.heapq.nlargest) as ranked:
+            autocomplete.suggest(self.user.id, "merchant 01")
+            autocomplete.suggest(self.user.id, "m")
+        narrow, broad = (len(call.args[1]) for call in ranked.call_args_list)
+        self.assertLessEqual(narrow, 100)
+        self.assertLessEqual(broad, autocomplete.MAX_TITLES)
+
+
+class ExpenseExportTests(TestCase):
+    """Exports stream every expense matching the list filters in constant memory"""
+
+    def setUp(self):
+        self.user = make_user()
+        self.client.force_login(self.user)
+        self.food = Category.objects.create(user=self.user, name="Food")
+        self.travel = Category.objects.create(user=self.user, name="Travel")
+        Expense.objects.create(user=self.user, category=self.food, title="Lunch", notes="Café",
+                               amount=Decimal("12.50"), expense_date=datetime.date(2026, 3, 2))
+        Expense.objects.create(user=self.user, category=self.food, title="=HYPERLINK(1)",
+                               amount=Decimal("3.00"), expense_date=datetime.date(2026, 3, 1))
+        Expense.objects.create(user=self.user, category=self.travel, title="Taxi",
+                               amount=Decimal("40.00"), expense_date=datetime.date(2026, 3, 3))
+        Expense.objects.create(user=make_user("other@example.com"), category=self.food, title="Not mine",
+                               amount=Decimal("1.00"), expense_date=datetime.date(2026, 3, 1))
+
+    def get(self, fmt, **params):
+        response = self.client.get(reverse("expense-export", args=[fmt]), params)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv_follows_list_filters(self):
+        response, body = self.get("csv", category=str(self.food.id), sort_by="amount", cursor="junk")
+        self.assertIn("attachment;", response["Content-Disposition"])
+        rows = list(csv.reader(StringIO(body)))
+        self.assertEqual(rows[0], [name for name, _ in export.COLUMNS])
+        self.assertEqual([row[:5] for row in rows[1:]], [
+            ["2026-03-02", "Lunch", "Food", "12.50", "Café"],
+            ["2026-03-01", "'=HYPERLINK(1)", "Food", "3.00", ""],
+        ])
+
+    def test_ndjson(self):
+        response, body = self.get("ndjson", search="lunch")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = body.splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["amount"], "12.50")
+
+        _, body = self.get("ndjson")
+        self.assertEqual([json.loads(line)["title"] for line in body.splitlines()],
+                         ["Taxi", "Lunch", "=HYPERLINK(1)"])
+
+    def test_unknown_format(self):
+        self.assertEqual(self.client.get(reverse("expense-export", args=["xml"])).status_code, 404)
+
+    def test_peak_memory_does_not_grow_with_rows(self):
+        def peak_bytes(fmt):
+            tracemalloc.start()
+            try:
+                response = self.client.get(reverse("expense-export", args=[fmt]))
+                lines = sum(chunk.count(b"\n") for chunk in response.streaming_content)
+                return lines, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def add(count):
+            Expense.objects.bulk_create(
+                Expense(user=self.user, category=self.food, title=f"Expense {i}", amount=Decimal("9.99"),
+                        expense_date=datetime.date(2026, 1, 1) - datetime.timedelta(days=i % 1500))
+                for i in range(count)
+            )
+
+        # Ten times the rows must not need more memory: one chunk is held at a time
+        # (`manage.py bench_expense_export` measures the same at a million rows)
+        with mock.patch.object(export, "EXPORT_CHUNK_SIZE", 200):
+            add(397)
+            peaks = {fmt: peak_bytes(fmt) for fmt in export.FORMATS}
+            add(3600)
+            for fmt, (lines, peak) in peaks.items():
+                large_lines, large_peak = peak_bytes(fmt)
+                self.assertEqual(large_lines, lines + 3600)
+                self.assertLess(large_peak, peak * 1.5 + 64 * 1024, fmt)
+
+
+class ClearDemoDataTests(TestCase):
+    """Clearing demo data leaves no derived spending data behind"""
+
+    def test_clear_removes_rollups_and_forecasts(self):
+        user = make_user()
+        user.is_superuser = True
+        user.save()
+        self.client.force_login(user)
+        food = Category.objects.create(user=user, name="Food")
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=user, category=food, title="Lunch", amount=Decimal("20.00"),
+                                   expense_date=timezone.localdate() - datetime.timedelta(days=40))
+        get_forecast(user)
+        self.assertTrue(DailySpendingRollup.objects.filter(user=user).exists())
+        self.assertTrue(SpendingForecast.objects.filter(user=user, category=None).exists())
+
+        self.assertEqual(self.client.get(reverse("demo-data-clear")).status_code, 200)
+        self.assertFalse(MonthlySpendingRollup.objects.filter(user=user).exists())
+        self.assertFalse(DailySpendingRollup.objects.filter(user=user).exists())
+        self.assertFalse(SpendingForecast.objects.filter(user=user).exists())
+        self.assertEqual(get_forecast(user), Decimal("0"))
+
+    def test_clear_command_removes_derived_data(self):
+        user = make_user()
+        food = Category.objects.create(user=user, name="Food")
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=user, category=food, title="Lunch", amount=Decimal("20.00"),
+                                   expense_date=timezone.localdate() - datetime.timedelta(days=40))
+        get_forecast(user)
+        self.assertEqual(autocomplete.suggest(user.id, "lu"), ["Lunch"])
+
+        # Only the --clear part: no new demo expenses
+        with mock.patch.object(Expense.objects, "create"), self.captureOnCommitCallbacks(execute=True):
+            call_command("add_demo_data", user=user.email, clear=True, stdout=StringIO())
+        self.assertFalse(Expense.objects.filter(user=user).exists())
+        self.assertFalse(MonthlySpendingRollup.objects.filter(user=user).exists())
+        self.assertFalse(DailySpendingRollup.objects.filter(user=user).exists())
+        self.assertFalse(SpendingForecast.objects.filter(user=user).exists())
+        self.assertEqual(autocomplete.suggest(user.id, "lu"), [])
+
+
+class PeriodTests(SimpleTestCase):
+
+    def test_month_ranges_are_half_open(self):
+        self.assertEqual(
+            periods.month(2026, 12),
+            (datetime.date(2026, 12, 1), datetime.date(2027, 1, 1)),
+        )
+        february = periods.month(2024, 2)
+        self.assertEqual(february.days, 29)
+        self.assertIn(datetime.date(2024, 2, 29), february)
+        self.assertNotIn(datetime.date(2024, 3, 1), february)
+
+    def test_quarter_year_and_trailing_windows(self):
+        self.assertEqual(periods.quarter(2026, 4), periods.months(2026, 10, 3))
+        self.assertEqual(periods.quarter(2026, 4).months(), [(2026, 10), (2026, 11), (2026, 12)])
+        self.assertEqual(periods.year(2026).days, 365)
+
+        today = datetime.date(2026, 3, 31)
+        self.assertEqual(periods.trailing_months(3, today), periods.months(2025, 12, 3))
+        self.assertEqual(periods.trailing_months(2, today, include_current=True), periods.months(2026, 2, 2))
+        self.assertEqual(
+            periods.trailing_days(7, today),
+            (datetime.date(2026, 3, 25), datetime.date(2026, 4, 1)),
+        )
+
+    def test_month_offsets_never_skip_or_repeat(self):
+        # 30-day steps back from Mar 31 hit Mar 1 and skip February
+        self.assertEqual(
+            periods.closed_months(4, datetime.date(2026, 3, 31)),
+            [(2026, 2), (2026, 1), (2025, 12), (2025, 11)],
+        )
+        self.assertEqual(periods.add_months(2026, 1, -1), (2025, 12))
+        self.assertEqual(periods.add_months(2026, 11, 14), (2028, 1))
+
+
+class MonthQueryPlanTests(TestCase):
+    """Month filters must be range predicates the composite expense index can serve"""
+
+    def setUp(self):
+        self.user = make_user()
+        category = Category.objects.create(user=self.user, name="Food")
+        for day in range(1, 29):
+            Expense.objects.create(
+                user=self.user, category=category, title="Lunch", amount=Decimal("10.00"),
+                expense_date=datetime.date(2026, 2, day),
+            )
+
+    def assert_uses_date_index(self, queryset):
+        # (user, is_deleted, expense_date) or (user, expense_date): the planner
+        # may pick either, both seek straight to the month
+        date_indexes = [
+            index.name for index in Expense._meta.indexes
+            if index.fields[0] == "user" and index.fields[-1] == "expense_date"
+            and "category" not in index.fields
+        ]
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            plan = queryset.explain()
+
+        self.assertTrue(any(name in plan for name in date_indexes), plan)
+        if connection.vendor == "sqlite":
+            # The date range is part of the index search, not a row filter
+            self.assertIn("expense_date>", plan)
+
+    def test_month_filter_uses_composite_index(self):
+        queryset = Expense.objects.filter(
+            periods.month(2026, 2).q(), user=self.user, is_deleted=False
+        )
+        self.assertEqual(queryset.count(), 28)
+        self.assert_uses_date_index(queryset)
+
+
+class StartupImportTests(SimpleTestCase):
+    """Web workers must not load the AI engine's numeric libraries at startup"""
+
+    def test_startup_avoids_numeric_libraries(self):
+        out = StringIO()
+        call_command("check_startup_imports", budget_ms=60000, stdout=out)
+        self.assertIn("Startup imports took", out.getvalue())
+
+    def test_forbidden_import_fails(self):
+        with override_settings(STARTUP_FORBIDDEN_IMPORTS=("django",)):
+            with self.assertRaisesMessage(CommandError, "forbidden modules"):
+                call_command("check_startup_imports", budget_ms=60000, stdout=StringIO())
+
+
+# Run in a fresh interpreter, on its own test database: posts an anomalous
+# expense and prints whether numpy was loaded along the way
+ANOMALY_WRITE_SCRIPT = """
+import datetime, sys
+import django
+django.setup()
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+if connection.vendor != "sqlite":
+    connection.settings_dict["TEST"]["NAME"] = "test_%s_imports" % connection.settings_dict["NAME"]
+setup_test_environment()
+old_name = connection.settings_dict["NAME"]
+connection.creation.create_test_db(verbosity=0, autoclobber=True)
+try:
+    from django.contrib.auth import get_user_model
+    from apps.ai_engine.models import SpendingInsight
+    from apps.expenses.models import Category, Expense
+    user = get_user_model().objects.create(username="user", email="user@example.com")
+    coffee = Category.objects.create(user=user, name="Coffee")
+    for day in range(1, 11):
+        Expense.objects.create(
+            user=user, category=coffee, title="Coffee", amount="5.00",
+            expense_date=datetime.date(2026, 3, day),
+        )
+    client = Client()
+    client.force_login(user)
+    client.post(reverse("expense-add"), {
+        "title": "Coffee", "amount": "80.00", "category": coffee.id,
+        "expense_date": "2026-03-12", "notes": "",
+    })
+    print(SpendingInsight.objects.filter(user=user, insight_type="anomaly").count())
+    print("numpy" in sys.modules)
+finally:
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+"""
+
+
+class AnomalyWriteImportTests(SimpleTestCase):
+    """Flagging an anomalous expense happens in a web worker: no numeric libraries"""
+
+    def test_anomalous_write_does_not_load_numpy(self):
+        result = subprocess.run(
+            [sys.executable, "-c", ANOMALY_WRITE_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        flagged, numpy_loaded = result.stdout.split()[-2:]
+        self.assertEqual(flagged, "1")
+        self.assertEqual(numpy_loaded, "False")
@@ -0,0 +1,310 @@
+"""
+Two-tier cache for user-scoped keys: per-worker LRU in front of the Django cache
+
+Dashboard and list pages read a handful of generation counters and cached
+payloads on every render. With the local tier enabled (USER_CACHE_LOCAL_TIER),
+those reads are served from process memory, skipping the Redis round trip and
+zlib decompression. Every write through the tiered cache is announced on an
+invalidation channel so other workers drop their local copy right away; local
+entries also expire after USER_CACHE_LOCAL_TTL seconds as a safety net.
+A value read from the shared tier is kept locally only if its key was not
+invalidated while the read was in flight, so a concurrent write can't leave a
+stale copy behind.
+
+Broadcasters:
+- RedisBroadcaster: Redis pub/sub, one listener thread per worker process
+- InMemoryBroadcaster: in-process fan-out, for LocMemCache and tests
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Bounded, thread-safe LRU with a per-entry expiry"""
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self.delete(key)
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ======================================
+# INVALIDATION BROADCASTERS
+# ======================================
+class InMemoryBroadcaster:
+    """Delivers messages synchronously to subscribers in this process"""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]) -> None:
+        self._subscribers.append(callback)
+
+    def publish(self, message: str) -> None:
+        for callback in list(self._subscribers):
+            callback(message)
+
+
+class RedisBroadcaster:
+    """
+    Redis pub/sub fan-out. Subscribers are called from a daemon listener thread;
+    after every (re)connect they receive None, meaning "messages may have been
+    missed, drop everything".
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._subscribers = []
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+
+    def subscribe(self, callback: Callable[[Optional[str]], None]) -> None:
+        self._subscribers.append(callback)
+        self._ensure_listener()
+
+    def publish(self, message: str) -> None:
+        self._ensure_listener()
+        try:
+            self._connection().publish(self.channel, message)
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+
+    def _ensure_listener(self) -> None:
+        # Threads don't survive fork - start one per worker process
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._listen, name="cache-invalidation", daemon=True
+            )
+            self._thread.start()
+
+    def _dispatch(self, message: Optional[str]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(message)
+            except Exception as e:
+                logger.error(f"Cache invalidation callback failed: {e}", exc_info=True)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self._connection().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                self._dispatch(None)
+                for item in pubsub.listen():
+                    if item.get("type") == "message":
+                        data = item["data"]
+                        self._dispatch(data.decode() if isinstance(data, bytes) else data)
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+                time.sleep(1)
+
+
+# ======================================
+# TIERED CACHE
+# ======================================
+class TieredCache:
+    """
+    The subset of the Django cache API used for user-scoped keys, with an
+    optional local tier. Without one, every call goes straight to `shared`.
+    """
+
+    # Keys whose last invalidation is remembered, to vet in-flight shared reads
+    RECENT_INVALIDATIONS = 10000
+
+    def __init__(self, shared=None, local: Optional[LocalLRU] = None, broadcaster=None):
+        self.shared = shared if shared is not None else cache
+        self.local = local
+        self.broadcaster = broadcaster
+        self.origin = uuid.uuid4().hex
+        self.stats = Counter()
+        # Invalidation sequence: key -> sequence number of its last invalidation.
+        # Reads that started before `_floor` can't be vetted (forgotten or cleared).
+        self._seq = 0
+        self._floor = 0
+        self._recent = OrderedDict()
+        self._seq_lock = threading.Lock()
+        if local is not None and broadcaster is not None:
+            broadcaster.subscribe(self._on_message)
+
+    # Invalidation ----------------------------------------------------
+    def _drop_local(self, keys: Optional[Iterable[str]]) -> None:
+        """Drop local copies of `keys` (all of them if None) and record the invalidation"""
+        with self._seq_lock:
+            self._seq += 1
+            if keys is None:
+                self._floor = self._seq
+                self._recent.clear()
+                self.local.clear()
+                return
+            for key in keys:
+                self._recent[key] = self._seq
+                self._recent.move_to_end(key)
+                self.local.delete(key)
+            while len(self._recent) > self.RECENT_INVALIDATIONS:
+                _, self._floor = self._recent.popitem(last=False)
+
+    def _keep_local(self, key: str, value: Any, seq: int) -> None:
+        """
+        Store a value read from the shared tier when invalidation sequence was
+        `seq`, unless the key was (or may have been) invalidated since: the
+        value may then predate the write. Checked under the lock that
+        invalidations take, so none can slip in between check and store.
+        """
+        with self._seq_lock:
+            if seq >= self._floor and self._recent.get(key, 0) <= seq:
+                self.local.set(key, value)
+
+    def _announce(self, keys: Iterable[str]) -> None:
+        if self.local is None:
+            return
+        keys = list(keys)
+        self._drop_local(keys)
+        if self.broadcaster is not None:
+            self.broadcaster.publish(json.dumps({"o": self.origin, "k": keys}))
+
+    def _on_message(self, message: Optional[str]) -> None:
+        if message is None:
+            self._drop_local(None)
+            return
+        try:
+            data = json.loads(message)
+        except ValueError:
+            return
+        if data.get("o") == self.origin:
+            return
+        self._drop_local(data.get("k", []))
+
+    # Reads -------------------------------------------------------------
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        remaining = []
+        for key in keys:
+            value = _MISSING if self.local is None else self.local.get(key)
+            if value is _MISSING:
+                remaining.append(key)
+            else:
+                found[key] = value
+        if self.local is not None:
+            self.stats["local_hits"] += len(found)
+            self.stats["local_misses"] += len(remaining)
+
+        if remaining:
+            seq = self._seq
+            shared = self.shared.get_many(remaining)
+            self.stats["shared_hits"] += len(shared)
+            self.stats["shared_misses"] += len(remaining) - len(shared)
+            if self.local is not None:
+                for key, value in shared.items():
+                    self._keep_local(key, value, seq)
+            found.update(shared)
+        return found
+
+    def get(self, key: str, default=None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    # Writes ------------------------------------------------------------
+    def set(self, key: str, value: Any, timeout: Optional[float], local_timeout: Optional[float] = None) -> None:
+        """`local_timeout` caps how long this worker may serve the value without rechecking"""
+        self.shared.set(key, value, timeout)
+        self._announce([key])
+        if self.local is not None:
+            self.local.set(key, value, local_timeout)
+
+    def add(self, key: str, value: Any, timeout: Optional[float]) -> bool:
+        # Missing keys are never cached locally, so there is nothing to announce
+        return self.shared.add(key, value, timeout)
+
+    def incr(self, key: str) -> int:
+        value = self.shared.incr(key)
+        self._announce([key])
+        return value
+
+    def delete(self, key: str) -> None:
+        self.shared.delete(key)
+        self._announce([key])
+
+    # Stats -------------------------------------------------------------
+    def hit_rates(self) -> Dict[str, Optional[float]]:
+        """Hit rate per tier (None until the tier has seen a lookup)"""
+        rates = {}
+        for tier in ("local", "shared"):
+            hits = self.stats[f"{tier}_hits"]
+            lookups = hits + self.stats[f"{tier}_misses"]
+            rates[tier] = round(hits / lookups, 3) if lookups else None
+        return rates
+
+
+def build_tiered_cache() -> TieredCache:
+    """TieredCache configured from settings (USER_CACHE_LOCAL_*)"""
+    if not getattr(settings, "USER_CACHE_LOCAL_TIER", False):
+        return TieredCache()
+
+    local = LocalLRU(
+        max_entries=getattr(settings, "USER_CACHE_LOCAL_MAX_ENTRIES", 5000),
+        ttl=getattr(settings, "USER_CACHE_LOCAL_TTL", 30),
+    )
+    backend = settings.CACHES["default"]["BACKEND"]
+    if backend.startswith("django_redis."):
+        broadcaster = RedisBroadcaster(
+            getattr(settings, "USER_CACHE_INVALIDATION_CHANNEL", "user-cache-invalidate")
+        )
+    else:
+        # LocMemCache is per process already, so in-process fan-out is complete
+        broadcaster = InMemoryBroadcaster()
+    return TieredCache(local=local, broadcaster=broadcaster)
@@ -1,7 +1,10 @@
 from django.urls import path
 from .views import (
     DashboardView,
+    CategoryExpensesView,
     ExpenseListView,
+    TitleSuggestionsView,
+    ExpenseExportView,
     ExpenseCreateView,
     ExpenseUpdateView,
     ExpenseDeleteView,
@@ -19,7 +22,10 @@ from .demo_data_view import add_demo_data, clear_demo_data
 
 urlpatterns = [
     path("", DashboardView.as_view(), name="dashboard"),
+    path("dashboard/categories/<uuid:pk>/expenses/", CategoryExpensesView.as_view(), name="dashboard-category-expenses"),
     path("expenses/", ExpenseListView.as_view(), name="expense-list"),
+    path("expenses/titles/", TitleSuggestionsView.as_view(), name="expense-title-suggestions"),
+    path("expenses/export/<str:fmt>/", ExpenseExportView.as_view(), name="expense-export"),
     path("add/", ExpenseCreateView.as_view(), name="expense-add"),
     path("edit/<uuid:pk>/", ExpenseUpdateView.as_view(), name="expense-edit"),
     path("delete/<uuid:pk>/", ExpenseDeleteView.as_view(), name="expense-delete"),
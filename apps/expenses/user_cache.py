@@ -0,0 +1,221 @@
+"""
+User-scoped cache keys with generation counters
+
+Every user-scoped cache entry (dashboard, category lists, AI data) embeds the
+user's current generation number, and optionally a per-month generation.
+Invalidation is a single atomic INCR of the relevant counter: entries built
+under the old generation simply stop being addressed and expire on their own,
+no matter how many months or views were cached.
+
+    key = user_cache.make_key(user.id, "dashboard", period=(year, month))
+    data = cache.get(key)
+    ...
+    user_cache.invalidate_user(user.id)               # any expense write
+    user_cache.invalidate_month(user.id, year, month) # budget for one month
+
+get_or_compute() adds single-flight recomputation and stale-while-revalidate
+on top of any key, so an expiring entry is rebuilt by one request while
+concurrent requests keep being served the previous value.
+
+Counters and entries go through a TieredCache (see tiered_cache.py), which
+adds an optional per-worker LRU in front of the Django cache.
+"""
+import logging
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .tiered_cache import TieredCache, build_tiered_cache
+
+perf_logger = logging.getLogger("performance")
+
+# Log a summary of get_or_compute() outcomes every N lookups per process
+STATS_LOG_INTERVAL = 100
+
+_stats = Counter()
+
+_tiers: Optional[TieredCache] = None
+
+
+def tiers() -> TieredCache:
+    """The process-wide TieredCache, built from settings on first use"""
+    global _tiers
+    if _tiers is None:
+        _tiers = build_tiered_cache()
+    return _tiers
+
+
+def _user_gen_key(user_id) -> str:
+    return f"gen:{user_id}"
+
+
+def _month_gen_key(user_id, year: int, month: int) -> str:
+    return f"gen:{user_id}:{year}-{month}"
+
+
+def _initial_generation() -> int:
+    # Counters live without expiry, but may still be evicted. Seeding from the
+    # clock keeps a re-created counter ahead of every generation used before.
+    return time.time_ns() // 1000
+
+
+def _bump(gen_key: str) -> None:
+    try:
+        tiers().incr(gen_key)
+    except ValueError:
+        # Counter missing - any fresh seed invalidates entries built on the old one
+        tiers().set(gen_key, _initial_generation(), timeout=None)
+
+
+def _current(gen_keys) -> dict:
+    """Read generation counters in one round trip, seeding any that are missing"""
+    generations = tiers().get_many(gen_keys)
+    for gen_key in gen_keys:
+        if gen_key not in generations:
+            tiers().add(gen_key, _initial_generation(), timeout=None)
+            generations[gen_key] = tiers().get(gen_key)
+    return generations
+
+
+def make_key(user_id, name: str, *parts, period: Optional[Tuple[int, int]] = None) -> str:
+    """
+    Build a cache key for user-scoped data.
+
+    `period` is a (year, month) pair for data that also depends on month-level
+    state (budgets), so it is invalidated by invalidate_month() too.
+    """
+    user_gen_key = _user_gen_key(user_id)
+    gen_keys = [user_gen_key]
+    if period is not None:
+        gen_keys.append(_month_gen_key(user_id, *period))
+
+    generations = _current(gen_keys)
+    key = f"{name}:{user_id}:g{generations[user_gen_key]}"
+    if period is not None:
+        year, month = period
+        key += f":{year}-{month}:g{generations[gen_keys[1]]}"
+    for part in parts:
+        key += f":{part}"
+    return key
+
+
+def invalidate_user(user_id) -> None:
+    """Invalidate every cached entry for a user"""
+    _bump(_user_gen_key(user_id))
+
+
+def invalidate_month(user_id, year: int, month: int) -> None:
+    """Invalidate cached entries built with period=(year, month)"""
+    _bump(_month_gen_key(user_id, year, month))
+
+
+def invalidate_user_on_commit(user_id) -> None:
+    """Invalidate once the current transaction commits, so readers can't re-cache old data"""
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+def invalidate_month_on_commit(user_id, year: int, month: int) -> None:
+    """invalidate_month() once the current transaction commits (see invalidate_user_on_commit)"""
+    transaction.on_commit(lambda: invalidate_month(user_id, year, month))
+
+
+def invalidate_on_expense_change(sender, user_id, **kwargs):
+    """expense_changed receiver - totals on every page depend on each expense"""
+    invalidate_user_on_commit(user_id)
+
+
+# ======================================
+# SINGLE-FLIGHT / STALE-WHILE-REVALIDATE
+# ======================================
+def _record(event: str) -> None:
+    _stats[event] += 1
+    _stats["lookups"] += event in ("hit", "stale", "miss")
+    if event in ("hit", "stale", "miss") and _stats["lookups"] % STATS_LOG_INTERVAL == 0:
+        rates = tiers().hit_rates()
+        perf_logger.info(
+            "cache stats lookups=%d hits=%d stale_served=%d misses=%d lock_waits=%d lock_timeouts=%d "
+            "local_hit_rate=%s shared_hit_rate=%s",
+            _stats["lookups"], _stats["hit"], _stats["stale"], _stats["miss"],
+            _stats["lock_wait"], _stats["lock_timeout"], rates["local"], rates["shared"],
+        )
+
+
+def cache_stats() -> dict:
+    """get_or_compute() outcome counts and per-tier hit rates for this process"""
+    return dict(_stats, **{f"{tier}_hit_rate": rate for tier, rate in tiers().hit_rates().items()})
+
+
+def _acquire(lock_key: str, timeout: int) -> Optional[str]:
+    # cache.add is SET NX EX on Redis (shared by all workers); on LocMemCache it
+    # is an in-process atomic add, which still collapses concurrent threads.
+    token = uuid.uuid4().hex
+    return token if cache.add(lock_key, token, timeout) else None
+
+
+def _release(lock_key: str, token: str) -> None:
+    # Only drop the lock if it is still ours (it may have timed out and moved on)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def store(key: str, value: Any, soft_ttl: int, hard_ttl: int) -> None:
+    """Cache `value` as get_or_compute() does, e.g. to replace an entry the caller can't use"""
+    # The local tier must never serve an entry past its soft expiry: staleness
+    # is decided against the shared copy, which another worker may have refreshed
+    tiers().set(key, (time.time() + soft_ttl, value), hard_ttl, local_timeout=soft_ttl)
+
+
+def _unpack(entry) -> Tuple[Optional[float], Any]:
+    if isinstance(entry, tuple) and len(entry) == 2:
+        return entry
+    return None, None
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], soft_ttl: int, hard_ttl: int,
+                   lock_timeout: int = 30, wait_timeout: float = 5.0) -> Any:
+    """
+    Return the cached value for `key`, computing it with `compute()` if needed.
+
+    - Fresh (younger than soft_ttl): returned as is.
+    - Stale (older than soft_ttl, younger than hard_ttl): one caller takes the
+      lock and recomputes, everyone else is served the stale value meanwhile.
+    - Missing: one caller computes; the others wait up to wait_timeout for the
+      result, then compute themselves rather than fail.
+    """
+    fresh_until, value = _unpack(tiers().get(key))
+    if fresh_until is not None and time.time() < fresh_until:
+        _record("hit")
+        return value
+
+    lock_key = f"lock:{key}"
+    token = _acquire(lock_key, lock_timeout)
+
+    if token is None and fresh_until is not None:
+        _record("stale")
+        return value
+
+    if token is None:
+        _record("lock_wait")
+        started = time.monotonic()
+        while time.monotonic() - started < wait_timeout:
+            time.sleep(0.05)
+            fresh_until, value = _unpack(tiers().get(key))
+            if fresh_until is not None:
+                perf_logger.info("cache lock wait %s %.0fms", key, (time.monotonic() - started) * 1000)
+                _record("hit")
+                return value
+        perf_logger.warning("cache lock wait timed out for %s after %.1fs", key, wait_timeout)
+        _record("lock_timeout")
+
+    _record("miss")
+    try:
+        value = compute()
+        store(key, value, soft_ttl, hard_ttl)
+        return value
+    finally:
+        if token is not None:
+            _release(lock_key, token)
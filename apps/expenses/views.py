@@ -1,26 +1,47 @@
 from typing import cast
+from datetime import date
 import calendar
 import logging
 
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib import messages
+from django.db import transaction
 from django.urls import reverse_lazy
 from django.shortcuts import redirect
-from django.db.models import Sum, Q, Prefetch
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from django.core.cache import cache
 
+from . import autocomplete, export, filters, pagination, periods, user_cache
+from .search import get_backend as search_backend
 from .models import Expense, MonthlyBudget, Category, CategoryBudget
 from .forms import ExpenseForm, ExpenseFilterForm, CategoryForm, CategoryBudgetForm
 from .budget_forms import MonthlyBudgetForm
-from apps.ai_engine.ai_service import forecast_next_month_spending, generate_insights_for_user
+from .dashboard import (
+    DASHBOARD_SCHEMA_VERSION,
+    deserialize_dashboard,
+    get_dashboard_data,
+    serialize_dashboard,
+)
+from apps.ai_engine.anomalies import record_anomaly, score_expense
+from apps.ai_engine.jobs import enqueue_insight_refresh
+from apps.ai_engine.models import SpendingInsight
+from apps.analytics import rollups
 
 import json
 
 # Get logger for this module
 logger = logging.getLogger(__name__)
 
+# Number of AI insight cards shown on the dashboard
+DASHBOARD_INSIGHT_LIMIT = 6
+
+# Dashboard entries are recomputed after the soft TTL but may be served stale
+# (while one request recomputes) until the hard TTL
+DASHBOARD_CACHE_SOFT_TTL = 60 * 15  # 15 minutes
+DASHBOARD_CACHE_TTL = 60 * 60       # 1 hour
+
 
 # ======================================
 # DASHBOARD VIEW
@@ -56,178 +77,52 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context['next_year'] = next_year
         context['next_month'] = next_month
         
-        # Try to get cached dashboard data
-        cache_key = f'dashboard_{user.id}_{year}_{month}'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            logger.info(f"Dashboard cache hit for user {user.email}")
-            # Update with navigation data
-            cached_data.update({
-                'selected_year': year,
-                'selected_month': month,
-                'prev_year': prev_year,
-                'prev_month': prev_month,
-                'next_year': next_year,
-                'next_month': next_month,
-            })
-            context.update(cached_data)
-            return context
+        # Selected month for date formatting
+        context["current_month"] = date(year, month, 1)
+        context["current_year"] = year
         
-        # Cache miss - calculate dashboard data
-        logger.info(f"Dashboard cache miss for user {user.email}, calculating...")
-
-        try:
-            # Get basic stats with error handling
-            total_spent = (
-                Expense.objects.filter(user=user, is_deleted=False)
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-
-            monthly_spent = (
-                Expense.objects.filter(
-                    user=user,
-                    is_deleted=False,
-                    expense_date__year=year,
-                    expense_date__month=month,
-                )
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
-
-            # Safe category data for selected month
-            try:
-                category_data = list(
-                    Expense.objects.filter(
-                        user=user, 
-                        is_deleted=False,
-                        expense_date__year=year,
-                        expense_date__month=month
-                    )
-                    .values("category__name")
-                    .annotate(total=Sum("amount"))
-                )
-            except:
-                category_data = []
+        # Cached dashboard data (ignored if written by another schema version).
+        # Only one request per key recomputes; others get the stale copy meanwhile.
+        cache_key = user_cache.make_key(
+            user.id, f'dashboard:v{DASHBOARD_SCHEMA_VERSION}', period=(year, month)
+        )
 
-            # Budget info for selected month
-            current_budget = MonthlyBudget.objects.filter(
-                user=user,
-                year=year,
-                month=month
-            ).first()
+        def compute():
+            logger.info(f"Dashboard cache miss for user {user.email}, calculating...")
 
-            budget_amount = current_budget.amount if current_budget else 0
-            remaining_amount = budget_amount - monthly_spent
-            percentage_used = (monthly_spent / budget_amount * 100) if budget_amount > 0 else 0
-            
-            # AI-powered forecast for next month
-            predicted_next_month = forecast_next_month_spending(user)
+            # Spending, budget and forecast figures (fixed query count)
+            dashboard_data = get_dashboard_data(user, year, month)
             
-            # Generate AI insights for the user
-            try:
-                ai_insights = generate_insights_for_user(user)
-                logger.info(f"Generated {len(ai_insights)} AI insights for user {user.email}")
-            except Exception as e:
-                logger.error(f"Error generating AI insights: {e}")
-                ai_insights = []
-
-            # Category-wise budget breakdown (optimized with prefetch)
-            # Prefetch expenses for selected month to avoid N+1 queries
-            current_month_expenses = Expense.objects.filter(
-                user=user,
-                is_deleted=False,
-                expense_date__year=year,
-                expense_date__month=month
+            # Latest persisted AI insights (generated by run_insight_worker)
+            dashboard_data["ai_insights"] = list(
+                SpendingInsight.objects.filter(user=user)
+                .order_by('-created_at')[:DASHBOARD_INSIGHT_LIMIT]
             )
-            
-            category_budgets = CategoryBudget.objects.filter(
-                user=user,
-                year=year,
-                month=month
-            ).select_related('category').prefetch_related(
-                Prefetch(
-                    'category__expenses',
-                    queryset=current_month_expenses,
-                    to_attr='current_month_expenses'
-                )
+            if not dashboard_data["ai_insights"] and user.ai_credits > 0:
+                enqueue_insight_refresh(user.id)
+            return serialize_dashboard(dashboard_data)
+
+        try:
+            payload = user_cache.get_or_compute(
+                cache_key, compute,
+                soft_ttl=DASHBOARD_CACHE_SOFT_TTL,
+                hard_ttl=DASHBOARD_CACHE_TTL,
             )
-            
-            category_budget_data = []
-            total_category_budget = 0
-            
-            for cat_budget in category_budgets:
-                # Calculate spent from prefetched data (no extra query!)
-                expenses_list = list(cat_budget.category.current_month_expenses)
-                spent = sum(
-                    expense.amount 
-                    for expense in expenses_list
+            dashboard = deserialize_dashboard(payload)
+            if dashboard is None:
+                # Unreadable entry (another schema version): a miss
+                payload = compute()
+                user_cache.store(
+                    cache_key, payload,
+                    soft_ttl=DASHBOARD_CACHE_SOFT_TTL,
+                    hard_ttl=DASHBOARD_CACHE_TTL,
                 )
-                
-                remaining = cat_budget.amount - spent
-                percentage = (spent / cat_budget.amount * 100) if cat_budget.amount > 0 else 0
-                
-                category_budget_data.append({
-                    'category': cat_budget.category,
-                    'budget': cat_budget.amount,
-                    'spent': spent,
-                    'remaining': remaining,
-                    'percentage': round(percentage, 1),
-                    'status': 'danger' if percentage > 100 else ('warning' if percentage > 80 else 'success'),
-                    'expenses': expenses_list  # Add expenses to show in dashboard
-                })
-                
-                total_category_budget += cat_budget.amount
-
-            # Calculate unallocated budget
-            unallocated_budget = budget_amount - total_category_budget
-            
-            # Create date object for selected month
-            from datetime import date
-            selected_date = date(year, month, 1)
-
-            
-            # Cache the dashboard data for 15 minutes
-            dashboard_data = {
-                "total_spent": total_spent,
-                "monthly_spent": monthly_spent,
-                "category_data": category_data,
-                "budget_amount": budget_amount,
-                "remaining_amount": remaining_amount,
-                "percentage_used": round(percentage_used, 2),
-                "predicted_next_month": predicted_next_month,
-                "category_budget_data": category_budget_data,
-                "total_category_budget": total_category_budget,
-                "unallocated_budget": unallocated_budget,
-                "current_month": selected_date,  # First day of selected month for date formatting
-                "current_year": year,
-                "ai_insights": ai_insights,
-            }
-            cache.set(cache_key, dashboard_data, 60 * 15)  # 15 minutes
-            logger.info(f"Dashboard data cached for user {user.email}")
-            context["total_spent"] = total_spent
-            context["monthly_spent"] = monthly_spent
-            context["category_data"] = category_data
-            context["budget_amount"] = budget_amount
-            context["remaining_amount"] = remaining_amount
-            context["percentage_used"] = round(percentage_used, 2)
-            context["predicted_next_month"] = predicted_next_month
-            context["category_budget_data"] = category_budget_data
-            context["total_category_budget"] = total_category_budget
-            context["unallocated_budget"] = unallocated_budget
-            context["ai_insights"] = ai_insights
-            
-            from datetime import date
-            selected_date = date(year, month, 1)
-            context["current_month"] = selected_date  # First day of selected month for date formatting
-            context["current_year"] = year
+                dashboard = deserialize_dashboard(payload)
+            context.update(dashboard)
 
         except Exception as e:
             # If anything fails, just show empty dashboard
             logger.error(f"Dashboard error for user {user.email}: {e}", exc_info=True)
-            from datetime import date
-            selected_date = date(year, month, 1)
             context["total_spent"] = 0
             context["monthly_spent"] = 0
             context["category_data"] = []
@@ -235,14 +130,72 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             context["remaining_amount"] = 0
             context["percentage_used"] = 0
             context["predicted_next_month"] = 0
+            context["burn_chart"] = None
             context["category_budget_data"] = []
             context["total_category_budget"] = 0
-            context["current_month"] = selected_date
-            context["current_year"] = year
 
         return context
 
 
+# ======================================
+# DASHBOARD CATEGORY DRILL-DOWN
+# ======================================
+class CategoryExpensesView(LoginRequiredMixin, View):
+    """
+    Paginated expense rows for one category card on the dashboard (JSON).
+    Fetched when a card is expanded, cached separately from the dashboard.
+    """
+    login_url = 'login'
+    page_size = 20
+
+    def get(self, request, pk):
+        user = request.user
+        now = timezone.now()
+        try:
+            year = int(request.GET.get('year', now.year))
+            month = int(request.GET.get('month', now.month))
+            page = max(1, int(request.GET.get('page', 1)))
+            period = periods.month(year, month)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid year, month or page'}, status=400)
+
+        cache_key = user_cache.make_key(
+            user.id, 'category_expenses', pk, page, period=(year, month)
+        )
+
+        def compute():
+            offset = (page - 1) * self.page_size
+            # Fetch one extra row to know whether another page exists, no COUNT(*)
+            rows = list(
+                Expense.objects.filter(
+                    period.q(),
+                    user=user,
+                    category_id=pk,
+                    is_deleted=False,
+                )
+                .order_by('-expense_date', '-created_at')
+                .values_list('id', 'title', 'amount', 'expense_date')[offset:offset + self.page_size + 1]
+            )
+            return {
+                'page': page,
+                'has_next': len(rows) > self.page_size,
+                'results': [
+                    {
+                        'id': str(expense_id),
+                        'title': title,
+                        'amount': str(amount),
+                        'date': expense_date.isoformat(),
+                    }
+                    for expense_id, title, amount, expense_date in rows[:self.page_size]
+                ],
+            }
+
+        payload = user_cache.get_or_compute(
+            cache_key, compute, soft_ttl=60 * 15, hard_ttl=60 * 60
+        )
+        return JsonResponse(payload)
+
+
 # ======================================
 # EXPENSE LIST
 # ======================================
@@ -254,62 +207,35 @@ class ExpenseListView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
+        # Invalid filter values are dropped (see filters.parse_filters)
+        self.filters = filters.parse_filters(self.request.GET)
+        sort_by = self.request.GET.get('sort_by', '-expense_date').strip()
+
         # Use select_related to avoid N+1 queries on category
         queryset = Expense.objects.filter(
+            *filters.conditions(self.filters),
             user=self.request.user,
-            is_deleted=False
+            is_deleted=False,
         ).select_related('category')
         
-        # Get filter parameters from GET request
-        search = self.request.GET.get('search', '').strip()
-        category_id = self.request.GET.get('category', '').strip()
-        min_amount = self.request.GET.get('min_amount', '').strip()
-        max_amount = self.request.GET.get('max_amount', '').strip()
-        start_date = self.request.GET.get('start_date', '').strip()
-        end_date = self.request.GET.get('end_date', '').strip()
-        sort_by = self.request.GET.get('sort_by', '-expense_date').strip()
-        
-        # Apply search filter (search in title and notes)
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(notes__icontains=search)
-            )
-        
-        # Apply category filter
-        if category_id:
-            queryset = queryset.filter(category_id=category_id)
-        
-        # Apply amount range filter
-        if min_amount:
-            try:
-                queryset = queryset.filter(amount__gte=float(min_amount))
-            except (ValueError, TypeError):
-                pass
-        
-        if max_amount:
-            try:
-                queryset = queryset.filter(amount__lte=float(max_amount))
-            except (ValueError, TypeError):
-                pass
-        
-        # Apply date range filter
-        if start_date:
-            try:
-                queryset = queryset.filter(expense_date__gte=start_date)
-            except (ValueError, TypeError):
-                pass
-        
-        if end_date:
-            try:
-                queryset = queryset.filter(expense_date__lte=end_date)
-            except (ValueError, TypeError):
-                pass
-        
-        # Apply sorting
+        # Sort key for keyset pagination (applied with id as tie-breaker)
+        search = self.filters.get('search')
         if sort_by in ['-expense_date', 'expense_date', '-amount', 'amount', 'title', '-title']:
-            queryset = queryset.order_by(sort_by)
+            self.sort_key = sort_by
+        elif sort_by == 'relevance' and search:
+            queryset = queryset.annotate(search_score=search_backend().score(search))
+            self.sort_key = '-search_score'
+        else:
+            self.sort_key = '-expense_date'
         
         return queryset
+
+    def paginate_queryset(self, queryset, page_size):
+        """Keyset pages: constant cost at any depth, no COUNT(*) (see pagination.py)"""
+        page = pagination.paginate(
+            queryset, self.sort_key, self.request.GET.get('cursor'), page_size
+        )
+        return None, page, page.object_list, page.has_other_pages
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -319,28 +245,88 @@ class ExpenseListView(LoginRequiredMixin, ListView):
         context['filter_form'] = filter_form
         
         # Add query string for maintaining filters in pagination
-        context['query_string'] = self.request.GET.urlencode()
-        
-        # Count statistics
-        total_expenses = Expense.objects.filter(
-            user=self.request.user,
-            is_deleted=False
-        ).count()
-        
-        filtered_expenses = self.get_queryset().count()
-        total_amount = self.get_queryset().aggregate(Sum('amount'))['amount__sum'] or 0
-        
-        context['total_expenses'] = total_expenses
-        context['filtered_expenses'] = filtered_expenses
-        context['total_amount'] = total_amount
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        params.pop('page', None)
+        context['query_string'] = params.urlencode()
+        
+        # One cached aggregate query per filter set and data version
+        stats = filters.list_stats(self.request.user, self.filters)
+        context['total_expenses'] = stats['total']
+        context['total_exact'] = stats['total_exact']
+        context['filtered_expenses'] = stats['filtered']
+        context['filtered_exact'] = stats['filtered_exact']
+        context['total_amount'] = stats['amount']
         
         return context
 
 
+# ======================================
+# EXPENSE EXPORT
+# ======================================
+class ExpenseExportView(LoginRequiredMixin, View):
+    """All expenses matching the list filters as a streamed CSV or NDJSON download"""
+    login_url = 'login'
+
+    def get(self, request, fmt):
+        if fmt not in export.FORMATS:
+            raise Http404("Unknown export format")
+
+        # Same filters as ExpenseListView; sort and cursor parameters are ignored
+        queryset = Expense.objects.filter(
+            *filters.conditions(filters.parse_filters(request.GET)),
+            user=request.user,
+            is_deleted=False,
+        )
+        response = StreamingHttpResponse(export.stream(queryset, fmt), content_type=export.FORMATS[fmt])
+        filename = f"expenses-{timezone.localdate().isoformat()}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+# ======================================
+# TITLE AUTOCOMPLETE
+# ======================================
+class TitleSuggestionsView(LoginRequiredMixin, View):
+    """Expense title suggestions for a typed prefix (JSON), from the cached per-user index"""
+    login_url = 'login'
+
+    def get(self, request):
+        prefix = request.GET.get('q', '')[:100]
+        return JsonResponse({'results': autocomplete.suggest(request.user.id, prefix)})
+
+
+# ======================================
+# REAL-TIME ANOMALY CHECK
+# ======================================
+class ExpenseAnomalyMixin:
+    """Scores a new or changed amount against its category baseline as the expense is saved"""
+
+    def save_expense(self, form):
+        expense = form.instance
+        base = None
+        if expense._state.adding or {'amount', 'category'} & set(form.changed_data):
+            # Baseline is read before the write folds this amount into it
+            base = score_expense(self.request.user.id, expense.category_id, expense.amount)
+
+        # Cached data is invalidated by the expense_changed signal on commit
+        with transaction.atomic():
+            expense = form.save()
+            if base is not None:
+                record_anomaly(expense, base)
+
+        if base is not None:
+            messages.warning(
+                self.request,
+                f'₹{expense.amount} is unusually high for {expense.category.name}.'
+            )
+        return expense
+
+
 # ======================================
 # CREATE EXPENSE
 # ======================================
-class ExpenseCreateView(LoginRequiredMixin, CreateView):
+class ExpenseCreateView(LoginRequiredMixin, ExpenseAnomalyMixin, CreateView):
     model = Expense
     form_class = ExpenseForm
     template_name = "expenses/expense_form.html"
@@ -373,21 +359,16 @@ class ExpenseCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
-        expense = form.save()
-        
-        # Invalidate dashboard cache
-        now = timezone.now()
-        cache_key = f'dashboard_{self.request.user.id}_{now.year}_{now.month}'
-        cache.delete(cache_key)
+        self.object = expense = self.save_expense(form)
         
         logger.info(f"User {self.request.user.email} created expense: {expense.title} - ₹{expense.amount}")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 # ======================================
 # UPDATE EXPENSE
 # ======================================
-class ExpenseUpdateView(LoginRequiredMixin, UpdateView):
+class ExpenseUpdateView(LoginRequiredMixin, ExpenseAnomalyMixin, UpdateView):
     model = Expense
     form_class = ExpenseForm
     template_name = "expenses/expense_form.html"
@@ -404,13 +385,10 @@ class ExpenseUpdateView(LoginRequiredMixin, UpdateView):
         kwargs = super().get_form_kwargs()
         kwargs["user"] = self.request.user
         return kwargs
-    
+
     def form_valid(self, form):
-        # Invalidate dashboard cache
-        now = timezone.now()
-        cache_key = f'dashboard_{self.request.user.id}_{now.year}_{now.month}'
-        cache.delete(cache_key)
-        return super().form_valid(form)
+        self.object = self.save_expense(form)
+        return redirect(self.get_success_url())
 
 
 # ======================================
@@ -432,11 +410,6 @@ class ExpenseDeleteView(LoginRequiredMixin, UpdateView):
     def post(self, request, *args, **kwargs):
         expense: Expense = cast(Expense, self.get_object())
         
-        # Invalidate dashboard cache
-        now = timezone.now()
-        cache_key = f'dashboard_{request.user.id}_{now.year}_{now.month}'
-        cache.delete(cache_key)
-        
         logger.info(f"User {request.user.email} soft-deleted expense: {expense.title} - ₹{expense.amount}")
         expense.is_deleted = True
         expense.save()
@@ -460,14 +433,14 @@ class MonthlyBudgetCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.user = self.request.user
+        response = super().form_valid(form)
         
-        # Invalidate dashboard cache
-        now = timezone.now()
-        cache_key = f'dashboard_{self.request.user.id}_{now.year}_{now.month}'
-        cache.delete(cache_key)
+        # Invalidate cached pages for this budget's month once the budget is committed
+        user_cache.invalidate_month_on_commit(self.request.user.id, form.instance.year, form.instance.month)
         
         logger.info(f"User {self.request.user.email} created budget: ₹{form.instance.amount} for {form.instance.year}/{form.instance.month}")
-        return super().form_valid(form)
+        enqueue_insight_refresh(self.request.user.id)
+        return response
 
 
 class MonthlyBudgetUpdateView(LoginRequiredMixin, UpdateView):
@@ -488,19 +461,16 @@ class MonthlyBudgetUpdateView(LoginRequiredMixin, UpdateView):
         return kwargs
 
     def form_valid(self, form):
-        # Invalidate dashboard cache for this budget's month
-        cache_key = f'dashboard_{self.request.user.id}_{form.instance.year}_{form.instance.month}'
-        cache.delete(cache_key)
+        original = MonthlyBudget.objects.get(pk=form.instance.pk)
+        response = super().form_valid(form)
         
-        logger.info(f"User {self.request.user.email} updated budget: ₹{form.instance.amount} for {form.instance.year}/{form.instance.month}")
-        return super().form_valid(form)
-        
-        # Invalidate dashboard cache
-        now = timezone.now()
-        cache_key = f'dashboard_{self.request.user.id}_{now.year}_{now.month}'
-        cache.delete(cache_key)
+        # Invalidate cached pages for the budget's old and new month once the edit is committed
+        user_cache.invalidate_month_on_commit(self.request.user.id, original.year, original.month)
+        user_cache.invalidate_month_on_commit(self.request.user.id, form.instance.year, form.instance.month)
         
-        return super().form_valid(form)
+        logger.info(f"User {self.request.user.email} updated budget: ₹{form.instance.amount} for {form.instance.year}/{form.instance.month}")
+        enqueue_insight_refresh(self.request.user.id)
+        return response
     
 
 
@@ -529,17 +499,14 @@ class BudgetHistoryView(LoginRequiredMixin, ListView):
 
         budget_data = []
 
+        # One rollup query for every month on the page
+        spent_by_month = rollups.monthly_totals(
+            self.request.user,
+            months=[(budget.year, budget.month) for budget in budgets],
+        )
+
         for budget in budgets:
-            monthly_spent = (
-                Expense.objects.filter(
-                    user=self.request.user,
-                    is_deleted=False,
-                    expense_date__year=budget.year,
-                    expense_date__month=budget.month,
-                )
-                .aggregate(total=Sum("amount"))["total"]
-                or 0
-            )
+            monthly_spent = spent_by_month.get((budget.year, budget.month), 0)
 
             remaining = budget.amount - monthly_spent
 
@@ -587,21 +554,22 @@ class MonthlyBudgetDeleteView(LoginRequiredMixin, DeleteView):
     def get_queryset(self):
         return MonthlyBudget.objects.filter(user=self.request.user)
 
-    def delete(self, request, *args, **kwargs):
-        """Override delete to also remove category budgets"""
-        budget = self.get_object()
-        
-        # Invalidate dashboard cache for this budget's month
-        cache_key = f'dashboard_{request.user.id}_{budget.year}_{budget.month}'
-        cache.delete(cache_key)
+    def form_valid(self, form):
+        """Override deletion to also remove category budgets"""
+        budget = self.object
         
         # Also delete associated category budgets for this month
         CategoryBudget.objects.filter(
-            user=request.user,
+            user=self.request.user,
             year=budget.year,
             month=budget.month
         ).delete()
-        return super().delete(request, *args, **kwargs)
+        response = super().form_valid(form)
+        
+        # Invalidate cached pages for this budget's month once the deletes are committed
+        user_cache.invalidate_month_on_commit(self.request.user.id, budget.year, budget.month)
+        enqueue_insight_refresh(self.request.user.id)
+        return response
 
 
 # ======================================
@@ -644,17 +612,10 @@ class CategoryListView(LoginRequiredMixin, ListView):
             category_budgets[cb.category_id] = cb.amount
         
         # Get expenses per category for selected month
-        category_expenses = {}
-        expenses = Expense.objects.filter(
-            user=user,
-            expense_date__year=year,
-            expense_date__month=month,
-            is_deleted=False
-        )
-        for expense in expenses:
-            if expense.category_id not in category_expenses:
-                category_expenses[expense.category_id] = 0
-            category_expenses[expense.category_id] += expense.amount
+        category_expenses = {
+            item["category_id"]: item["total"]
+            for item in rollups.category_totals(user, year, month)
+        }
         
         # Attach budget and expense data to categories
         categories_data = []
@@ -707,6 +668,12 @@ class CategoryUpdateView(LoginRequiredMixin, UpdateView):
     def get_queryset(self):
         return Category.objects.filter(user=self.request.user)
     
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # Category names appear on every cached page
+        user_cache.invalidate_user_on_commit(self.request.user.id)
+        return response
+
     def get_success_url(self):
         # Check if there are year/month parameters in the session or referrer
         year = self.request.GET.get('year') or self.request.POST.get('year')
@@ -747,6 +714,7 @@ class CategoryDeleteView(LoginRequiredMixin, UpdateView):
             return redirect(redirect_url)
         
         category.delete()
+        user_cache.invalidate_user_on_commit(request.user.id)
         return redirect(redirect_url)
 
 
@@ -848,8 +816,7 @@ class CategoryBudgetSetupView(LoginRequiredMixin, TemplateView):
                     # Delete if amount is 0 or empty
                     cat_budget.delete()
         
-        # Invalidate dashboard cache
-        cache_key = f'dashboard_{user.id}_{year}_{month}'
-        cache.delete(cache_key)
+        # Invalidate cached pages for this month once the writes are committed
+        user_cache.invalidate_month_on_commit(user.id, year, month)
         
         return redirect('dashboard')
\ No newline at end of file
@@ -187,6 +187,61 @@ else:
     }
     print(f"[DEBUG] Using local memory cache (development)")
 
+# Optional per-worker LRU in front of CACHES["default"] for user-scoped keys
+# (apps/expenses/tiered_cache.py). Writes are fanned out to the other workers
+# over Redis pub/sub so they drop their local copies.
+USER_CACHE_LOCAL_TIER = os.environ.get("USER_CACHE_LOCAL_TIER", "False") == "True"
+USER_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("USER_CACHE_LOCAL_MAX_ENTRIES", 5000))
+USER_CACHE_LOCAL_TTL = 30  # Seconds a worker may serve a local copy without rechecking
+USER_CACHE_INVALIDATION_CHANNEL = "ai_expense:user-cache-invalidate"
+
+# --------------------------------------------------
+# EXPENSE LIST
+# --------------------------------------------------
+# Dotted path to a backend in apps/expenses/search.py; empty follows the
+# database (Postgres tsvector + GIN, SQLite FTS5, otherwise icontains)
+EXPENSE_SEARCH_BACKEND = os.environ.get("EXPENSE_SEARCH_BACKEND", "")
+# Approximate totals: count filtered expenses only up to this many and show
+# "N+" beyond it (0 = always count exactly)
+EXPENSE_LIST_COUNT_LIMIT = int(os.environ.get("EXPENSE_LIST_COUNT_LIMIT", 0))
+
+# --------------------------------------------------
+# AI INSIGHT JOBS
+# --------------------------------------------------
+# Insights are regenerated by `manage.py run_insight_worker`, not on page loads.
+# Writes within the debounce window collapse into a single regeneration.
+INSIGHT_JOB_DEBOUNCE_SECONDS = int(os.environ.get("INSIGHT_JOB_DEBOUNCE_SECONDS", 30))
+INSIGHT_JOB_MAX_DELAY_SECONDS = int(os.environ.get("INSIGHT_JOB_MAX_DELAY_SECONDS", 300))
+INSIGHT_JOB_STALE_SECONDS = 600  # Reclaim jobs left running by a crashed worker
+# Failed regenerations are retried after 60s, 120s, ... up to this many runs in
+# total; a job that still fails stays `failed` until the user's next write
+INSIGHT_JOB_MAX_ATTEMPTS = int(os.environ.get("INSIGHT_JOB_MAX_ATTEMPTS", 3))
+INSIGHT_JOB_RETRY_SECONDS = int(os.environ.get("INSIGHT_JOB_RETRY_SECONDS", 60))
+# Insights not regenerated for this long are removed by `manage.py prune_insights`
+INSIGHT_RETENTION_DAYS = int(os.environ.get("INSIGHT_RETENTION_DAYS", 30))
+# Past this, remaining insight detectors are skipped and partial results written
+INSIGHT_DEADLINE_SECONDS = float(os.environ.get("INSIGHT_DEADLINE_SECONDS", 2.0))
+# Regenerations per user, by subscription plan: (burst, refilled per hour).
+# Each regeneration also spends one of the user's ai_credits.
+INSIGHT_REFRESH_LIMITS = {
+    "free": (3, 2),
+    "premium": (10, 12),
+}
+
+# --------------------------------------------------
+# SPENDING FORECASTS
+# --------------------------------------------------
+# Also fit one forecast per category (in addition to each user's total)
+FORECAST_PER_CATEGORY = os.environ.get("FORECAST_PER_CATEGORY", "False") == "True"
+
+# --------------------------------------------------
+# STARTUP IMPORTS
+# --------------------------------------------------
+# Checked by `manage.py check_startup_imports` for config.wsgi + config.urls.
+# The AI engine loads numeric libraries on first use, never at startup.
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 1000))
+STARTUP_FORBIDDEN_IMPORTS = ("numpy", "pandas", "sklearn", "scipy")
+
 # --------------------------------------------------
 # PASSWORD VALIDATION
 # --------------------------------------------------